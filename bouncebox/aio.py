@@ -0,0 +1,254 @@
+"""
+    asyncio run mode for live sources.
+
+    Sources can be async iterators (sockets, queues) or regular iterators.
+    The box awaits the next event across all of them and releases them in
+    timestamp order. An event is held until every live source has an event
+    buffered, or until it has waited `lateness` seconds, whichever comes
+    first. So a quiet feed can't stall the rest for longer than that.
+
+    Listeners bound to the box router may be coroutine functions. Their
+    coroutines are collected while the router runs its usual synchronous,
+    queued dispatch and are awaited after each send. Other routers refuse
+    coroutine functions at bind time since nothing would await them.
+
+    >>> box = AsyncBounceBox(lateness=0.05)
+    >>> box.add_source(AsyncEventBroadcaster(feed()))
+    >>> box.add_component(strategy)
+    >>> await box.run()                     # many boxes can share a loop
+    >>> box.start_box()                     # or block on asyncio.run
+    >>> box.start_box(interactive=True)     # send_next runs the box's loop
+"""
+import asyncio
+import heapq
+import inspect
+
+from bouncebox.core.box import BounceBox
+from bouncebox.core.component import Component
+from bouncebox.core.dispatch import Router
+from bouncebox.core.errors import EndOfSources
+from bouncebox.core.event import StartEvent
+
+class CoroutineCallback(object):
+    """
+        Wraps a coroutine function so calling it hands the coroutine to
+        pending instead of running it. Compares equal to the wrapped
+        function so unbind works with the original callback.
+    """
+    __slots__ = ('func', 'pending')
+
+    def __init__(self, func, pending):
+        self.func = func
+        self.pending = pending
+
+    def __call__(self, message):
+        self.pending.append(self.func(message))
+
+    def __eq__(self, other):
+        if isinstance(other, CoroutineCallback):
+            other = other.func
+        return self.func == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.func)
+
+    def __repr__(self):
+        return 'CoroutineCallback({0!r})'.format(self.func)
+
+class AsyncRouter(Router):
+    """
+        Router that accepts coroutine function callbacks. Dispatch is still
+        synchronous and queued. drain() awaits what the callbacks started.
+    """
+    def __init__(self, *args, **kwargs):
+        super(AsyncRouter, self).__init__(*args, **kwargs)
+        self.pending = []
+
+    def bind(self, key, callback, exchange, index=None, key_index=None):
+        if inspect.iscoroutinefunction(callback):
+            callback = CoroutineCallback(callback, self.pending)
+        super(AsyncRouter, self).bind(key, callback, exchange, index, key_index)
+
+    async def drain(self):
+        """
+            Await pending coroutines. Events they broadcast go through the
+            router as usual and can start more coroutines
+        """
+        pending = self.pending
+        while pending:
+            coros = pending[:]
+            del pending[:]
+            await asyncio.gather(*coros)
+
+class AsyncEventBroadcaster(Component):
+    """
+        Source component over an async iterable of events
+    """
+    def __init__(self, source):
+        self.aiter = source.__aiter__()
+        super(AsyncEventBroadcaster, self).__init__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.aiter.__anext__()
+
+async def _read_source(source):
+    """
+        One event from an async or sync source. None when exhausted
+    """
+    if hasattr(source, '__anext__'):
+        try:
+            return await source.__anext__()
+        except StopAsyncIteration:
+            return None
+    try:
+        return next(source)
+    except StopIteration:
+        return None
+
+class AsyncBounceBox(BounceBox):
+    """
+        BounceBox driven by an asyncio loop.
+
+        Parameters
+        ----------
+        lateness : float
+            Seconds an event waits for slower sources before it is released
+            out of the merge. 0 releases as soon as it arrives unless every
+            source already has an event buffered.
+    """
+    def __init__(self, lateness=0.0):
+        super(AsyncBounceBox, self).__init__()
+        self.router = AsyncRouter()
+        self.lateness = lateness
+        self._source_index = {}
+        self._reading = {}
+        self._exhausted = set()
+        # merge heap of (timestamp, source index, arrived, event, source)
+        self._merge_heap = []
+        self._stopped = False
+        # loop for the blocking send_next, see start_interactive
+        self._loop = None
+
+    def add_source(self, component):
+        self._source_index[component] = self._source_seq
+        super(AsyncBounceBox, self).add_source(component)
+
+    def remove_source(self, component):
+        super(AsyncBounceBox, self).remove_source(component)
+        task = self._reading.pop(component, None)
+        if task is not None:
+            task.cancel()
+        heap = self._merge_heap
+        heap[:] = [entry for entry in heap if entry[4] is not component]
+        heapq.heapify(heap)
+
+    def _start_reads(self):
+        buffered = set(entry[4] for entry in self._merge_heap)
+        for source in self.sources:
+            if source in self._reading or source in self._exhausted or source in buffered:
+                continue
+            self._reading[source] = asyncio.ensure_future(_read_source(source))
+
+    async def next_event(self):
+        """
+            Await the next event in timestamp order across sources.
+            Returns None once every source is exhausted. (EndOfSources is a
+            StopIteration and can't leave a coroutine)
+        """
+        loop = asyncio.get_running_loop()
+        heap = self._merge_heap
+        reading = self._reading
+        while True:
+            self._start_reads()
+
+            timeout = None
+            if heap:
+                # every live source has spoken, the head is safe to release
+                if not reading:
+                    return heapq.heappop(heap)[3]
+                timeout = heap[0][2] + self.lateness - loop.time()
+                if timeout <= 0:
+                    return heapq.heappop(heap)[3]
+            elif not reading:
+                self.end_box()
+                return None
+
+            tasks = dict((task, source) for source, task in reading.items())
+            done, _ = await asyncio.wait(list(tasks), timeout=timeout,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            now = loop.time()
+            for task in done:
+                source = tasks[task]
+                del reading[source]
+                event = task.result()
+                if event is None:
+                    self._exhausted.add(source)
+                    continue
+                index = self._source_index[source]
+                heapq.heappush(heap, (event.timestamp, index, now, event, source))
+
+    async def asend(self, event):
+        """
+            Send through the router and await the coroutine listeners
+        """
+        self.router.send(event)
+        await self.router.drain()
+
+    async def run(self):
+        """
+            Coroutine version of start_box
+        """
+        if len(self.sources) == 0:
+           print("No Sources Attached. Exiting...")
+           return
+
+        self.router.freeze()
+        self.start_hooks.fire(StartEvent())
+        await self.router.drain()
+        await self.run_sources()
+
+    async def run_sources(self):
+        self._stopped = False
+        try:
+            while not self._stopped:
+                event = await self.next_event()
+                if event is None:
+                    break
+                await self.asend(event)
+        finally:
+            for task in self._reading.values():
+                task.cancel()
+            self._reading.clear()
+        await self.router.drain()
+
+    def stop(self):
+        """
+            Stop run() after the current event. Live sources never end on
+            their own
+        """
+        self._stopped = True
+
+    def start_auto(self):
+        asyncio.run(self.run_sources())
+
+    def send_next(self):
+        """
+            Blocking send of the next event. Runs on a loop owned by the box
+            so reads that are in flight carry over between calls
+        """
+        loop = self._loop
+        if loop is None:
+            loop = self._loop = asyncio.new_event_loop()
+        event = loop.run_until_complete(self.next_event())
+        if event is None:
+            self._loop = None
+            loop.close()
+            raise EndOfSources
+        loop.run_until_complete(self.asend(event))
+        return event
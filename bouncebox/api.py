@@ -1,4 +1,13 @@
 from bouncebox.core.api import *
-from bouncebox.array import EventBroadcaster
-from bouncebox.util.logger import Logger
+from bouncebox.array import EventBroadcaster, FrameBroadcaster
 from bouncebox.middleware import Middleware
+
+def __getattr__(name):
+    # logger pulls in numpy and trtools through event_frame. Load it on
+    # first use so importing the api stays cheap
+    if name == 'Logger':
+        from bouncebox.util.logger import Logger
+        return Logger
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(__name__, name))
+
+__all__ = [name for name in dir() if not name.startswith('_')] + ['Logger']
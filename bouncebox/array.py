@@ -3,17 +3,48 @@
 
     This is opposed to connecting to a live datasource
 """
+import itertools
+
 import bouncebox.core.api as core
 
 class EventBroadcaster(core.Component):
     """
         Will wrap an iter that returns events.
         This will let us broadcast it
+
+        The iter can also return EventBlocks. A single EventBlock is
+        broadcast whole instead of being iterated row by row, or not at
+        all when it is empty.
+
+        consumed counts the items pulled so far. get_position/set_position
+        let a freshly built broadcaster pick up where another left off, see
+        bouncebox.checkpoint.
     """
+    wiring_attrs = core.Component.wiring_attrs + ['iter']
+
     def __init__(self, source):
+        if getattr(source, 'is_block', False):
+            # an empty block has nothing to send
+            source = [source] if len(source) else []
         self.iter = iter(source)
+        self.consumed = 0
         super(EventBroadcaster, self).__init__()
 
+    def get_position(self):
+        return self.consumed
+
+    def set_position(self, position):
+        """
+            Skip ahead to position. The skipped items are still generated,
+            subclasses that can seek should override this
+        """
+        skip = position - self.consumed
+        if skip < 0:
+            raise Exception("Cannot rewind an EventBroadcaster")
+        for i in range(skip):
+            next(self.iter)
+        self.consumed = position
+
     def start(self, _event=None):
         while self.send_next():
             pass
@@ -34,6 +65,7 @@ class EventBroadcaster(core.Component):
     def __next__(self):
         """ Iterator Interface"""
         event = next(self.iter)
+        self.consumed += 1
         return event
 
     next = __next__
@@ -41,3 +73,153 @@ class EventBroadcaster(core.Component):
     def __iter__(self):
         return iter(self.iter)
 
+
+class FrameBroadcaster(EventBroadcaster):
+    """
+        Source over a DataFrame, structured ndarray or dict of arrays.
+
+        Events are built a chunk at a time from whole columns instead of one
+        generator step per row. With blocks=True the chunks are broadcast as
+        EventBlocks and rows are only built if a listener needs them.
+
+        Parameters
+        ----------
+        data : DataFrame, structured ndarray or dict of name -> array
+        event_cls : Event class
+            Built with event_cls(timestamp, **fields) unless it opts into
+            fast_build, see bouncebox.block.build_events
+        fields : list or dict (optional)
+            Event attributes to fill. A dict maps attribute -> column. Defaults
+            to every column except the timestamp.
+        timestamp : str (optional)
+            Timestamp column. Defaults to 'timestamp' if present, else the
+            DataFrame index.
+        chunk_size : int
+            Rows per batch
+        blocks : bool
+            Broadcast EventBlocks instead of Events
+        series : EventSeries (optional)
+
+        >>> source = FrameBroadcaster(df, PriceEvent, fields={'price': 'close'})
+    """
+    wiring_attrs = EventBroadcaster.wiring_attrs + ['timestamps', 'columns']
+
+    def __init__(self, data, event_cls, fields=None, timestamp=None,
+                 chunk_size=10000, blocks=False, series=None):
+        self.event_cls = event_cls
+        self.chunk_size = chunk_size
+        self.blocks = blocks
+        self.series = series
+        self.timestamps, self.columns = _frame_columns(data, fields, timestamp)
+        super(FrameBroadcaster, self).__init__(self._iter_events())
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def iter_chunks(self, start=0):
+        """
+            Yields lists of events, or EventBlocks if blocks=True, starting
+            at row start
+        """
+        if self.blocks:
+            for block in self._iter_blocks(start):
+                yield block
+            return
+
+        from bouncebox.block import build_events
+        event_cls = self.event_cls
+        fields = list(self.columns)
+        arrays = [self.columns[name] for name in fields]
+        timestamps = self.timestamps
+        to_list = _timestamp_list(timestamps)
+        for pos in range(start, len(timestamps), self.chunk_size):
+            stop = pos + self.chunk_size
+            cols = [arr[pos:stop].tolist() for arr in arrays]
+            yield build_events(event_cls, to_list(timestamps[pos:stop]), fields,
+                               cols, series=self.series)
+
+    def _iter_blocks(self, start=0):
+        from bouncebox.block import EventBlock
+        columns = dict((name, col[start:]) for name, col in self.columns.items())
+        block = EventBlock.from_arrays(self.event_cls, self.timestamps[start:],
+                                       series=self.series, **columns)
+        return block.chunks(self.chunk_size)
+
+    def _iter_events(self, start=0):
+        if self.blocks:
+            return self._iter_blocks(start)
+        return itertools.chain.from_iterable(self.iter_chunks(start))
+
+    def set_position(self, position):
+        """
+            Seek without building the skipped events. position counts
+            events in blocks mode too
+        """
+        self.iter = self._iter_events(position)
+        self.consumed = position
+
+    def __next__(self):
+        item = next(self.iter)
+        # blocks count as their rows so positions are the same either way
+        self.consumed += len(item) if self.blocks else 1
+        return item
+
+    next = __next__
+
+    def start(self, _event=None):
+        """
+            Broadcast the rest of the frame, from the current position
+        """
+        broadcast = self.broadcast
+        for chunk in self.iter_chunks(self.consumed):
+            self.consumed += len(chunk)
+            if self.blocks:
+                broadcast(chunk)
+                continue
+            for event in chunk:
+                broadcast(event)
+        self.iter = self._iter_events(self.consumed)
+
+def _timestamp_list(timestamps):
+    if timestamps.dtype.kind == 'M':
+        from bouncebox.block import _to_datetimes
+        return _to_datetimes
+    return lambda arr: arr.tolist()
+
+def _frame_columns(data, fields=None, timestamp=None):
+    """
+        Returns (timestamps ndarray, dict of attr -> column ndarray)
+    """
+    import numpy as np
+
+    index = None
+    if hasattr(data, 'columns') and hasattr(data, 'index'):
+        # DataFrame
+        names = list(data.columns)
+        get = lambda name: data[name].to_numpy()
+        index = data.index
+    elif getattr(getattr(data, 'dtype', None), 'names', None):
+        names = list(data.dtype.names)
+        get = lambda name: data[name]
+    else:
+        names = list(data)
+        get = lambda name: np.asarray(data[name])
+
+    if timestamp is None and 'timestamp' in names:
+        timestamp = 'timestamp'
+    if timestamp is not None:
+        timestamps = np.asarray(get(timestamp))
+    elif index is not None:
+        timestamps = np.asarray(index.values)
+    else:
+        raise Exception("No timestamp column found")
+
+    if fields is None:
+        fields = [name for name in names if name != timestamp]
+    if not isinstance(fields, dict):
+        fields = dict((name, name) for name in fields)
+
+    columns = {}
+    for attr, name in fields.items():
+        columns[attr] = np.asarray(get(name))
+    return timestamps, columns
@@ -0,0 +1,54 @@
+"""
+    python -m bouncebox.bench [-k name] [--save baseline.json] [--compare baseline.json]
+    python -m bouncebox.bench --imports
+
+    Exits non-zero when --compare finds a regression, or when --imports finds
+    a core module loading one of the HEAVY_MODULES.
+"""
+import argparse
+import sys
+
+from bouncebox.bench.suite import (BENCHMARKS, IMPORT_MODULES, run_suite, save_results,
+                                   load_results, compare, format_results, time_import)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bouncebox.bench')
+    parser.add_argument('-k', dest='names', action='append', choices=list(BENCHMARKS),
+                        help='benchmark to run. can repeat. defaults to all')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', help='write results to this json file')
+    parser.add_argument('--compare', help='baseline json file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='allowed ns/event slowdown before flagging, as a fraction')
+    parser.add_argument('--imports', action='store_true',
+                        help='time importing the core modules instead')
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        status = 0
+        for module in IMPORT_MODULES:
+            res = time_import(module, repeat=args.repeat)
+            print('{0:<26} {1:>10.1f} ms  {2}'.format(
+                module, res['seconds'] * 1000, ' '.join(res['heavy'])))
+            if res['heavy']:
+                status = 1
+        return status
+
+    results = run_suite(args.names, repeat=args.repeat)
+    baseline = load_results(args.compare) if args.compare else None
+    print(format_results(results, baseline))
+
+    if args.save:
+        save_results(results, args.save)
+
+    if baseline:
+        regressions = compare(baseline, results, args.tolerance)
+        for name, base, current, ratio in regressions:
+            print('REGRESSION {0}: {1:.1f} -> {2:.1f} ns/event ({3:.2f}x)'.format(
+                name, base, current, ratio))
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
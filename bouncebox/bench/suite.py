@@ -0,0 +1,341 @@
+"""
+    Throughput benchmarks for the dispatch and component hot paths.
+
+    Each benchmark is a setup function registered with @benchmark. Setup
+    builds the topology and returns (run, n_events). Only run() is timed.
+
+    >>> results = run_suite()
+    >>> save_results(results, 'baseline.json')
+    >>> regressions = compare(load_results('baseline.json'), run_suite())
+
+    time_import() covers import cost, which is paid once per process.
+"""
+from collections import OrderedDict
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import bouncebox.core.api as bb
+from bouncebox.core.dispatch import Router, EventDispatcher, SeriesDispatcher
+from bouncebox.array import EventBroadcaster, FrameBroadcaster
+from bouncebox.middleware import Middleware
+
+BENCHMARKS = OrderedDict()
+
+def benchmark(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+class BenchEvent(bb.Event):
+    pass
+
+def _noop(event):
+    pass
+
+class Counter(bb.Component):
+    def __init__(self):
+        super(Counter, self).__init__()
+        self.count = 0
+
+    def handle_event(self, event):
+        self.count += 1
+
+def _counters(n, event_cls=bb.Event):
+    counters = []
+    for i in range(n):
+        comp = Counter()
+        comp.add_event_listener(event_cls, 'handle_event')
+        counters.append(comp)
+    return counters
+
+def _events(n, event_cls=BenchEvent):
+    return [event_cls(i) for i in range(n)]
+
+@benchmark('router_send_flat')
+def bench_router_send_flat(n_events=20000, n_listeners=10):
+    """ box router with N listeners """
+    box = bb.BounceBox()
+    for comp in _counters(n_listeners):
+        box.add_component(comp)
+    events = _events(n_events)
+    send = box.router.send
+    def run():
+        for event in events:
+            send(event)
+    return run, n_events
+
+@benchmark('router_send_frozen')
+def bench_router_send_frozen(n_events=20000, n_listeners=10):
+    """ same as router_send_flat with the compiled dispatch table """
+    box = bb.BounceBox()
+    for comp in _counters(n_listeners):
+        box.add_component(comp)
+    box.router.freeze()
+    events = _events(n_events)
+    send = box.router.send
+    def run():
+        for event in events:
+            send(event)
+    return run, n_events
+
+@benchmark('event_dispatcher_fire')
+def bench_event_dispatcher(n_events=50000, n_listeners=5):
+    dispatcher = EventDispatcher()
+    for i in range(n_listeners):
+        dispatcher.bind(bb.Event, _noop)
+    events = _events(n_events)
+    fire = dispatcher.fire_callbacks
+    def run():
+        for event in events:
+            fire(event)
+    return run, n_events
+
+@benchmark('series_dispatcher_fire')
+def bench_series_dispatcher(n_events=50000, n_listeners=5):
+    dispatcher = SeriesDispatcher()
+    for i in range(n_listeners):
+        dispatcher.bind(BenchEvent.class_series(), _noop)
+    events = _events(n_events)
+    fire = dispatcher.fire_callbacks
+    def run():
+        for event in events:
+            fire(event)
+    return run, n_events
+
+@benchmark('component_broadcast')
+def bench_component_broadcast(n_events=20000, n_listeners=5):
+    parent = bb.Component()
+    source = bb.Component()
+    parent.add_component(source)
+    for comp in _counters(n_listeners):
+        parent.add_component(comp)
+    events = _events(n_events)
+    broadcast = source.broadcast
+    def run():
+        for event in events:
+            broadcast(event)
+    return run, n_events
+
+def _middleware_chain(depth):
+    box = bb.BounceBox()
+    parent = box
+    for i in range(depth):
+        mid = Middleware()
+        if parent is box:
+            box.add_component(mid)
+        else:
+            parent.add_child(mid)
+        parent = mid
+    leaf, = _counters(1)
+    parent.add_child(leaf)
+    return box
+
+@benchmark('middleware_chain')
+def bench_middleware_chain(n_events=5000, depth=8):
+    """ event bubbling down through depth nested Middleware """
+    box = _middleware_chain(depth)
+    events = _events(n_events)
+    send = box.router.send
+    def run():
+        for event in events:
+            send(event)
+    return run, n_events
+
+@benchmark('middleware_chain_flat')
+def bench_middleware_chain_flat(n_events=5000, depth=8):
+    """ middleware_chain after box.flatten_middleware() """
+    box = _middleware_chain(depth)
+    box.flatten_middleware()
+    events = _events(n_events)
+    send = box.router.send
+    def run():
+        for event in events:
+            send(event)
+    return run, n_events
+
+@benchmark('many_series')
+def bench_many_series(n_events=20000, n_series=200):
+    """ series bindings spread over many series """
+    router = Router()
+    series = [bb.EventSeries(BenchEvent, 'bench_%d' % i) for i in range(n_series)]
+    for s in series:
+        router.bind(s, _noop, 'series')
+    events = [BenchEvent(i, series=series[i % n_series]) for i in range(n_events)]
+    send = router.send
+    def run():
+        for event in events:
+            send(event)
+    return run, n_events
+
+@benchmark('deep_hierarchy')
+def bench_deep_hierarchy(n_events=20000, depth=10):
+    """ listeners on every level of a deep event class chain """
+    router = Router()
+    cls = bb.Event
+    for i in range(depth):
+        cls = type('DeepEvent%d' % i, (cls,), {})
+        router.bind(cls, _noop, 'event')
+    events = _events(n_events, cls)
+    send = router.send
+    def run():
+        for event in events:
+            send(event)
+    return run, n_events
+
+@benchmark('broadcaster_start')
+def bench_broadcaster_start(n_events=20000, n_listeners=5):
+    events = _events(n_events)
+    def run():
+        parent = bb.Component()
+        source = EventBroadcaster(events)
+        parent.add_component(source)
+        for comp in _counters(n_listeners):
+            parent.add_component(comp)
+        source.start()
+    return run, n_events
+
+@benchmark('frame_broadcaster_start')
+def bench_frame_broadcaster_start(n_events=20000, n_listeners=5, chunk_size=10000):
+    """ broadcaster_start with the events built from columns """
+    import numpy as np
+    data = {'timestamp': np.arange(n_events), 'price': np.arange(n_events, dtype=float)}
+    def run():
+        parent = bb.Component()
+        source = FrameBroadcaster(data, BenchEvent, chunk_size=chunk_size)
+        parent.add_component(source)
+        for comp in _counters(n_listeners):
+            parent.add_component(comp)
+        source.start()
+    return run, n_events
+
+@benchmark('component_construction')
+def bench_component_construction(n_events=10000):
+    """ box with many per-symbol leaf components. n_events is components """
+    def run():
+        box = bb.BounceBox()
+        for comp in _counters(n_events, BenchEvent):
+            box.add_component(comp)
+    return run, n_events
+
+def time_benchmark(name, repeat=3, **kwargs):
+    """
+        Best of repeat runs. Peak memory is taken from a separate run under
+        tracemalloc so it doesn't skew the timings.
+    """
+    setup = BENCHMARKS[name]
+    best = None
+    for i in range(repeat):
+        run, n_events = setup(**kwargs)
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            run()
+            elapsed = time.perf_counter_ns() - start
+        finally:
+            gc.enable()
+        if best is None or elapsed < best:
+            best = elapsed
+
+    run, n_events = setup(**kwargs)
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'events': n_events,
+        'ns_per_event': best / n_events,
+        'events_per_sec': n_events / (best / 1e9),
+        'peak_kb': peak / 1024.,
+    }
+
+def run_suite(names=None, repeat=3, **kwargs):
+    if names is None:
+        names = list(BENCHMARKS)
+    results = OrderedDict()
+    for name in names:
+        results[name] = time_benchmark(name, repeat=repeat, **kwargs)
+    return results
+
+# modules the core engine should not drag in at import time
+HEAVY_MODULES = ['numpy', 'pandas', 'trtools', 'IPython']
+IMPORT_MODULES = ['bouncebox.core.box', 'bouncebox.api']
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+heavy = sorted(set(name.split('.')[0] for name in sys.modules) & set(sys.argv[2:]))
+print(json.dumps({'seconds': elapsed, 'heavy': heavy}))
+"""
+
+def time_import(module, repeat=5):
+    """
+        Best of repeat imports of module, each in a fresh interpreter.
+        heavy lists the HEAVY_MODULES the import loaded
+    """
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    best = None
+    for i in range(repeat):
+        out = subprocess.check_output([sys.executable, '-c', _IMPORT_SCRIPT, module] + HEAVY_MODULES,
+                                      env=env)
+        res = json.loads(out.decode().strip().splitlines()[-1])
+        if best is None or res['seconds'] < best['seconds']:
+            best = res
+    best['module'] = module
+    return best
+
+def save_results(results, path):
+    data = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)['results']
+
+def compare(baseline, current, tolerance=0.10):
+    """
+        Returns list of (name, baseline ns/event, current ns/event, ratio)
+        for benchmarks that got slower than tolerance allows.
+    """
+    regressions = []
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]['ns_per_event']
+        ratio = result['ns_per_event'] / base
+        if ratio > 1 + tolerance:
+            regressions.append((name, base, result['ns_per_event'], ratio))
+    return regressions
+
+def format_results(results, baseline=None):
+    out = []
+    header = '{0:<26} {1:>12} {2:>14} {3:>10}'.format('benchmark', 'ns/event', 'events/sec', 'peak KB')
+    if baseline:
+        header += ' {0:>8}'.format('ratio')
+    out.append(header)
+    for name, res in results.items():
+        line = '{0:<26} {1:>12.1f} {2:>14,.0f} {3:>10.1f}'.format(
+            name, res['ns_per_event'], res['events_per_sec'], res['peak_kb'])
+        if baseline and name in baseline:
+            line += ' {0:>8.2f}'.format(res['ns_per_event'] / baseline[name]['ns_per_event'])
+        out.append(line)
+    return '\n'.join(out)
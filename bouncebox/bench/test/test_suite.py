@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import bouncebox.bench.suite as suite
+
+class TestBenchSuite(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_run_suite(self):
+        """
+            Every benchmark should run on a tiny input
+        """
+        results = suite.run_suite(repeat=1, n_events=50)
+        assert list(results) == list(suite.BENCHMARKS)
+        for name, res in results.items():
+            assert res['events'] == 50
+            assert res['ns_per_event'] > 0
+            assert res['peak_kb'] >= 0
+
+    def test_save_compare(self):
+        results = suite.run_suite(['event_dispatcher_fire'], repeat=1, n_events=50)
+        path = os.path.join(self.path, 'baseline.json')
+        suite.save_results(results, path)
+        baseline = suite.load_results(path)
+        assert suite.compare(baseline, results) == []
+
+        slower = {'event_dispatcher_fire': dict(results['event_dispatcher_fire'])}
+        slower['event_dispatcher_fire']['ns_per_event'] *= 2
+        regressions = suite.compare(baseline, slower, tolerance=0.5)
+        assert len(regressions) == 1
+        assert regressions[0][0] == 'event_dispatcher_fire'
+
+    def test_import_light(self):
+        """
+            The core engine imports with the standard library only
+        """
+        for module in suite.IMPORT_MODULES:
+            res = suite.time_import(module, repeat=1)
+            assert res['heavy'] == [], res
+            assert res['seconds'] > 0
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-s','-x','--pdb', '--pdb-failure'],exit=False)
@@ -0,0 +1,274 @@
+"""
+    Columnar blocks of events.
+
+    An EventBlock stores N events of one class as a NumPy structured array.
+    Blocks are sent through the Router like any other message. Listeners
+    bound with the 'batch' exchange get the whole block. Regular listeners
+    get per-row Event objects, which are only built if such a listener exists.
+
+    >>> block = EventBlock.from_arrays(TickEvent, timestamps, price=prices)
+    >>> box.add_source(EventBroadcaster(block.chunks(10000)))
+"""
+from datetime import datetime
+
+import numpy as np
+
+from bouncebox.core.event import Event
+from bouncebox.core.series import SERIES_REGISTRY, stable_hash
+
+BLOCK_CLASS_CACHE = {}
+
+def block_class(event_cls):
+    """
+        Return the EventBlock subclass for event_cls.
+
+        The dispatchers cache callbacks by type(message), so each event class
+        gets its own block class.
+    """
+    try:
+        return BLOCK_CLASS_CACHE[event_cls]
+    except KeyError:
+        pass
+    name = event_cls.__name__ + 'Block'
+    cls = type(name, (EventBlock,), {'event_cls': event_cls})
+    BLOCK_CLASS_CACHE[event_cls] = cls
+    return cls
+
+def _to_datetimes(arr):
+    """
+        datetime64 array to a list of datetimes without losing precision.
+        datetime only goes down to us, so ns values that need it come back
+        as pandas Timestamps, which are datetimes too
+    """
+    unit = np.datetime_data(arr.dtype)[0]
+    if unit in ('ns', 'ps', 'fs', 'as'):
+        us = arr.astype('datetime64[us]')
+        if (us != arr).any():
+            try:
+                import pandas as pd
+            except ImportError:
+                raise ValueError("timestamps with sub-microsecond precision need pandas")
+            return list(pd.to_datetime(arr.astype('datetime64[ns]')))
+        arr = us
+    # datetime64[ns].tolist() returns ints, go through us to get datetimes
+    return arr.astype('datetime64[us]').tolist()
+
+def build_events(event_cls, timestamps, fields, cols, series=None, generated=None):
+    """
+        Build events from column lists.
+
+        Events are built with event_cls(timestamp, **fields), so __init__
+        has to take the fields as keyword args. If event_cls keeps the plain
+        Event __init__, the fields are set after it runs. Classes that set
+        fast_build = True are built with __new__ and setattr instead, which
+        skips __init__. Only opt in if __init__ does nothing but store its
+        args.
+
+        Parameters
+        ----------
+        event_cls : Event class
+        timestamps : list
+        fields : list of str
+            attribute name for each column
+        cols : list of lists
+            same length as timestamps
+        series : EventSeries (optional)
+            defaults to event_cls.class_series()
+        generated : datetime (optional)
+            shared by every event on the fast_build path. defaults to now
+    """
+    if series is None:
+        series = event_cls.class_series()
+    rows = zip(*cols) if cols else [()] * len(timestamps)
+
+    events = []
+    if event_cls.__init__ is Event.__init__ and not event_cls.fast_build:
+        # plain Event __init__, the fields are set afterwards
+        for timestamp, values in zip(timestamps, rows):
+            event = event_cls(timestamp, series=series)
+            for name, value in zip(fields, values):
+                setattr(event, name, value)
+            events.append(event)
+        return events
+    if not event_cls.fast_build:
+        for timestamp, values in zip(timestamps, rows):
+            event = event_cls(timestamp, **dict(zip(fields, values)))
+            event.series = series
+            events.append(event)
+        return events
+
+    new = event_cls.__new__
+    if generated is None:
+        generated = datetime.now()
+    for timestamp, values in zip(timestamps, rows):
+        event = new(event_cls)
+        event.generated = generated
+        event.source_event = None
+        event.timestamp = timestamp
+        event.series = series
+        for name, value in zip(fields, values):
+            setattr(event, name, value)
+        events.append(event)
+    return events
+
+class BlockSeries(object):
+    """
+        Series key for a whole block. This keeps the SeriesDispatcher from
+        handing the block to per-event series callbacks. Those get rows.
+    """
+    def __init__(self, series):
+        self.event_series = series
+        self._hash = stable_hash(('block', hash(series)))
+        self._token = SERIES_REGISTRY.intern(self._hash)
+        self.series_id = self._token.series_id
+
+    def __getstate__(self):
+        return {'event_series': self.event_series}
+
+    def __setstate__(self, state):
+        self.__init__(state['event_series'])
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        return hash(self) == hash(other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return 'BlockSeries({0!r})'.format(self.event_series)
+
+class EventBlock(object):
+    """
+        Parameters
+        ----------
+        data : structured ndarray
+            Must have a datetime64 'timestamp' field. Other fields become
+            event attributes.
+        series : EventSeries (optional)
+            Series of the rows. Defaults to event_cls.class_series()
+        event_cls : Event Class
+            Only needed when instantiating EventBlock directly.
+    """
+    is_block = True
+    event_cls = None
+
+    def __new__(cls, data=None, series=None, event_cls=None):
+        if event_cls is not None and cls.event_cls is not event_cls:
+            cls = block_class(event_cls)
+        return super(EventBlock, cls).__new__(cls)
+
+    def __init__(self, data, series=None, event_cls=None):
+        if self.event_cls is None:
+            raise Exception("EventBlock needs an event_cls")
+        if data.dtype.names is None or 'timestamp' not in data.dtype.names:
+            raise Exception("data must be a structured array with a timestamp field")
+        if data['timestamp'].dtype != 'datetime64[ns]':
+            data = data.astype(_block_dtype(data.dtype))
+
+        if series is None:
+            series = self.event_cls.class_series()
+
+        self.data = data
+        self.event_series = series
+        self.series = BlockSeries(series)
+        self.generated = datetime.now()
+        self._events = None
+
+    @classmethod
+    def from_arrays(cls, event_cls, timestamp, series=None, **columns):
+        """
+            Build a block from a timestamp array plus one array per field
+        """
+        timestamp = np.asarray(timestamp, dtype='datetime64[ns]')
+        columns = dict((name, np.asarray(col)) for name, col in columns.items())
+        dtype = [('timestamp', 'datetime64[ns]')]
+        dtype.extend((name, col.dtype) for name, col in columns.items())
+
+        data = np.empty(len(timestamp), dtype=dtype)
+        data['timestamp'] = timestamp
+        for name, col in columns.items():
+            data[name] = col
+        return cls(data, series=series, event_cls=event_cls)
+
+    @property
+    def fields(self):
+        """ payload field names. timestamp excluded """
+        return [name for name in self.data.dtype.names if name != 'timestamp']
+
+    @property
+    def timestamp(self):
+        """
+            Timestamp of the first row. This is what BounceBox merges on.
+            BounceBox splits the block when another source has an event
+            inside its span, see split
+        """
+        if len(self.data) == 0:
+            return None
+        return _to_datetimes(self.data['timestamp'][:1])[0]
+
+    @property
+    def timestamps(self):
+        return self.data['timestamp']
+
+    def events(self):
+        """
+            Materialize the rows as Events. Built once and cached
+        """
+        if self._events is None:
+            self._events = self._build_events()
+        return self._events
+
+    def _build_events(self):
+        fields = self.fields
+        cols = [self.data[name].tolist() for name in fields]
+        timestamps = _to_datetimes(self.data['timestamp'])
+        return build_events(self.event_cls, timestamps, fields, cols,
+                            self.event_series, self.generated)
+
+    def split(self, timestamp, inclusive=False):
+        """
+            Split into (rows before timestamp, the rest). With inclusive,
+            rows at timestamp go in the first part. The rest is None when
+            every row falls in the first part
+        """
+        stamp = np.datetime64(timestamp, 'ns')
+        side = 'right' if inclusive else 'left'
+        pos = int(np.searchsorted(self.data['timestamp'], stamp, side=side))
+        if pos <= 0 or pos >= len(self.data):
+            return self, None
+        return self[:pos], self[pos:]
+
+    def chunks(self, size):
+        """
+            Split into blocks of at most size rows. Blocks are views on data
+        """
+        for start in range(0, len(self.data), size):
+            yield self[start:start+size]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.events())
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.data[key]
+        if isinstance(key, slice):
+            return type(self)(self.data[key], series=self.event_series)
+        return self.events()[key]
+
+    def __repr__(self):
+        return '{0}({1} events)'.format(type(self).__name__, len(self))
+
+def _block_dtype(dtype):
+    descr = []
+    for name in dtype.names:
+        if name == 'timestamp':
+            descr.append((name, 'datetime64[ns]'))
+        else:
+            descr.append((name, dtype[name]))
+    return descr
@@ -0,0 +1,170 @@
+"""
+    Checkpoint and resume a BounceBox run.
+
+    A checkpoint holds:
+
+    * every component's get_state(), keyed by its path in the component tree
+    * each source's get_position()
+    * the box's merge heap, i.e. the event prefetched from each source
+    * anything left in the router queue
+
+    Components are matched up by path, so resume into a box wired the same
+    way as the one that was checkpointed. References between components in
+    the saved state are pickled as references and come back as the live
+    components of the new box.
+
+    >>> box = build_box()
+    >>> box.enable_checkpoints('run.ckpt', every_events=1000000, every_seconds=600)
+    >>> box.start_box()
+    ... # crash
+    >>> box = build_box()
+    >>> box.resume('run.ckpt')
+
+    Sources that can seek (FrameBroadcaster, StoreSource) resume instantly.
+    A plain EventBroadcaster regenerates the items it skips, but they are
+    not dispatched.
+"""
+import os
+import pickle
+import time
+
+VERSION = 1
+
+def walk_components(component, path=()):
+    """
+        Yields (path, component) for every component under component.
+        path is a tuple of indexes into .components
+    """
+    for i, child in enumerate(component.components):
+        child_path = path + (i,)
+        yield child_path, child
+        for item in walk_components(child, child_path):
+            yield item
+
+class _CheckpointPickler(pickle.Pickler):
+    def __init__(self, file, paths):
+        super(_CheckpointPickler, self).__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.paths = paths
+
+    def persistent_id(self, obj):
+        path = self.paths.get(id(obj))
+        if path is not None:
+            return ('component', path)
+        return None
+
+class _CheckpointUnpickler(pickle.Unpickler):
+    def __init__(self, file, components):
+        super(_CheckpointUnpickler, self).__init__(file)
+        self.components = components
+
+    def persistent_load(self, pid):
+        kind, path = pid
+        try:
+            return self.components[path]
+        except KeyError:
+            raise pickle.UnpicklingError("No component at {0}. Box is wired differently".format(path))
+
+def snapshot(box, events_sent=0):
+    """
+        dict of everything needed to resume box
+    """
+    # batch runs that are still pending are delivered, not saved
+    while box.flush_routers():
+        pass
+
+    heap = box._source_heap
+    if heap is not None:
+        heap = list(heap)
+
+    return {
+        'version': VERSION,
+        'events_sent': events_sent,
+        'time': time.time(),
+        'states': dict((path, comp.get_state()) for path, comp in walk_components(box)),
+        'sources': [source.get_position() for source in box.sources],
+        'source_seq': box._source_seq,
+        'heap': heap,
+        'queue': list(box.router.queue),
+    }
+
+def save_checkpoint(box, path, events_sent=0):
+    """
+        Write a checkpoint. The file is replaced atomically, so a crash
+        mid write leaves the previous checkpoint intact
+    """
+    data = snapshot(box, events_sent)
+    paths = dict((id(comp), comp_path) for comp_path, comp in walk_components(box))
+    paths[id(box)] = ()
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        _CheckpointPickler(f, paths).dump(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def load_checkpoint(box, path):
+    """
+        Restore a checkpoint into box, a freshly built box wired like the one
+        that was saved. Returns the checkpoint dict
+    """
+    components = dict(walk_components(box))
+    components[()] = box
+    with open(path, 'rb') as f:
+        data = _CheckpointUnpickler(f, components).load()
+    if data.get('version') != VERSION:
+        raise Exception("Unknown checkpoint version {0}".format(data.get('version')))
+
+    if len(data['sources']) != len(box.sources):
+        raise Exception("Checkpoint has {0} sources, box has {1}".format(
+            len(data['sources']), len(box.sources)))
+    # the heap comes from the checkpoint, sources shouldn't refill it
+    box._source_heap = None
+    for source, position in zip(box.sources, data['sources']):
+        source.set_position(position)
+
+    for comp_path, state in data['states'].items():
+        components[comp_path].set_state(state)
+
+    box._source_seq = data['source_seq']
+    heap = data['heap']
+    if heap is not None:
+        heap = list(heap)
+    box._source_heap = heap
+    box.router.queue.extend(data['queue'])
+    return data
+
+class Checkpointer(object):
+    """
+        Saves box every every_events events and/or every_seconds seconds.
+        tick() is called by BounceBox.start_auto after each event.
+    """
+    # only look at the clock every so many events
+    CLOCK_EVERY = 256
+
+    def __init__(self, box, path, every_events=None, every_seconds=None):
+        if every_events is None and every_seconds is None:
+            raise Exception("Need every_events or every_seconds")
+        self.box = box
+        self.path = path
+        self.every_events = every_events
+        self.every_seconds = every_seconds
+        self.events_sent = 0
+        self.last_events = 0
+        self.last_time = time.monotonic()
+        self.saved = 0
+
+    def tick(self):
+        self.events_sent += 1
+        since = self.events_sent - self.last_events
+        if self.every_events is not None and since >= self.every_events:
+            self.checkpoint()
+        elif self.every_seconds is not None and since % self.CLOCK_EVERY == 0:
+            if time.monotonic() - self.last_time >= self.every_seconds:
+                self.checkpoint()
+
+    def checkpoint(self):
+        save_checkpoint(self.box, self.path, self.events_sent)
+        self.last_events = self.events_sent
+        self.last_time = time.monotonic()
+        self.saved += 1
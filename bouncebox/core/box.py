@@ -1,3 +1,5 @@
+import heapq
+
 from bouncebox.core.component import Component
 from bouncebox.core.errors import EndOfSources
 from bouncebox.core.event import EndEvent, StartEvent
@@ -6,6 +8,16 @@ from bouncebox.util import EventHook
 
 __all__ = ['BounceBox']
 
+def _next_source_event(source):
+    """
+        next(source), skipping empty EventBlocks. They have no timestamp to
+        merge on
+    """
+    event = next(source)
+    while getattr(event, 'is_block', False) and not len(event):
+        event = next(source)
+    return event
+
 class BounceBox(Component):
     """
         This class contains everything
@@ -15,6 +27,14 @@ class BounceBox(Component):
         self.end_hooks = EventHook()
         self.start_hooks = EventHook()
         self.sources = []
+        # merge heap of (timestamp, source index, event, source)
+        self._source_heap = None
+        # source index only breaks ties so it just needs to keep add order
+        self._source_seq = 0
+        # see enable_checkpoints
+        self.checkpointer = None
+        # see flatten_middleware
+        self.flat_wiring = None
 
     def start_box(self, autorun=True, interactive=False):
         """
@@ -27,6 +47,9 @@ class BounceBox(Component):
            print("No Sources Attached. Exiting...")
            return
 
+        # wiring is done, use the compiled dispatch table
+        self.router.freeze()
+
         self.start_hooks.fire(StartEvent())
         if interactive:
             self.start_interactive()
@@ -34,12 +57,53 @@ class BounceBox(Component):
             self.start_auto()
 
     def start_auto(self):
+        checkpointer = self.checkpointer
         while True:
             try:
                 self.send_next()
             except EndOfSources:
                 print('Done Running Sources')
                 break
+            if checkpointer is not None:
+                checkpointer.tick()
+
+    def enable_checkpoints(self, path, every_events=None, every_seconds=None):
+        """
+            Have start_auto write a checkpoint to path every_events events
+            and/or every_seconds seconds. See bouncebox.checkpoint
+        """
+        from bouncebox.checkpoint import Checkpointer
+        self.checkpointer = Checkpointer(self, path, every_events, every_seconds)
+        return self.checkpointer
+
+    def checkpoint(self, path):
+        """
+            Write a checkpoint now. Call between events
+        """
+        from bouncebox.checkpoint import save_checkpoint
+        events_sent = self.checkpointer.events_sent if self.checkpointer else 0
+        save_checkpoint(self, path, events_sent)
+
+    def resume(self, path, autorun=True):
+        """
+            Restore the checkpoint at path and carry on running. The box must
+            be built and wired the same way as the one that was saved. Start
+            hooks are not fired again.
+        """
+        from bouncebox.checkpoint import load_checkpoint
+        data = load_checkpoint(self, path)
+        if self.checkpointer is not None:
+            self.checkpointer.events_sent = data['events_sent']
+            self.checkpointer.last_events = data['events_sent']
+
+        self.router.freeze()
+        # deliver anything that was queued when the checkpoint was taken
+        queue = self.router.queue
+        if queue:
+            self.router.send(queue.popleft())
+        if autorun:
+            self.start_auto()
+        return data
 
     def start_interactive(self):
         print(""" Interactive Mode 
@@ -75,27 +139,80 @@ class BounceBox(Component):
         """
             Out of multiple sources this will send the next
             of chronological order
+
+            Sources are k-way merged on event.timestamp. Ties go to the
+            source that was added first. An exhausted source is dropped
+            and the box only ends when every source is done. EventBlocks
+            are split so their rows merge like single events.
         """
-        #TODO right now this doesn't do the chronological sort
-        # currently only supports one source
-        try:
-            for source in self.sources:
-                event = next(source)
-                return event
-        except StopIteration:
+        event = self._pop_source_event()
+        if event is None:
             # send End event
             self.end_box()
             raise EndOfSources
+        return event
 
     next = __next__
 
+    def _pop_source_event(self):
+        """
+            Next merged source event. None when the sources are done
+        """
+        heap = self._source_heap
+        if heap is None:
+            heap = self._init_source_heap()
+
+        if not heap:
+            return None
+        timestamp, index, event, source = heap[0]
+
+        if len(heap) > 1 and getattr(event, 'is_block', False):
+            # other sources can have events inside the block's span. Send
+            # the rows before the next one and put the rest back
+            other = min(heap[1:3])
+            head, rest = event.split(other[0], index < other[1])
+            if rest is not None:
+                heapq.heapreplace(heap, (rest.timestamp, index, rest, source))
+                return head
+
+        # refill from the source we just consumed
+        try:
+            next_event = _next_source_event(source)
+        except StopIteration:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (next_event.timestamp, index, next_event, source))
+        return event
+
     def __iter__(self):
         return self
+
+    def _init_source_heap(self):
+        """
+            Prime the merge heap with the first event of every source
+        """
+        heap = []
+        for index, source in enumerate(self.sources):
+            self._push_source(heap, index, source)
+        heapq.heapify(heap)
+        self._source_heap = heap
+        return heap
+
+    def _push_source(self, heap, index, source):
+        try:
+            event = _next_source_event(source)
+        except StopIteration:
+            return
+        heap.append((event.timestamp, index, event, source))
     
     def end_box(self):
         """
             Let everyone know the box is done
         """
+        # deliver any pending batch runs first, anywhere in the tree. A
+        # delivered run can start another one, so go until nothing is left
+        while self.flush_routers():
+            pass
         self.end_hooks.fire(EndEvent())
 
     def send(self, message):
@@ -107,7 +224,82 @@ class BounceBox(Component):
         if hasattr(component, 'handle_start_box'):
             self.start_hooks += component.handle_start_box
         super(BounceBox, self).add_component(component)
+        if self.flat_wiring is not None:
+            self.flatten_middleware()
+
+    def remove_component(self, component, **kwargs):
+        # unbinding expects the unflattened wiring
+        flat = self.flat_wiring is not None
+        self.expand_middleware()
+        if hasattr(component, 'handle_end_box'):
+            self.end_hooks -= component.handle_end_box
+        if hasattr(component, 'handle_start_box'):
+            self.start_hooks -= component.handle_start_box
+        if component in self.sources:
+            self.remove_source(component)
+        super(BounceBox, self).remove_component(component, **kwargs)
+        if flat:
+            self.flatten_middleware()
+
+    def flatten_middleware(self):
+        """
+            Bind the children of pass-through Middleware directly onto the
+            routers above them. Re-done automatically when a filter or child
+            is added to a flattened Middleware, or when components are
+            added/removed on the box. See middleware.flatten_middleware
+        """
+        from bouncebox.middleware import flatten_middleware
+        self.expand_middleware()
+        self.flat_wiring = flatten_middleware(self)
+        return self.flat_wiring
+
+    def expand_middleware(self):
+        """
+            Undo flatten_middleware
+        """
+        if self.flat_wiring is not None:
+            self.flat_wiring.expand()
+            self.flat_wiring = None
+
+    def remove_source(self, component):
+        """
+            Stop pulling from a source. Its prefetched event is dropped
+        """
+        self.sources.remove(component)
+        heap = self._source_heap
+        if heap is not None:
+            heap[:] = [entry for entry in heap if entry[3] is not component]
+            heapq.heapify(heap)
+
+    def reset_source(self, component):
+        """
+            Drop the prefetched event of a source that was moved while the
+            box is running, i.e. by seek, and pull its next one. The source
+            keeps its tie break order
+        """
+        heap = self._source_heap
+        if heap is None:
+            return
+        index = None
+        for entry in heap:
+            if entry[3] is component:
+                index = entry[1]
+                break
+        if index is None:
+            # it had run out
+            index = self._source_seq
+            self._source_seq += 1
+        heap[:] = [entry for entry in heap if entry[3] is not component]
+        self._push_source(heap, index, component)
+        heapq.heapify(heap)
 
     def add_source(self, component):
+        index = self._source_seq
+        self._source_seq += 1
         self.sources.append(component)
         self.add_component(component)
+        # box is already running, merge the new source in
+        heap = self._source_heap
+        if heap is not None:
+            self._push_source(heap, index, component)
+            heapq.heapify(heap)
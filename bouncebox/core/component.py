@@ -2,16 +2,17 @@ import functools
 
 from bouncebox.core.event import EndEvent
 from bouncebox.core.element import PublishingElement
-from bouncebox.core.dispatch import Router
+from bouncebox.core.dispatch import Router, BaseRouter, BatchCallback, EMPTY_ROUTER
 import bouncebox.core.mixins as mixins
 
 from bouncebox.util import generate_id, EventHook
 
-def _get_event_callbacks(component):
+def _get_event_callbacks(component, listeners=None):
     """
         Process the component and return a callback list
     """
-    listeners = component.listeners + component.obj_listeners
+    if listeners is None:
+        listeners = component.listeners + component.obj_listeners
 
     callbacks = []
     for event_cls, callback in listeners:
@@ -28,6 +29,17 @@ def _get_event_callbacks(component):
         callbacks.append((event_cls, callback))
     return callbacks
 
+def _get_batch_callbacks(component):
+    listeners = component.batch_listeners + component.obj_batch_listeners
+    callbacks = []
+    for listener in listeners:
+        event_cls, callback = _get_event_callbacks(component, [listener[:2]])[0]
+        # (event_type, callback, batch_size)
+        if len(listener) > 2 and listener[2]:
+            callback = BatchCallback(callback, listener[2])
+        callbacks.append((event_cls, callback))
+    return callbacks
+
 def _get_series_bindings(component):
     bindings = component.series_bindings + component.obj_series_bindings
 
@@ -43,8 +55,15 @@ class BaseComponent(PublishingElement):
     """
     """
     cls_add_component_hooks = EventHook()
+    cls_remove_component_hooks = EventHook()
     listeners = []
     _init_hooks = EventHook()
+    # attrs rebuilt by __init__/add_component, left out of get_state. The
+    # listener lists can hold bound methods of this instance
+    wiring_attrs = ['front', 'components', 'gen_id', 'obj_listeners',
+                    'obj_series_bindings', 'obj_batch_listeners',
+                    'bubble_down_children', 'child_event_callbacks',
+                    'child_series_bindings', 'bubble_down_parents']
 
     def __init__(self):
         super(BaseComponent, self).__init__()
@@ -53,14 +72,17 @@ class BaseComponent(PublishingElement):
 
         self.gen_id = generate_id(self)
 
-        self.router = Router()
-        self._internal_router = Router()
+        # routers are built on first use. Most leaf components never
+        # have anything bound to them
+        self._router = EMPTY_ROUTER
+        self._internal_router = EMPTY_ROUTER
 
         # This was init because I couldn't figure out how to append to a cls variable
         # in the subclass definitions. The mixin can do it, but I'd need a metaclass
         # to do it for the Series and Listening Component
         # also was done to bind to self
         self.add_component_hooks = EventHook()
+        self.remove_component_hooks = EventHook()
         self.components = []
 
         self.broadcast_hooks = EventHook()
@@ -70,8 +92,19 @@ class BaseComponent(PublishingElement):
         self.front = self
         self._init_hooks.fire(self)
 
+    @property
+    def router(self):
+        router = self._router
+        if router is EMPTY_ROUTER:
+            router = self._router = Router()
+        return router
+
+    @router.setter
+    def router(self, router):
+        self._router = router
+
     def broadcast(self, event):
-        self.broadcast_hooks.fire(event)
+        self.broadcast_hooks.fire1(event)
 
     def add_component(self, component, contained=True, **kwargs):
         if not contained:
@@ -90,15 +123,94 @@ class BaseComponent(PublishingElement):
         if end_func and callable(end_func):        
             self.bind(EndEvent, end_func, 'event')
 
+    def remove_component(self, component, **kwargs):
+        """
+            Reverse of add_component. Unbinds the component's callbacks
+            from this router so it can be hot-removed from a live box
+        """
+        self.components.remove(component)
+        self.remove_component_hooks.fire(component, **kwargs)
+        self.cls_remove_component_hooks.fire(self, component, **kwargs)
+
+        end_func = getattr(component, 'end', None)
+        if end_func and callable(end_func):
+            self.unbind(EndEvent, end_func, 'event')
+
+        component.front = component
+
     # delegate to router
     def bind(self, key, callback, exchange='event'):
-        if self.router is None:
-            self.router = Router()
         self.router.bind(key, callback, exchange)
 
+    def unbind(self, key, callback, exchange='event'):
+        self.router.unbind(key, callback, exchange)
+
     def send(self, message):
         # note that front isn't always a bouncebox
-        self.front.router.send(message)
+        self.front._router.send(message)
+
+    def get_state(self):
+        """
+            Picklable snapshot of this component's own data. Routers, hooks
+            and wiring_attrs are skipped. Children have their own state.
+        """
+        wiring = self.wiring_attrs
+        state = {}
+        for name, value in self.__dict__.items():
+            if name in wiring or isinstance(value, (BaseRouter, EventHook)):
+                continue
+            # swapped in methods i.e. send = send_log
+            if getattr(value, '__self__', None) is self:
+                continue
+            state[name] = value
+        return state
+
+    def set_state(self, state):
+        self.__dict__.update(state)
+
+    def _routers(self):
+        # private attrs so unused routers are never built
+        for attr in ('_router', '_internal_router', '_pubsub_router', '_down_router'):
+            router = getattr(self, attr, None)
+            if router is not None and router is not EMPTY_ROUTER:
+                yield router
+
+    def _profiled_routers(self):
+        for router in self._routers():
+            if hasattr(router, 'start_profiling'):
+                yield router
+
+    def flush_routers(self):
+        """
+            Flush every router in this component tree. Returns True if
+            anything was delivered
+        """
+        flushed = False
+        for router in self._routers():
+            if router.flush():
+                flushed = True
+        for component in self.components:
+            if component.flush_routers():
+                flushed = True
+        return flushed
+
+    def start_profiling(self, profile=None):
+        """
+            Profile every router in this component tree into one
+            RouterProfile. Returns the profile
+        """
+        for router in self._profiled_routers():
+            profile = router.start_profiling(profile)
+        for component in self.components:
+            profile = component.start_profiling(profile)
+        return profile
+
+    def stop_profiling(self):
+        for router in self._profiled_routers():
+            if router.profile is not None:
+                router.stop_profiling()
+        for component in self.components:
+            component.stop_profiling()
 
 
 def add_component_hook(func):
@@ -135,6 +247,7 @@ class SeriesComponent(BaseComponent):
         # via a decorator
         self.obj_series_bindings = []
         self.add_component_hooks += self.bind_series
+        self.remove_component_hooks += self.unbind_series
 
     @add_component_hook
     def bind_series(self, component, controller=None, *args, **kwargs):
@@ -149,6 +262,18 @@ class SeriesComponent(BaseComponent):
         for series, callback in bindings:
             controller.bind(series, callback, 'series')
 
+    def unbind_series(self, component, controller=None, *args, **kwargs):
+        bindings = component.get_series_bindings()
+
+        if controller is None:
+            controller = self
+
+        if hasattr(controller, 'router'):
+            controller = getattr(controller, 'router')
+
+        for series, callback in bindings:
+            controller.unbind(series, callback, 'series')
+
     def get_series_bindings(self):
         return _get_series_bindings(self)
 
@@ -158,23 +283,33 @@ class SeriesComponent(BaseComponent):
     def get_series_provided(self):
         provided = []
         for series in self.series_provided:
-            series = self._get_series(series)
+            series = _get_series(self, series)
             provided.append(series)
         return provided 
 
 class ListeningComponent(SeriesComponent):
     """
         Handles the listeners binding to the Router
+
+        batch_listeners are bound the same way as listeners but their
+        callbacks receive a list of events. An optional third item is the
+        max number of events per call. See EventDispatcher.bind_batch
     """
+    batch_listeners = []
     # protected names
     def __init__(self):
+        self.obj_batch_listeners = []
         super(ListeningComponent, self).__init__()
 
         self.add_component_hooks += self.bind_callbacks
+        self.remove_component_hooks += self.unbind_callbacks
 
     def add_event_listener(self, event_type, callback):
         self.obj_listeners.append((event_type, callback))
 
+    def add_batch_listener(self, event_type, callback, batch_size=None):
+        self.obj_batch_listeners.append((event_type, callback, batch_size))
+
     @add_component_hook
     def bind_callbacks(self, component, controller=None, *args, **kwargs):
         """ 
@@ -192,9 +327,31 @@ class ListeningComponent(SeriesComponent):
         for event_cls, callback in callbacks:
             controller.bind(event_cls, callback, 'event')
 
+        for event_cls, callback in component.get_batch_callbacks():
+            controller.bind(event_cls, callback, 'batch')
+
+    def unbind_callbacks(self, component, controller=None, *args, **kwargs):
+        """
+        Reverse of bind_callbacks
+        """
+        if controller is None:
+            controller = self
+
+        if hasattr(controller, 'router'):
+            controller = getattr(controller, 'router')
+
+        for event_cls, callback in component.get_event_callbacks():
+            controller.unbind(event_cls, callback, 'event')
+
+        for event_cls, callback in component.get_batch_callbacks():
+            controller.unbind(event_cls, callback, 'batch')
+
     def get_event_callbacks(self):
         return _get_event_callbacks(self)
 
+    def get_batch_callbacks(self):
+        return _get_batch_callbacks(self)
+
 class PreMixComponent(ListeningComponent):
     """
     Unmixed class.
@@ -210,15 +367,13 @@ class PreMixComponent(ListeningComponent):
     def broadcast(self, event):
         if self.log_broadcast:
             self.send_log.append(event)
-        # hardcoded for speed
-        self.publish(event)
-        self.send(event)
+        self.broadcast_hooks.fire1(event)
             
     def init_internal_router(self):
         """
             Register the series and event callbacks to the internal router
         """
-        router = self._internal_router
+        router = self._internal_router = Router()
         self.bind_series(self, router)
         self.bind_callbacks(self, router)
         self._internal_router_built = True
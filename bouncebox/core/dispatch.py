@@ -2,16 +2,38 @@
     This module deals with dispatching / Queue
 """
 from collections import deque
+from functools import partial
+import inspect
 
 from bouncebox.core.errors import DispatcherNotFound
 
 import itertools
 
+# shared result for a registry miss, so misses don't allocate
+NO_CALLBACKS = ()
+
+# longest run of events a batch listener is handed, see EventDispatcher
+DEFAULT_BATCH_SIZE = 10000
+
+def fire_rows(callbacks, block):
+    """
+        Send each row of an EventBlock to callbacks that take single events.
+        Rows are only materialized when there is such a callback. Used by
+        dispatchers on their own. BounceBoxRouter delivers rows itself, see
+        BounceBoxRouter._send_rows
+    """
+    if not callbacks:
+        return
+    for event in block.events():
+        for callback in callbacks:
+            callback(event)
+
 class BaseRouter(object):
     """
     This class servers as a router
     This will only work for a single threaded app atm because of 
-    self.processing?
+    self.processing?  See bouncebox.core.threaded.ThreadedRouter for
+    feeding a router from other threads.
 
     This Router uses Queueing
 
@@ -55,22 +77,72 @@ class BaseRouter(object):
         Try to process next in queue
         """
         self.processing = True
-        while True:
-            if not message:
-                message = self.queue.popleft()
-            self.send_to_backends(message)
-            message = None
-            if len(self.queue) <= 0:
-                break
-        self.processing = False
+        try:
+            while True:
+                if message is None:
+                    message = self.queue.popleft()
+                self.send_to_backends(message)
+                message = None
+                if len(self.queue) <= 0:
+                    break
+        finally:
+            self.processing = False
 
     def add_backend(self, backend):
         self.backends.append(backend)
         self.backend_funcs.append(backend.send)
 
-    def bind(self, key, callback, exchange):
+    def flush(self):
+        """
+        Deliver anything the backends are holding back, i.e. pending
+        batch runs. Returns True if anything was delivered
+        """
+        flushed = False
+        for backend in self.backends:
+            if backend.flush():
+                flushed = True
+        return flushed
+
+    def bind(self, key, callback, exchange, index=None, key_index=None):
+        pass
+
+    def unbind(self, key, callback, exchange):
         pass
 
+class EmptyRouter(BaseRouter):
+    """
+    Shared stand-in for a router nothing has bound to yet. Sending to it
+    does nothing. Components swap in a real Router on first use, see
+    BaseComponent.router. Use the EMPTY_ROUTER instance, never mutate it.
+    """
+    def __init__(self):
+        self.backends = ()
+        self.backend_funcs = ()
+        self.queue = ()
+        self.processing = 0
+        self.logs = ()
+        self.logging = False
+        self.profile = None
+
+    def send(self, message):
+        pass
+
+    _send = send
+
+    def _immutable(self, *args, **kwargs):
+        raise Exception("EMPTY_ROUTER is shared and can't be bound to")
+
+    bind = unbind = add_backend = start_logging = _immutable
+
+    def __reduce__(self):
+        # unpickle to the same sentinel
+        return 'EMPTY_ROUTER'
+
+    def __repr__(self):
+        return 'EMPTY_ROUTER'
+
+EMPTY_ROUTER = EmptyRouter()
+
 def instance_check(message, key):
     if isinstance(message, key):
         return True
@@ -79,45 +151,286 @@ class BounceBoxRouter(BaseRouter):
     """
     TradeExpression specific router
     Changes made for speed
+
+    Frozen Mode
+    -----------
+    After wiring, freeze() swaps in a send that looks up one flat tuple of
+    callbacks per (event type, series hash) instead of going through both
+    dispatchers. Entries are compiled on first sight and the table is
+    cleared whenever bind is called.
+
+    Profiling
+    ---------
+    start_profiling() swaps in a send that times every callback into a
+    RouterProfile. Nothing is measured until then.
+
+    EventBlocks
+    -----------
+    Batch listeners get the block. The rows are then delivered one at a
+    time, each to every event and series listener, and whatever a row
+    callback broadcasts is dispatched before the next row. That is the same
+    order as sending the rows one by one.
     """
-    def __init__(self, *args, **kwargs):
-        """docstring for init"""
-        super(BounceBoxRouter, self).__init__(*args, **kwargs)
+    def __init__(self, logging=False, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        batch_size caps the runs handed to batch listeners. None is
+        unbounded, see EventDispatcher
+        """
+        super(BounceBoxRouter, self).__init__(logging=logging)
+        self.frozen = False
+        self.dispatch_table = {}
+        self.profile = None
 
-        event_dispatcher = EventDispatcher()
+        event_dispatcher = EventDispatcher(batch_size)
+        event_dispatcher.expand_rows = False
         self.event_dispatcher = event_dispatcher
         self.add_backend(event_dispatcher)
 
         series_dispatcher = SeriesDispatcher()
+        series_dispatcher.expand_rows = False
         self.series_dispatcher = series_dispatcher
         self.add_backend(series_dispatcher)
 
-    def bind(self, key, callback, exchange):
+    def bind(self, key, callback, exchange, index=None, key_index=None):
+        """
+        index is the position in key's callback list, None appends.
+        key_index is where a newly added key goes in the key order, which
+        is the order callbacks for different keys run in. Series ignore it
+        """
+        if inspect.iscoroutinefunction(callback):
+            # nothing would await the coroutine, see bouncebox.aio.AsyncRouter
+            raise TypeError("{0!r} is a coroutine function. Bind it to an "
+                            "AsyncRouter".format(callback))
+        if exchange == 'batch':
+            # batch consumers live on the event dispatcher
+            self.event_dispatcher.bind_batch(key, callback, index, key_index)
+            self.dispatch_table.clear()
+            return
         try:
             attr = exchange + '_dispatcher'
             dispatcher = getattr(self, attr)
-            dispatcher.bind(key, callback)
         except AttributeError as err:
             raise DispatcherNotFound(str(err))
+        if exchange == 'series':
+            dispatcher.bind(key, callback, index)
+        else:
+            dispatcher.bind(key, callback, index, key_index)
+        self.dispatch_table.clear()
+
+    def unbind(self, key, callback, exchange):
+        if exchange == 'batch':
+            self.event_dispatcher.unbind_batch(key, callback)
+            self.dispatch_table.clear()
+            return
+        try:
+            attr = exchange + '_dispatcher'
+            dispatcher = getattr(self, attr)
+        except AttributeError as err:
+            raise DispatcherNotFound(str(err))
+        dispatcher.unbind(key, callback)
+        self.dispatch_table.clear()
 
     def _send(self, message):
         if not self.processing:
             self.processing = True
+            try:
+                while True:
+                    # not `if not message`, an empty EventBlock is falsy
+                    if message is None:
+                        message = self.queue.popleft()
+
+                    if getattr(message, 'is_block', False):
+                        self._fire(message)
+                    else:
+                        # hard coded
+                        self.event_dispatcher.send(message)
+                        self.series_dispatcher.send(message)
+
+                    message = None
+                    if len(self.queue) <= 0:
+                        break
+            finally:
+                self.processing = False
+        else:
+            self.queue.append(message)
+
+    def freeze(self):
+        """
+        Switch to the compiled dispatch table. Call once components are wired.
+        Binding later is fine, the table is rebuilt lazily.
+        """
+        self.frozen = True
+        self.dispatch_table.clear()
+        if self.profile is not None:
+            return
+        self._send = self._send_frozen
+        if not self.logging:
+            self.send = self._send
+
+    def unfreeze(self):
+        self.frozen = False
+        self.dispatch_table.clear()
+        if self.profile is not None:
+            return
+        # drop the instance attr to get the class _send back
+        self.__dict__.pop('_send', None)
+        if not self.logging:
+            self.send = self._send
+
+    def start_profiling(self, profile=None):
+        """
+        Time every callback. Pass the same profile to several routers to
+        get nested stacks across them.
+
+        Returns the RouterProfile
+        """
+        from bouncebox.core.profile import RouterProfile
+        if profile is None:
+            profile = RouterProfile()
+        self.profile = profile
+        self._send = self._send_profile
+        if not self.logging:
+            self.send = self._send
+        return profile
+
+    def stop_profiling(self):
+        """
+        Restore the normal send. Returns the RouterProfile
+        """
+        profile = self.profile
+        self.profile = None
+        if self.frozen:
+            self._send = self._send_frozen
+        else:
+            self.__dict__.pop('_send', None)
+        if not self.logging:
+            self.send = self._send
+        return profile
+
+    def compile_callbacks(self, message):
+        """
+        Build the flat callback tuple for message's (type, series) key
+        """
+        event_dispatcher = self.event_dispatcher
+        if event_dispatcher.send == event_dispatcher.fire_callbacks:
+            callbacks = event_dispatcher.get_callbacks(message)
+        else:
+            # batch mode keeps its own state, go through the dispatcher
+            callbacks = [event_dispatcher.send]
+
+        series_callbacks = self.series_dispatcher.lookup(message.series)
+        if series_callbacks is None:
+            series_callbacks = self.series_dispatcher.get_callbacks(message)
+
+        callbacks = tuple(callbacks) + tuple(series_callbacks)
+        if getattr(message, 'is_block', False) and self._row_callbacks(message):
+            callbacks += (self._send_rows,)
+        self.dispatch_table[(type(message), message.series.series_id)] = callbacks
+        return callbacks
+
+    def _row_callbacks(self, block):
+        """
+        Event and series listeners of block's rows. Batch listeners are left
+        out, they get the block itself
+        """
+        key = ('rows', block.event_cls, block.event_series.series_id)
+        try:
+            return self.dispatch_table[key]
+        except KeyError:
+            pass
+        registry = self.event_dispatcher.callback_registry
+        callbacks = [callback for event_type in registry if issubclass(block.event_cls, event_type)
+                     for callback in registry[event_type]]
+        series_callbacks = self.series_dispatcher.lookup(block.event_series) or ()
+        callbacks = self.dispatch_table[key] = tuple(callbacks) + tuple(series_callbacks)
+        return callbacks
+
+    def _fire(self, message):
+        """
+        Call message's callbacks without going through the queue
+        """
+        try:
+            callbacks = self.dispatch_table[(type(message), message.series.series_id)]
+        except KeyError:
+            callbacks = self.compile_callbacks(message)
+        if self.profile is not None:
+            self.profile.dispatch(message, callbacks)
+            return
+        for callback in callbacks:
+            callback(message)
+
+    def _send_rows(self, block):
+        """
+        Deliver block's rows one at a time. Anything queued by a row is
+        dispatched before the next row
+        """
+        callbacks = self._row_callbacks(block)
+        profile = self.profile
+        queue = self.queue
+        fire = self._fire
+        for event in block.events():
+            if profile is not None:
+                profile.dispatch(event, callbacks)
+            else:
+                for callback in callbacks:
+                    callback(event)
+            while queue:
+                fire(queue.popleft())
+
+    def _send_frozen(self, message):
+        if self.processing:
+            self.queue.append(message)
+            return
+
+        self.processing = True
+        table = self.dispatch_table
+        queue = self.queue
+        try:
             while True:
-                if not message:
-                    message = self.queue.popleft()
+                if message is None:
+                    message = queue.popleft()
+
+                try:
+                    callbacks = table[(type(message), message.series.series_id)]
+                except KeyError:
+                    callbacks = self.compile_callbacks(message)
 
-                # hard coded
-                self.event_dispatcher.send(message)
-                self.series_dispatcher.send(message)
+                for callback in callbacks:
+                    callback(message)
 
                 message = None
-                if len(self.queue) <= 0:
+                if not queue:
                     break
+        finally:
+            self.processing = False
+
+    def _send_profile(self, message):
+        profile = self.profile
+        queue = self.queue
+        if self.processing:
+            queue.append(message)
+            profile.queued(len(queue))
+            return
+
+        self.processing = True
+        table = self.dispatch_table
+        try:
+            while True:
+                if message is None:
+                    message = queue.popleft()
+
+                try:
+                    callbacks = table[(type(message), message.series.series_id)]
+                except KeyError:
+                    callbacks = self.compile_callbacks(message)
 
+                profile.dispatch(message, callbacks)
+
+                message = None
+                if not queue:
+                    break
+        finally:
             self.processing = False
-        else:
-            self.queue.append(message)
 
     def __repr__(self):
         out = []
@@ -125,8 +438,13 @@ class BounceBoxRouter(BaseRouter):
         for k, v in self.event_dispatcher.callback_registry.items():
             out.append(str(k))
             out.extend(['\t' + str(callback) for callback in v])
+        for k, v in self.event_dispatcher.batch_registry.items():
+            out.append(str(k) + ' (batch)')
+            out.extend(['\t' + str(callback) for callback in v])
         out.append('SeriesDispatcher:')
         for k, v in self.series_dispatcher.callback_registry.items():
+            if not v:
+                continue
             out.append(str(k))
             out.extend(['\t' + str(callback) for callback in v])
         return '\n'.join(out)
@@ -134,7 +452,8 @@ class BounceBoxRouter(BaseRouter):
 Router = BounceBoxRouter
 
 class Backend(object):
-    pass
+    def flush(self):
+        return False
 
 class Dispatcher(Backend):
     """
@@ -147,12 +466,17 @@ class Dispatcher(Backend):
         self.callback_registry = {}
         self.send = self.fire_callbacks
         
-    def bind(self, key, callback):
+    def bind(self, key, callback, index=None, key_index=None):
         """
-        Register a listener
+        Register a listener. See BounceBoxRouter.bind for index/key_index
         """
-        lst = self.callback_registry.setdefault(key, [])
-        lst.append(callback)
+        _insert_callback(self.callback_registry, key, callback, index, key_index)
+
+    def unbind(self, key, callback):
+        """
+        Remove a listener. Raises ValueError if it was never bound
+        """
+        _remove_callback(self.callback_registry, key, callback)
 
     def send(self, message):
         """
@@ -173,12 +497,149 @@ class Dispatcher(Backend):
                     callback(message)
 
 
+def _insert_callback(registry, key, callback, index=None, key_index=None):
+    """
+        Put callback at index in registry[key]. A new key goes in at
+        key_index in the registry order. None appends for both
+    """
+    lst = registry.get(key)
+    if lst is None:
+        lst = registry[key] = []
+        if key_index is not None and key_index < len(registry) - 1:
+            items = list(registry.items())
+            items.insert(key_index, items.pop())
+            registry.clear()
+            registry.update(items)
+    if index is None:
+        lst.append(callback)
+    else:
+        lst.insert(index, callback)
+
+def _remove_callback(registry, key, callback):
+    lst = registry.get(key, [])
+    lst.remove(callback)
+    if not lst:
+        del registry[key]
+
+def _cache_key_matches(event_type, key):
+    """
+        Whether cached entries for event_type depend on callbacks bound to key
+    """
+    if getattr(event_type, 'is_block', False):
+        event_type = event_type.event_cls
+    return issubclass(event_type, key)
+
+class BatchCallback(object):
+    """
+        Batch listener that wants runs of at most batch_size events.
+        Compares equal to the wrapped callback so unbind works with either
+    """
+    __slots__ = ('func', 'batch_size')
+
+    def __init__(self, func, batch_size):
+        self.func = func
+        self.batch_size = batch_size
+
+    def __call__(self, events):
+        return self.func(events)
+
+    def __eq__(self, other):
+        if isinstance(other, BatchCallback):
+            other = other.func
+        return self.func == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.func)
+
+    def __repr__(self):
+        return 'BatchCallback({0!r}, {1})'.format(self.func, self.batch_size)
+
 class EventDispatcher(Dispatcher):
-    """ Optimized for event dispatching """
-    def __init__(self):
+    """ Optimized for event dispatching
+
+    Batch Mode
+    ----------
+    Callbacks bound with bind_batch receive contiguous runs of same-type
+    events as a list instead of one call per event. A run is delivered
+    before any event of a different type is dispatched, when it reaches
+    batch_size, or on flush(). Batch mode is opt-in. send is only swapped
+    to fire_callbacks_batched once a batch callback is bound.
+
+    A listener wrapped in BatchCallback can ask for a smaller batch_size.
+    Runs are then cut at the smallest size any listener asked for.
+    """
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
         super(EventDispatcher, self).__init__(None)
         self.cache_callback_registry = {}
 
+        self._batch_size = batch_size
+        # batch_size or less, see _update_run_size
+        self.run_size = batch_size
+        self.batch_registry = {}
+        self.cache_batch_registry = {}
+        self.pending = []
+        self.pending_type = None
+        self.pending_callbacks = []
+        # hand block rows to the regular callbacks via fire_rows
+        self.expand_rows = True
+
+    def bind_batch(self, key, callback, index=None, key_index=None):
+        """
+        Register a batch listener. callback will be called with a list
+        of events, or with the EventBlock itself for blocks
+        """
+        _insert_callback(self.batch_registry, key, callback, index, key_index)
+        self.invalidate(key)
+        self._update_run_size()
+        self.send = self.fire_callbacks_batched
+
+    @property
+    def batch_size(self):
+        return self._batch_size
+
+    @batch_size.setter
+    def batch_size(self, batch_size):
+        self._batch_size = batch_size
+        self._update_run_size()
+
+    def _update_run_size(self):
+        sizes = [callback.batch_size for callbacks in self.batch_registry.values()
+                 for callback in callbacks if isinstance(callback, BatchCallback)]
+        if self.batch_size:
+            sizes.append(self.batch_size)
+        self.run_size = min(sizes) if sizes else None
+
+    def bind(self, key, callback, index=None, key_index=None):
+        super(EventDispatcher, self).bind(key, callback, index, key_index)
+        self.invalidate(key)
+
+    def unbind(self, key, callback):
+        super(EventDispatcher, self).unbind(key, callback)
+        self.invalidate(key)
+
+    def unbind_batch(self, key, callback):
+        _remove_callback(self.batch_registry, key, callback)
+        self.invalidate(key)
+        self._update_run_size()
+        if not self.batch_registry:
+            self.flush()
+            self.send = self.fire_callbacks
+
+    def invalidate(self, key):
+        """
+        Drop the cached callback lists for key and its subclasses. Those are
+        the only types whose callbacks change when key is (un)bound
+        """
+        # block entries include batch callbacks, so both caches are checked
+        for cache in (self.cache_callback_registry, self.cache_batch_registry):
+            stale = [event_type for event_type in cache
+                     if _cache_key_matches(event_type, key)]
+            for event_type in stale:
+                del cache[event_type]
+
     def fire_callbacks(self, message):
         """
             split out to let proxy registries easier  
@@ -193,32 +654,130 @@ class EventDispatcher(Dispatcher):
         for callback in callbacks:
             callback(message)
 
-    def get_callbacks(self, message):
+    def fire_callbacks_batched(self, message):
+        """
+            fire_callbacks plus batching for the batch listeners
+        """
+        event_type = type(message)
+        if event_type is not self.pending_type:
+            # end of run
+            self.flush()
+
+        self.fire_callbacks(message)
+
+        registry = self.cache_batch_registry
+        if event_type not in registry:
+            registry[event_type] = self.get_callbacks(message, self.batch_registry)
+        callbacks = registry[event_type]
+        if not callbacks:
+            return
+
+        pending = self.pending
+        if not pending:
+            self.pending_type = event_type
+            self.pending_callbacks = callbacks
+        pending.append(message)
+
+        if self.run_size and len(pending) >= self.run_size:
+            self.flush()
+
+    def flush(self):
+        """
+            Deliver the pending run to the batch listeners
+        """
+        pending = self.pending
+        if not pending:
+            return False
+        callbacks = self.pending_callbacks
+        # reset first. callbacks can broadcast and re-enter
+        self.pending = []
+        self.pending_type = None
+        self.pending_callbacks = []
+        for callback in callbacks:
+            callback(pending)
+        return True
+
+    def get_callbacks(self, message, registry=None):
         """
         Will take an eventtype and generate all the callbacks for it. Remember,
         callback registry only has callbacks for only that event_type but not
         it's ancestors. So they won't always be the same
         """
-        registry = self.callback_registry
+        if getattr(message, 'is_block', False):
+            return self.get_block_callbacks(message, registry)
+        if registry is None:
+            registry = self.callback_registry
         registries = [registry[event_type] for event_type in registry if isinstance(message, event_type)]
         callbacks = list(itertools.chain(*registries))
         return callbacks
 
+    def get_block_callbacks(self, block, registry=None):
+        """
+        Callbacks for an EventBlock. Regular callbacks for block.event_cls
+        get the rows. Batch callbacks get the block as is. Blocks are never
+        held back in a batch run.
+        """
+        if registry is self.batch_registry:
+            return []
+        event_cls = block.event_cls
+        registries = [self.callback_registry[event_type] for event_type in self.callback_registry
+                      if issubclass(event_cls, event_type)]
+        callbacks = list(itertools.chain(*registries))
+        block_callbacks = []
+        if callbacks and self.expand_rows:
+            block_callbacks.append(partial(fire_rows, callbacks))
+        registries = [self.batch_registry[event_type] for event_type in self.batch_registry
+                      if issubclass(event_cls, event_type)]
+        block_callbacks.extend(itertools.chain(*registries))
+        return block_callbacks
+
 class SeriesDispatcher(Dispatcher):
     """
-    Dispatch messages based on message type
-    Mainly based off of ListeningElement with certain extra stuff removed
+    Dispatch messages based on message series.
+
+    callback_registry is a dict keyed by the interned series_id, see
+    bouncebox.core.series.SeriesRegistry. Only bound series get an entry,
+    a miss doesn't store anything. The series themselves are kept in
+    bound_series so their ids stay registered while anything is bound.
     """
     def __init__(self):
         super(SeriesDispatcher, self).__init__(None)
         self.callback_registry = {}
-        
-    def bind(self, key, callback):
+        self.bound_series = {}
+        # see EventDispatcher.expand_rows
+        self.expand_rows = True
+
+    def _slot(self, series):
         """
-        Register a listener
+            Callback list for series, created if needed
         """
-        lst = self.callback_registry.setdefault(hash(key), [])
-        lst.append(callback)
+        series_id = series.series_id
+        lst = self.callback_registry.get(series_id)
+        if lst is None:
+            lst = self.callback_registry[series_id] = []
+            self.bound_series[series_id] = series
+        return lst
+
+    def bind(self, key, callback, index=None):
+        """
+        Register a listener at index, None appends. Like unbind, an insert
+        replaces the list
+        """
+        lst = self._slot(key)
+        if index is None:
+            lst.append(callback)
+        else:
+            self.callback_registry[key.series_id] = lst[:index] + [callback] + lst[index:]
+
+    def unbind(self, key, callback):
+        """
+        Remove a listener. The list is replaced rather than changed in
+        place, fire_callbacks may be iterating it
+        """
+        series_id = key.series_id
+        callbacks = list(self.callback_registry[series_id])
+        callbacks.remove(callback)
+        self.callback_registry[series_id] = callbacks
 
     def send(self, message):
         """
@@ -231,16 +790,32 @@ class SeriesDispatcher(Dispatcher):
         """
             split out to let proxy registries easier  
         """
-        registry = self.callback_registry
-        key = message.series._hash
-        # hash is slower
-        #key = hash(message.series)
-        try:
-            callbacks = registry[key]
-        except:
-            registry[key] = []
-            callbacks = registry[key]
+        callbacks = self.callback_registry.get(message.series.series_id)
+        if callbacks is None:
+            callbacks = self.get_callbacks(message)
 
         for callback in callbacks:
             callback(message)
 
+    def lookup(self, series):
+        """
+            Bound callbacks for series or None
+        """
+        return self.callback_registry.get(series.series_id)
+
+    def get_callbacks(self, message):
+        """
+        Only called on a registry miss, which returns a shared empty tuple.
+        EventBlocks have their own series key so the rows are passed on to
+        the callbacks of the row series. That one entry is stored.
+        """
+        if not (self.expand_rows and getattr(message, 'is_block', False)):
+            return NO_CALLBACKS
+        lst = self._slot(message.series)
+        if not lst:
+            # looked up per block so later (un)binds are picked up
+            lst.append(partial(self._fire_rows, message.event_series))
+        return lst
+
+    def _fire_rows(self, series, block):
+        fire_rows(self.callback_registry.get(series.series_id), block)
@@ -2,7 +2,7 @@ from collections import OrderedDict
 
 from bouncebox.util import Object, EventHook
 from bouncebox.core.event import Event
-from bouncebox.core.dispatch import Router
+from bouncebox.core.dispatch import Router, EMPTY_ROUTER
 
 class Element(Object):
     pass
@@ -14,7 +14,19 @@ class PublishingElement(Element):
     """
     def __init__(self):
         super(PublishingElement, self).__init__()
-        self.pubsub_router = Router()
+        # built on first subscribe
+        self._pubsub_router = EMPTY_ROUTER
+
+    @property
+    def pubsub_router(self):
+        router = self._pubsub_router
+        if router is EMPTY_ROUTER:
+            router = self._pubsub_router = Router()
+        return router
+
+    @pubsub_router.setter
+    def pubsub_router(self, router):
+        self._pubsub_router = router
 
     # Subscribe/Publish Paradigm
     def subscribe(self, callback, event_cls=None):
@@ -34,4 +46,4 @@ class PublishingElement(Element):
         """
             Note, this is called by Component.broadcast
         """
-        self.pubsub_router.send(event)
+        self._pubsub_router.send(event)
@@ -7,29 +7,47 @@ from  bouncebox.core.series import create_series
 CLASS_SERIES_CACHE = {}
 
 class Event(Object):
+    """
+        The common attributes live in slots for fast access. Events still
+        have a __dict__ so factories and filters can tack on attributes.
+        It is only allocated once something is set outside the slots.
+    """
+    __slots__ = ('generated', 'source_event', 'timestamp', 'series', '__dict__')
     repr_attrs = ['timestamp']
 
     # check __setattr__ immutable == True means immutable
     immutable = False
+    # set to False to skip the datetime.now() call per event
+    track_generated = True
+    # let bouncebox.block.build_events skip __init__
+    fast_build = False
+
+    def __init_subclass__(cls, **kwargs):
+        super(Event, cls).__init_subclass__(**kwargs)
+        # each class gets its own default series. Set here so subclasses
+        # don't inherit their parent's
+        cls._class_series = create_series(cls)
+        CLASS_SERIES_CACHE[cls] = cls._class_series
 
     def __init__(self, timestamp=None, source_event=None, series=None):
-        self.generated = datetime.now()
+        self.generated = datetime.now() if self.track_generated else None
         self.source_event = source_event
         if timestamp is None and source_event:
             timestamp = source_event.timestamp
         self.timestamp = timestamp
 
         if series is None:
-            series = self.__class__.class_series()
+            series = self._class_series
         self.series = series
-        self.immutable = True
+        # classes that default to immutable don't need the instance flag,
+        # which keeps FastEvent's __dict__ unallocated
+        if not self.immutable:
+            self.immutable = True
 
     @classmethod
     def class_series(self):
         # quick way to get default series
-        if not self in CLASS_SERIES_CACHE:
-            CLASS_SERIES_CACHE[self] = create_series(self)
-        return CLASS_SERIES_CACHE[self]
+        return self._class_series
 
     def ___setattr__(self, name, value):
         # events are immutable
@@ -37,12 +55,29 @@ class Event(Object):
             assert False, 'boo'
         super(Event, self).__setattr__(name, value) 
 
+Event._class_series = create_series(Event)
+CLASS_SERIES_CACHE[Event] = Event._class_series
+
+class FastEvent(Event):
+    """
+        Event whose fields all live in slots, so no per instance __dict__
+        gets allocated. Subclasses must declare __slots__ for their own
+        fields.
+
+        generated is opt-in via track_generated.
+
+        >>> class Tick(FastEvent):
+        ...     __slots__ = ('price',)
+    """
+    __slots__ = ()
+    track_generated = False
+    immutable = True
 
 # Would like this switchable? Eventually remove non cython version?
 try: 
     from bouncebox.core.event_cython import Event
-except:
-    print('No cython Event')
+except ImportError:
+    pass
 
 class SourceEvent(Event):
     """
@@ -52,6 +52,12 @@ def component_mixin(base, mixin, override=[]):
         base_hooks += hook
         setattr(base, 'cls_add_component_hooks', base_hooks)
 
+    if 'mixin_remove_component_hook' in mdict:
+        hook = mdict['mixin_remove_component_hook']
+        base_hooks = base.cls_remove_component_hooks.copy()
+        base_hooks += hook
+        setattr(base, 'cls_remove_component_hooks', base_hooks)
+
     mixed = []
     for key, attr in attrs: 
         if not hasattr(base, key) or key in override:
@@ -66,19 +72,75 @@ def _get_callbacks(component):
     series_bindings = component.get_series_bindings()
     return event_callbacks, series_bindings
 
+def _reflatten(component):
+    """
+        Redo the box's flatten_middleware when component's down_router
+        changed under it. See middleware.flatten_middleware
+    """
+    flattened_by = getattr(component, 'flattened_by', None)
+    if flattened_by is not None:
+        flattened_by.flatten_middleware()
+
 class BubbleDownMixin(object):
     """
         Separated out the BubbleDown logic. Essentially this Mixin allows the parent
         Component to pass events from its front.router to selected children. 
     """
+    # listen for handle_bubble_down from the start instead of on the first
+    # enable_bubble_down. Middleware exists to pass through, so it is eager
+    eager_bubble_down = False
+
     def __init__(self):
         self.bubble_down_children = []
         self.child_event_callbacks = {}
         self.child_series_bindings = {}
-
-        self.down_router = dispatch.Router()
-        # TODO, make this lazy added based on whether enable_bubble_down is called
+        # components whose down_router carries our callbacks
+        self.bubble_down_parents = []
+
+        # built on the first enable_bubble_down
+        self._down_router = dispatch.EMPTY_ROUTER
+        self._bubble_down_listening = False
+        if self.eager_bubble_down:
+            self._listen_bubble_down()
+
+    @property
+    def down_router(self):
+        router = self._down_router
+        if router is dispatch.EMPTY_ROUTER:
+            router = self._down_router = dispatch.Router()
+        return router
+
+    @down_router.setter
+    def down_router(self, router):
+        self._down_router = router
+
+    def _listen_bubble_down(self):
+        """
+            Add the catch-all handle_bubble_down listener. If we are already
+            attached, bind it directly wherever our callbacks were bound:
+            the front router and the down_router of bubble_down parents,
+            i.e. a Middleware we were add_child'ed to
+        """
+        self._bubble_down_listening = True
         self.add_event_listener(be.Event, 'handle_bubble_down')
+        callback = self.handle_bubble_down
+        if self.front is not self:
+            self.front.router.bind(be.Event, callback, 'event')
+        for parent in self.bubble_down_parents:
+            parent.down_router.bind(be.Event, callback, 'event')
+            parent.child_event_callbacks[self].append((be.Event, callback))
+            _reflatten(parent)
+
+    def _unlisten_bubble_down(self):
+        self._bubble_down_listening = False
+        self.obj_listeners.remove((be.Event, 'handle_bubble_down'))
+        callback = self.handle_bubble_down
+        if self.front is not self:
+            self.front.router.unbind(be.Event, callback, 'event')
+        for parent in self.bubble_down_parents:
+            parent.down_router.unbind(be.Event, callback, 'event')
+            parent.child_event_callbacks[self].remove((be.Event, callback))
+            _reflatten(parent)
 
     def enable_bubble_down(self, component):
         """
@@ -89,33 +151,65 @@ class BubbleDownMixin(object):
         """
         if component in self.bubble_down_children:
             raise Exception("Attempting to enable_bubble_down twice on same component")
+        if not self._bubble_down_listening:
+            self._listen_bubble_down()
         self.bubble_down_children.append(component)
         event_callbacks, series_bindings = _get_callbacks(component)
         # keep track of child callbacks
         self.child_event_callbacks[component] = event_callbacks
         self.child_series_bindings[component] = series_bindings
+        parents = getattr(component, 'bubble_down_parents', None)
+        if parents is not None:
+            parents.append(self)
 
         # bind to the down_router
         for k, callback in event_callbacks:
             self.down_router.bind(k, callback, 'event')
         for k, callback in series_bindings:
             self.down_router.bind(k, callback, 'series')
+        for k, callback in component.get_batch_callbacks():
+            self.down_router.bind(k, callback, 'batch')
+
+    def disable_bubble_down(self, component):
+        """
+            Reverse of enable_bubble_down
+        """
+        self.bubble_down_children.remove(component)
+        event_callbacks = self.child_event_callbacks.pop(component)
+        series_bindings = self.child_series_bindings.pop(component)
+        parents = getattr(component, 'bubble_down_parents', None)
+        if parents is not None:
+            parents.remove(self)
+
+        for k, callback in event_callbacks:
+            self.down_router.unbind(k, callback, 'event')
+        for k, callback in series_bindings:
+            self.down_router.unbind(k, callback, 'series')
+        for k, callback in component.get_batch_callbacks():
+            self.down_router.unbind(k, callback, 'batch')
+
+        if not self.bubble_down_children and not self.eager_bubble_down:
+            self._unlisten_bubble_down()
 
     def handle_bubble_down(self, event):
         """
             Event Handler for front.router events
         """
-        self.down_router.send(event)
+        self._down_router.send(event)
 
     def bubble_down(self, event):
         """
             Takes an event and passes it to the children as if Middleware did 
             not exist.
         """
-        self.down_router.send(event)
+        self._down_router.send(event)
 
     def mixin_add_component_hook(self, component, *args, **kwargs):
         bubble_down = kwargs.pop('bubble_down', False)
         if bubble_down:
             self.enable_bubble_down(component)
 
+    def mixin_remove_component_hook(self, component, *args, **kwargs):
+        if component in self.bubble_down_children:
+            self.disable_bubble_down(component)
+
@@ -0,0 +1,158 @@
+"""
+    Per callback profiling for Routers.
+
+    >>> profile = box.start_profiling()
+    >>> box.start_box()
+    >>> print(profile.format_table())
+    >>> profile.write_collapsed('replay.folded') # flamegraph.pl / speedscope
+
+    The same RouterProfile can be shared by many routers. Callbacks that
+    send into another profiled router nest under the caller in the
+    collapsed stacks.
+"""
+from collections import namedtuple
+from time import perf_counter_ns
+
+CallbackStats = namedtuple('CallbackStats', ['label', 'calls', 'total_ns', 'self_ns', 'max_ns'])
+
+def callback_label(callback):
+    """
+        gen_id.method for component methods, else the callable's name
+    """
+    owner = getattr(callback, '__self__', None)
+    name = getattr(callback, '__name__', None)
+    if owner is not None and name is not None:
+        owner_id = getattr(owner, 'gen_id', None)
+        if owner_id is None:
+            owner_id = type(owner).__name__
+        return '{0}.{1}'.format(owner_id, name)
+    func = getattr(callback, 'func', None) # partial
+    if func is not None:
+        return callback_label(func)
+    if name is not None:
+        return name
+    return repr(callback)
+
+class RouterProfile(object):
+    def __init__(self):
+        self.labels = {}
+        # label -> [calls, total_ns, child_ns, max_ns]
+        self.stats = {}
+        # collapsed stack -> self ns
+        self.stacks = {}
+        # event type name -> [count, ns] for events entering from the top
+        self.event_stats = {}
+        self.queue_high_water = 0
+        # frames are [stack string, child ns]
+        self.frames = []
+
+    def label(self, callback):
+        try:
+            return self.labels[callback]
+        except (KeyError, TypeError):
+            pass
+        label = callback_label(callback)
+        try:
+            self.labels[callback] = label
+        except TypeError:
+            pass
+        return label
+
+    def queued(self, depth):
+        if depth > self.queue_high_water:
+            self.queue_high_water = depth
+
+    def dispatch(self, message, callbacks):
+        """
+            Call callbacks with message, timing each one
+        """
+        frames = self.frames
+        if frames:
+            # nested router, the event was already counted by the outer one
+            nested = True
+            prefix = frames[-1][0] + ';'
+        else:
+            nested = False
+            prefix = type(message).__name__ + ';'
+
+        start = perf_counter_ns()
+        for callback in callbacks:
+            label = self.label(callback)
+            frame = [prefix + label, 0]
+            frames.append(frame)
+            t0 = perf_counter_ns()
+            try:
+                callback(message)
+            finally:
+                elapsed = perf_counter_ns() - t0
+                frames.pop()
+                self._record(label, frame, elapsed)
+        if nested:
+            return
+        elapsed = perf_counter_ns() - start
+
+        name = type(message).__name__
+        try:
+            stats = self.event_stats[name]
+        except KeyError:
+            stats = self.event_stats[name] = [0, 0]
+        stats[0] += 1
+        stats[1] += elapsed
+
+    def _record(self, label, frame, elapsed):
+        stack, child_ns = frame
+        try:
+            stats = self.stats[label]
+        except KeyError:
+            stats = self.stats[label] = [0, 0, 0, 0]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += child_ns
+        if elapsed > stats[3]:
+            stats[3] = elapsed
+
+        self.stacks[stack] = self.stacks.get(stack, 0) + elapsed - child_ns
+        if self.frames:
+            self.frames[-1][1] += elapsed
+
+    def table(self):
+        """
+            list of CallbackStats sorted by total time
+        """
+        rows = [CallbackStats(label, calls, total, total - child, max_ns)
+                for label, (calls, total, child, max_ns) in self.stats.items()]
+        rows.sort(key=lambda row: row.total_ns, reverse=True)
+        return rows
+
+    def events_per_sec(self):
+        """
+            event type name -> events/sec of dispatch time
+        """
+        rates = {}
+        for name, (count, ns) in self.event_stats.items():
+            rates[name] = count / (ns / 1e9) if ns else float('inf')
+        return rates
+
+    def format_table(self):
+        out = []
+        out.append('{0:<50} {1:>9} {2:>12} {3:>12} {4:>10}'.format(
+            'callback', 'calls', 'total ms', 'self ms', 'max us'))
+        for row in self.table():
+            out.append('{0:<50} {1:>9} {2:>12.3f} {3:>12.3f} {4:>10.1f}'.format(
+                row.label, row.calls, row.total_ns / 1e6, row.self_ns / 1e6, row.max_ns / 1e3))
+        out.append('')
+        out.append('queue high water: {0}'.format(self.queue_high_water))
+        for name, rate in sorted(self.events_per_sec().items()):
+            out.append('{0}: {1} events, {2:,.0f} events/sec'.format(
+                name, self.event_stats[name][0], rate))
+        return '\n'.join(out)
+
+    def collapsed(self):
+        """
+            Brendan Gregg collapsed stack lines. Values are self time in ns
+        """
+        return ['{0} {1}'.format(stack, ns) for stack, ns in sorted(self.stacks.items())]
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as f:
+            f.write('\n'.join(self.collapsed()) + '\n')
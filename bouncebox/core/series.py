@@ -6,15 +6,172 @@ Series Notes:
     So a Series for the 3 length MA of AAPL 1 MIN bars should always
     hash to the same value/id.
 """
-#TODO Series hash isn't crossplatform atm. per computer it is
-# the same but not guaranteed if we were to start networking
+import datetime
+import hashlib
+import itertools
+import weakref
+
 from bouncebox.util import base_repr   
 from bouncebox.util import generate_id
 
+class SeriesToken(object):
+    """
+        Handle for an interned series key. Whatever holds the token keeps
+        the registry entry, and with it series_id, alive.
+    """
+    __slots__ = ('key', 'series_id', '__weakref__')
+
+    def __init__(self, key, series_id):
+        self.key = key
+        self.series_id = series_id
+
+class SeriesRegistry(object):
+    """
+        Interns series keys to small ints, in order of first sight.
+
+        The key is the 64 bit content hash, which is the same on every
+        machine. The ids are only meaningful in this process. A series that
+        is unpickled elsewhere gets interned again there.
+
+        Entries are weak. intern returns a SeriesToken and the entry is
+        dropped once nothing holds the token, normally when the last
+        series with that key is gone. Ids come from a counter and are never
+        handed out twice, so a stale id can't match a newer series.
+    """
+    def __init__(self):
+        self.tokens = weakref.WeakValueDictionary()
+        self.counter = itertools.count()
+
+    def intern(self, key):
+        token = self.tokens.get(key)
+        if token is None:
+            token = SeriesToken(key, next(self.counter))
+            self.tokens[key] = token
+        return token
+
+    def __contains__(self, key):
+        return key in self.tokens
+
+    def __len__(self):
+        return len(self.tokens)
+
+SERIES_REGISTRY = SeriesRegistry()
+
+def _stable_number(value):
+    """
+        Numbers that compare equal get the same repr, i.e. True, 1 and 1.0
+    """
+    if isinstance(value, int):
+        return repr(int(value))
+    value = float(value)
+    if value.is_integer():
+        return repr(int(value))
+    return repr(value)
+
+def _stable_time(value):
+    """
+        Stable repr for stdlib, NumPy and pandas time values or None.
+        Values that compare equal across the libraries get the same repr.
+        Aware datetimes are converted to UTC first.
+    """
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc)
+        # pandas.Timestamp keeps nanoseconds in its isoformat
+        return 'datetime({0})'.format(value.isoformat())
+    if isinstance(value, datetime.date):
+        return 'date({0})'.format(value.isoformat())
+    if isinstance(value, datetime.time):
+        return 'time({0})'.format(value.isoformat())
+    if isinstance(value, datetime.timedelta):
+        # pandas.Timedelta.value is in ns
+        ns = getattr(value, 'value', None)
+        if ns is None:
+            ns = ((value.days * 86400 + value.seconds) * 10**6
+                  + value.microseconds) * 1000
+        return 'timedelta({0})'.format(ns)
+    if type(value).__module__ != 'numpy':
+        return None
+    kind = getattr(getattr(value, 'dtype', None), 'kind', None)
+    if kind == 'M':
+        import numpy as np
+        us = value.astype('datetime64[us]')
+        item = us.item()
+        if us == value and isinstance(item, datetime.datetime):
+            return _stable_time(item)
+        return 'datetime({0})'.format(np.datetime_as_string(value))
+    if kind == 'm':
+        return 'timedelta({0})'.format(int(value.astype('timedelta64[ns]').astype('int64')))
+    return None
+
+# process local ids for hashable values without a stable repr
+_LOCAL_IDS = {}
+_LOCAL_COUNTER = itertools.count()
+
+def _local_repr(value):
+    try:
+        local_id = _LOCAL_IDS.get(value)
+    except TypeError:
+        raise TypeError("Can't build a hash from unhashable {0!r}".format(type(value)))
+    if local_id is None:
+        local_id = _LOCAL_IDS.setdefault(value, next(_LOCAL_COUNTER))
+    return 'local({0})'.format(local_id)
+
+def _stable_repr(value):
+    """
+        repr that doesn't depend on the process, i.e. no ids or memory
+        addresses for classes
+
+        None, bool, int, float, str, bytes, classes, time values (see
+        _stable_time), tuples/lists/frozensets of those and other series
+        are stable. NumPy scalars are converted with item().
+
+        Any other hashable value gets a process local id, so it hashes
+        consistently with equality but not across processes. Unhashable
+        values raise a TypeError.
+    """
+    if value is None:
+        return 'None'
+    if isinstance(value, str):
+        return repr(str(value))
+    if isinstance(value, bytes):
+        return repr(bytes(value))
+    if isinstance(value, (int, float)):
+        return _stable_number(value)
+    if isinstance(value, type):
+        return '{0}.{1}'.format(value.__module__, value.__qualname__)
+    if isinstance(value, (tuple, list)):
+        return '(' + ', '.join(_stable_repr(v) for v in value) + ')'
+    if isinstance(value, frozenset):
+        return 'frozenset(' + ', '.join(sorted(_stable_repr(v) for v in value)) + ')'
+    if isinstance(value, EventSeries):
+        return 'series({0})'.format(hash(value))
+    time_repr = _stable_time(value)
+    if time_repr is not None:
+        return time_repr
+    if type(value).__module__ == 'numpy' and hasattr(value, 'item'):
+        item = value.item()
+        if type(item) is not type(value):
+            return _stable_repr(item)
+    return _local_repr(value)
+
+def stable_hash(attrs):
+    """
+        Deterministic 64 bit hash of a tuple of attribute values
+    """
+    digest = hashlib.blake2b(_stable_repr(attrs).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
 class EventSeries(object):
     """
         EventSeries are a series of events. 
         Basically what ties events together into groups
+
+        Equality and hashing go by the repr_attrs values (plus label_name).
+        The hash is a content hash, so it is the same across processes.
+        series_id is the interned small int id used by the SeriesDispatcher.
+        Both are computed on first use, so subclasses can finish setting up
+        their attrs after __init__.
     """
     event_cls = None
     # series args that get passed into build_event
@@ -26,9 +183,35 @@ class EventSeries(object):
     def __init__(self, event_cls=None, label_name=None):
         self.gen_id = generate_id(self)
         self.label_name = label_name
-        self._hash = None
         self.event_cls = event_cls
 
+    def __getattr__(self, name):
+        # _hash and series_id are filled in on first access. After that
+        # they are plain instance attrs, which keeps the dispatch path cheap
+        if name in ('_hash', 'series_id', '_token'):
+            self._intern()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def _intern(self):
+        key = self.generate_hash()
+        token = SERIES_REGISTRY.intern(key)
+        self.__dict__['_hash'] = key
+        # holding the token keeps series_id registered while we're alive
+        self.__dict__['_token'] = token
+        self.__dict__['series_id'] = token.series_id
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # ids are per process
+        state.pop('series_id', None)
+        state.pop('_hash', None)
+        state.pop('_token', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
     def __repr__(self):
         return base_repr(self, self.repr_attrs)
 
@@ -42,16 +225,14 @@ class EventSeries(object):
         return not self.__eq__(other)
 
     def __hash__(self):
-        if self._hash is None:
-            self._hash = self.generate_hash()
         return self._hash
 
     def generate_hash(self):
-        repr_attrs = self.repr_attrs 
+        repr_attrs = list(self.repr_attrs)
         if self.label_name:
             repr_attrs.append('label_name')
         attrs = tuple([getattr(self, name) for name in repr_attrs])
-        return hash(attrs)
+        return stable_hash(attrs)
 
 class TimeSeries(EventSeries):
     """
@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+from mock import MagicMock
+
+import bouncebox.core.box as bbox
+import bouncebox.core.component as bc
+import bouncebox.core.event as be
+from bouncebox.array import EventBroadcaster
+
+class TestEventA(be.Event):
+    pass
+
+class TestEventB(be.Event):
+    pass
+
+class TestBounceBoxMerge(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        pass
+
+    def test_chronological_merge(self):
+        """
+            Multiple sources should be merged in timestamp order
+        """
+        box = bbox.BounceBox()
+        source_a = EventBroadcaster([TestEventA(ts) for ts in [1, 4, 5, 9]])
+        source_b = EventBroadcaster([TestEventB(ts) for ts in [2, 3, 6]])
+        source_c = EventBroadcaster([TestEventA(ts) for ts in [7, 8]])
+        box.add_source(source_a)
+        box.add_source(source_b)
+        box.add_source(source_c)
+
+        comp = bc.Component()
+        comp.handler = MagicMock()
+        comp.add_event_listener(be.Event, comp.handler)
+        box.add_component(comp)
+
+        box.start_box()
+        timestamps = [args[0].timestamp for args, kwargs in comp.handler.call_args_list]
+        assert timestamps == list(range(1, 10))
+
+    def test_tie_break_source_order(self):
+        """
+            Equal timestamps should come out in the order the sources were added
+        """
+        box = bbox.BounceBox()
+        first = [TestEventA(1), TestEventA(2)]
+        second = [TestEventB(1), TestEventB(2)]
+        box.add_source(EventBroadcaster(first))
+        box.add_source(EventBroadcaster(second))
+
+        events = list(box)
+        assert events == [first[0], second[0], first[1], second[1]]
+
+    def test_exhausted_source(self):
+        """
+            An exhausted source should be dropped without ending the box
+        """
+        box = bbox.BounceBox()
+        box.end_box = MagicMock()
+        box.add_source(EventBroadcaster([]))
+        box.add_source(EventBroadcaster([TestEventA(1)]))
+        box.add_source(EventBroadcaster([TestEventB(ts) for ts in [2, 3]]))
+
+        events = list(box)
+        assert [evt.timestamp for evt in events] == [1, 2, 3]
+        assert box.end_box.call_count == 1
+
+    def test_remove_source(self):
+        """
+            A removed source should stop feeding the merge
+        """
+        box = bbox.BounceBox()
+        source_a = EventBroadcaster([TestEventA(ts) for ts in [1, 3, 5]])
+        source_b = EventBroadcaster([TestEventB(ts) for ts in [2, 4, 6]])
+        box.add_source(source_a)
+        box.add_source(source_b)
+
+        assert next(box).timestamp == 1
+        box.remove_component(source_b)
+        assert source_b not in box.sources
+        assert [evt.timestamp for evt in box] == [3, 5]
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-vvs','-x','--pdb', '--pdb-failure'],exit=False)
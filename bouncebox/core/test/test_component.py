@@ -5,6 +5,7 @@ from mock import MagicMock
 
 import bouncebox.core.component as bc
 import bouncebox.core.event as be
+from bouncebox.core.dispatch import EMPTY_ROUTER
 
 class LoggingChild(bc.BaseComponent):
     def __init__(self):
@@ -163,6 +164,82 @@ class TestBounceBoxComponent(TestCase):
         assert child.handle_a2.call_count == 1 # not called
         child.handle_b.assert_called_once_with(evt_b)
 
+    def test_batch_listener(self):
+        parent = bc.Component()
+        child = bc.Component()
+        child.add_batch_listener(TestEventA, 'handle_batch')
+        child.handle_batch = MagicMock()
+        parent.add_component(child)
+
+        evts = [TestEventA(), TestEventA()]
+        for evt in evts:
+            parent.broadcast(evt)
+        parent.broadcast(TestEventB())
+        child.handle_batch.assert_called_once_with(evts)
+
+    def test_batch_listener_size(self):
+        parent = bc.Component()
+        child = bc.Component()
+        child.add_batch_listener(TestEventA, 'handle_batch', batch_size=2)
+        child.handle_batch = MagicMock()
+        parent.add_component(child)
+
+        evts = [TestEventA() for i in range(5)]
+        for evt in evts:
+            parent.broadcast(evt)
+        parent.flush_routers()
+        calls = [c[0][0] for c in child.handle_batch.call_args_list]
+        assert calls == [evts[:2], evts[2:4], evts[4:]]
+
+    def test_flush_routers(self):
+        """
+            Pending runs on nested routers are flushed too. Unused routers
+            stay unbuilt
+        """
+        parent = bc.Component()
+        child = bc.Component()
+        grandchild = bc.Component()
+        grandchild.add_batch_listener(TestEventA, 'handle_batch')
+        grandchild.handle_batch = MagicMock()
+        parent.add_component(child)
+        child.add_component(grandchild)
+
+        evt = TestEventA()
+        grandchild.broadcast(evt)
+        assert not grandchild.handle_batch.called
+        assert parent.flush_routers()
+        grandchild.handle_batch.assert_called_once_with([evt])
+        assert not parent.flush_routers()
+        assert grandchild._router is EMPTY_ROUTER
+
+    def test_remove_component(self):
+        """
+            Hot remove a component from a parent that already sent events
+        """
+        parent = bc.Component()
+        child = bc.Component()
+        child.add_event_listener(TestEventA, 'handle_a')
+        child.handle_a = MagicMock()
+        child.add_series_binding(TestEventB.class_series(), 'handle_b')
+        child.handle_b = MagicMock()
+        parent.add_component(child)
+
+        parent.broadcast(TestEventA())
+        parent.broadcast(TestEventB())
+        parent.remove_component(child)
+        assert child not in parent.components
+        assert child.front is child
+
+        parent.broadcast(TestEventA())
+        parent.broadcast(TestEventB())
+        assert child.handle_a.call_count == 1
+        assert child.handle_b.call_count == 1
+
+        # and back again
+        parent.add_component(child)
+        parent.broadcast(TestEventA())
+        assert child.handle_a.call_count == 2
+
     def test_process_callbacks(self):
         """
             Test that process_callbacks returns the proper callbacks
@@ -177,7 +254,11 @@ class TestBounceBoxComponent(TestCase):
         child.handle_a2 = MagicMock()
 
         callbacks = child.get_event_callbacks()
-        # Component now has a default bubble_down listener...
+        assert len(callbacks) == 3
+
+        # the bubble_down listener is added with the first bubble_down child
+        child.add_component(bc.Component(), bubble_down=True)
+        callbacks = child.get_event_callbacks()
         assert len(callbacks) == 4
         for e, c in callbacks:
             if e is TestEventA:
@@ -280,6 +361,48 @@ class TestBounceBoxComponent(TestCase):
         grandparent.add_component(parent)
         parent.add_component(child) 
 
+    def test_lazy_routers(self):
+        """
+            Routers are only built once something binds to them
+        """
+        parent = bc.Component()
+        child = bc.Component()
+        assert child._router is EMPTY_ROUTER
+        assert child._down_router is EMPTY_ROUTER
+        assert child._pubsub_router is EMPTY_ROUTER
+
+        parent.add_component(child)
+        # child has nothing to bind, sending is a no-op
+        child.send(TestEventA())
+        assert child._router is EMPTY_ROUTER
+        assert parent._router is not EMPTY_ROUTER
+        self.assertRaises(Exception, EMPTY_ROUTER.bind, be.Event, MagicMock(), 'event')
+
+    def test_lazy_bubble_down(self):
+        """
+            Enabling bubble down on an attached component binds its
+            listener to the parent router. Disabling the last child unbinds
+        """
+        parent = bc.Component()
+        mid = bc.Component()
+        parent.add_component(mid)
+        registry = parent.router.event_dispatcher.callback_registry
+        assert be.Event not in registry
+
+        child = bc.Component()
+        child.handle_a = MagicMock()
+        child.add_event_listener(TestEventA, 'handle_a')
+        mid.add_component(child, bubble_down=True)
+        assert registry[be.Event] == [mid.handle_bubble_down]
+
+        evt = TestEventA()
+        parent.router.send(evt)
+        child.handle_a.assert_called_once_with(evt)
+
+        mid.remove_component(child)
+        assert not registry.get(be.Event)
+        assert mid.get_event_callbacks() == []
+
 if __name__ == '__main__':
     import nose                                                                      
     nose.runmodule(argv=[__file__,'-s','-x','--pdb', '--pdb-failure'],exit=False)   
@@ -1,7 +1,8 @@
 import unittest
 from mock import MagicMock
 
-from bouncebox.core.dispatch import Router, Dispatcher, BaseRouter
+from bouncebox.core.dispatch import (Router, Dispatcher, BaseRouter, BatchCallback,
+                                     DEFAULT_BATCH_SIZE)
 import bouncebox.core.event as be
 import bouncebox.core.event as be
 
@@ -118,6 +119,264 @@ class TestBaseRouter(unittest.TestCase):
         r.send(sevt2)
         assert r.logs[0] is sevt2
 
+class TestBindUnbind(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_bind_after_send(self):
+        """
+            Listeners bound after the first event of a type should fire
+        """
+        r = Router()
+        comp = MagicMock()
+        r.bind(be.Event, comp.handle_event, 'event')
+        r.send(SourceEvent())
+        r.send(TestEvent())
+
+        r.bind(SourceEvent, comp.handle_source_event, 'event')
+        cache = r.event_dispatcher.cache_callback_registry
+        # only the subclass entry is invalidated
+        assert SourceEvent not in cache
+        assert TestEvent in cache
+
+        sevt = SourceEvent()
+        r.send(sevt)
+        comp.handle_source_event.assert_called_once_with(sevt)
+        assert comp.handle_event.call_count == 3
+
+    def test_unbind(self):
+        r = Router()
+        comp = MagicMock()
+        r.bind(be.Event, comp.handle_event, 'event')
+        r.bind(SourceEvent.class_series(), comp.handle_series, 'series')
+        r.send(SourceEvent())
+
+        r.unbind(be.Event, comp.handle_event, 'event')
+        r.unbind(SourceEvent.class_series(), comp.handle_series, 'series')
+        assert be.Event not in r.event_dispatcher.callback_registry
+        r.send(SourceEvent())
+        assert comp.handle_event.call_count == 1
+        assert comp.handle_series.call_count == 1
+
+    def test_series_miss(self):
+        """
+            Sending on an unbound series doesn't add registry entries
+        """
+        r = Router()
+        r.send(SourceEvent())
+        r.send(TestEvent())
+        assert r.series_dispatcher.callback_registry == {}
+
+    def test_series_bind_keeps_id(self):
+        """
+            Binding to a throwaway series still matches equal series later
+        """
+        import gc
+        import bouncebox.core.series as series
+        r = Router()
+        comp = MagicMock()
+        r.bind(series.EventSeries(SourceEvent, 'throwaway'), comp.handle_series, 'series')
+        gc.collect()
+        evt = SourceEvent()
+        evt.series = series.EventSeries(SourceEvent, 'throwaway')
+        r.send(evt)
+        comp.handle_series.assert_called_once_with(evt)
+
+    def test_unbind_during_dispatch(self):
+        """
+            A series listener unbinding itself doesn't skip the next one
+        """
+        r = Router()
+        series = SourceEvent.class_series()
+        seen = []
+        def a(evt):
+            seen.append('a')
+            r.unbind(series, a, 'series')
+        def b(evt):
+            seen.append('b')
+        r.bind(series, a, 'series')
+        r.bind(series, b, 'series')
+        r.send(SourceEvent())
+        r.send(SourceEvent())
+        assert seen == ['a', 'b', 'b']
+
+    def test_unbind_missing(self):
+        r = Router()
+        try:
+            r.unbind(be.Event, MagicMock(), 'event')
+        except ValueError:
+            pass
+        else:
+            assert False, "unbinding an unknown callback should error"
+
+class TestFrozenRouter(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_freeze(self):
+        r = Router()
+        comp = MagicMock()
+        r.bind(SourceEvent, comp.handle_source_event, 'event')
+        r.bind(be.Event, comp.handle_event, 'event')
+        r.bind(SourceEvent.class_series(), comp.handle_series, 'series')
+        r.freeze()
+        assert r.send == r._send_frozen
+
+        sevt = SourceEvent()
+        r.send(sevt)
+        comp.handle_source_event.assert_called_once_with(sevt)
+        comp.handle_event.assert_called_once_with(sevt)
+        comp.handle_series.assert_called_once_with(sevt)
+        key = (SourceEvent, sevt.series.series_id)
+        assert len(r.dispatch_table[key]) == 3
+
+        evt = be.Event()
+        r.send(evt)
+        assert comp.handle_source_event.call_count == 1
+        assert comp.handle_event.call_count == 2
+        assert comp.handle_series.call_count == 1
+
+    def test_freeze_bind_invalidates(self):
+        r = Router()
+        comp = MagicMock()
+        r.bind(be.Event, comp.handle_event, 'event')
+        r.freeze()
+        r.send(SourceEvent())
+        assert r.dispatch_table
+
+        # binding after the first send should still fire
+        r.bind(SourceEvent, comp.handle_source_event, 'event')
+        assert not r.dispatch_table
+        sevt = SourceEvent()
+        r.send(sevt)
+        comp.handle_source_event.assert_called_once_with(sevt)
+
+    def test_freeze_queue(self):
+        """
+            Queued re-broadcasts work the same when frozen
+        """
+        r = Router()
+        logger = LoggingObj(r)
+        logger.handle_event = MagicMock(side_effect=logger.handle_event)
+        r.bind(SourceEvent, logger.handle_source_event, 'event')
+        r.bind(be.Event, logger.handle_event, 'event')
+        r.freeze()
+
+        r.send(SourceEvent())
+        assert logger.handle_event.call_count == 2
+        assert isinstance(logger.logs[1], TestEvent)
+
+    def test_unfreeze(self):
+        r = Router()
+        r.freeze()
+        r.unfreeze()
+        assert r.send == r._send
+        assert not r.frozen
+
+    def test_unfreeze_unfrozen(self):
+        r = Router()
+        r.unfreeze()
+        assert r.send == r._send
+
+class TestBatchDispatch(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def test_batch_runs(self):
+        """
+            Batch listeners get contiguous runs of same-type events
+        """
+        r = Router()
+        calls = []
+        r.bind(be.Event, lambda evt: calls.append(('scalar', evt)), 'event')
+        r.bind(SourceEvent, lambda evts: calls.append(('batch', evts)), 'batch')
+
+        s1, s2, s3 = SourceEvent(), SourceEvent(), SourceEvent()
+        t1 = TestEvent()
+        for evt in [s1, s2, t1, s3]:
+            r.send(evt)
+        r.flush()
+
+        # run is delivered before the TestEvent goes out
+        assert calls == [('scalar', s1), ('scalar', s2), ('batch', [s1, s2]),
+                         ('scalar', t1), ('scalar', s3), ('batch', [s3])]
+
+    def test_batch_size(self):
+        r = Router()
+        r.event_dispatcher.batch_size = 2
+        batches = []
+        r.bind(be.Event, batches.append, 'batch')
+        events = [SourceEvent() for i in range(5)]
+        for evt in events:
+            r.send(evt)
+        assert batches == [events[:2], events[2:4]]
+        r.flush()
+        assert batches[2] == events[4:]
+
+    def test_bind_index(self):
+        r = Router()
+        a, b, c = MagicMock(), MagicMock(), MagicMock()
+        r.bind(be.Event, a, 'event')
+        r.bind(be.Event, b, 'event', index=0)
+        assert r.event_dispatcher.callback_registry[be.Event] == [b, a]
+        # a new key can go ahead of the existing ones
+        r.bind(SourceEvent, c, 'event', key_index=0)
+        assert list(r.event_dispatcher.callback_registry) == [SourceEvent, be.Event]
+        assert r.event_dispatcher.get_callbacks(SourceEvent()) == [c, b, a]
+
+        series = SourceEvent.class_series()
+        r.bind(series, a, 'series')
+        r.bind(series, b, 'series', index=0)
+        assert r.series_dispatcher.lookup(series) == [b, a]
+
+    def test_default_batch_size(self):
+        """
+            A long run of one type arrives in chunks, not at end of box
+        """
+        r = Router()
+        batches = []
+        r.bind(be.Event, batches.append, 'batch')
+        count = DEFAULT_BATCH_SIZE * 2 + 5
+        for i in range(count):
+            r.send(SourceEvent())
+        assert [len(b) for b in batches] == [DEFAULT_BATCH_SIZE] * 2
+        r.flush()
+        assert len(batches[2]) == 5
+
+        r = Router(batch_size=3)
+        batches = []
+        r.bind(be.Event, batches.append, 'batch')
+        for i in range(7):
+            r.send(SourceEvent())
+        r.flush()
+        assert [len(b) for b in batches] == [3, 3, 1]
+
+    def test_batch_callback(self):
+        r = Router()
+        batches = []
+        r.bind(be.Event, BatchCallback(batches.append, 2), 'batch')
+        for i in range(5):
+            r.send(SourceEvent())
+        assert [len(b) for b in batches] == [2, 2]
+        # unbind with the bare callback drops the listener's size
+        r.unbind(be.Event, batches.append, 'batch')
+        assert r.event_dispatcher.run_size == DEFAULT_BATCH_SIZE
+
+    def test_unbind_batch(self):
+        r = Router()
+        batches = []
+        r.bind(be.Event, batches.append, 'batch')
+        r.unbind(be.Event, batches.append, 'batch')
+        assert r.event_dispatcher.send == r.event_dispatcher.fire_callbacks
+
+    def test_no_batch_listeners(self):
+        """
+            send should not be swapped unless batch mode is used
+        """
+        r = Router()
+        r.bind(be.Event, MagicMock(), 'event')
+        assert r.event_dispatcher.send == r.event_dispatcher.fire_callbacks
+
 if __name__ == '__main__':
     import nose                                                                      
     nose.runmodule(argv=[__file__,'-vvs','-x','--pdb', '--pdb-failure'],exit=False)   
@@ -11,6 +11,12 @@ class TestEventB(be.Event):
     pass
 
 
+class FastTick(be.FastEvent):
+    __slots__ = ('price',)
+    def __init__(self, timestamp=None, price=None):
+        super(FastTick, self).__init__(timestamp)
+        self.price = price
+
 class TestEvent(unittest.TestCase):
     def setUp(self):
         pass
@@ -20,7 +26,56 @@ class TestEvent(unittest.TestCase):
         # inherit and cause error
         be.Event.class_series()
         assert TestEventA.class_series().label_name != TestEventB.class_series().label_name
-         
+
+    def test_class_series_precomputed(self):
+        assert '_class_series' in TestEventA.__dict__
+        assert TestEventA().series is TestEventA.class_series()
+        assert FastTick(1).series is FastTick.class_series()
+
+    def test_track_generated(self):
+        evt = TestEventA()
+        assert evt.generated is not None
+
+        class Untracked(be.Event):
+            track_generated = False
+        assert Untracked().generated is None
+
+    def test_event_attrs(self):
+        """
+            Bare Events take extra attrs, i.e. from EventFactory
+        """
+        factory = be.EventFactory(be.Event)
+        evt = factory.build_event(1)
+        assert evt.factory is factory
+        assert evt.immutable
+        evt.whee = 1
+        assert evt.whee == 1
+
+    def test_fast_event(self):
+        tick = FastTick(1, 10.5)
+        # every field is in a slot
+        assert tick.__dict__ == {}
+        assert tick.immutable
+        assert tick.generated is None
+        assert tick.timestamp == 1
+        assert tick.price == 10.5
+        # listeners bound to Event still see it
+        assert isinstance(tick, be.Event)
+        assert issubclass(FastTick, be.Event)
+        assert not isinstance(tick, TestEventA)
+        # a real subclass, isinstance doesn't go through an ABC
+        assert be.Event in FastTick.__mro__
+        assert type(be.Event) is type
+
+    def test_fast_event_dispatch(self):
+        r = Router()
+        comp = MagicMock()
+        r.bind(be.Event, comp.handle_event, 'event')
+        r.bind(FastTick.class_series(), comp.handle_series, 'series')
+        tick = FastTick(1, 10.5)
+        r.send(tick)
+        comp.handle_event.assert_called_once_with(tick)
+        comp.handle_series.assert_called_once_with(tick)
 
 if __name__ == '__main__':
     import nose                                                                      
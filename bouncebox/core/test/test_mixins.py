@@ -61,6 +61,22 @@ class TestBubbleDownMixin(TestCase):
         # middle ware should have progated events to child
         child.handle_event.assert_called_once_with(evt)
 
+    def test_remove_bubble_down(self):
+        parent = TestBubbleDown()
+        mid = TestBubbleDown()
+        child = TestBubbleDown()
+
+        child.add_event_listener(be.Event, 'handle_event')
+        child.handle_event = MagicMock()
+
+        parent.add_component(mid)
+        mid.add_component(child, bubble_down=True)
+        mid.remove_component(child)
+        assert child not in mid.bubble_down_children
+
+        parent.broadcast(be.Event())
+        assert child.handle_event.call_count == 0
+
     def test_bubble_down_hook_error(self):
         """
         Test that you can only enable_bubble_down once
@@ -0,0 +1,127 @@
+from unittest import TestCase
+
+import bouncebox.core.api as bb
+import bouncebox.core.component as bc
+import bouncebox.core.event as be
+from bouncebox.core.dispatch import Router
+from bouncebox.middleware import Middleware
+from bouncebox.core.profile import RouterProfile, callback_label
+
+class TestEvent(be.Event):
+    pass
+
+class Echo(bc.Component):
+    listeners = [(TestEvent, 'handle_event')]
+
+    def __init__(self):
+        super(Echo, self).__init__()
+        self.count = 0
+
+    def handle_event(self, event):
+        self.count += 1
+
+class Repeater(bc.Component):
+    """ broadcasts an Event for every TestEvent """
+    listeners = [(TestEvent, 'handle_event')]
+
+    def handle_event(self, event):
+        self.broadcast(be.Event(event.timestamp))
+        self.broadcast(be.Event(event.timestamp))
+
+class TestRouterProfile(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        pass
+
+    def test_callback_stats(self):
+        router = Router()
+        comp = Echo()
+        router.bind(TestEvent, comp.handle_event, 'event')
+        profile = router.start_profiling()
+        for i in range(5):
+            router.send(TestEvent(i))
+
+        assert comp.count == 5
+        row, = profile.table()
+        assert row.label == '{0}.handle_event'.format(comp.gen_id)
+        assert row.calls == 5
+        assert row.total_ns >= row.max_ns > 0
+        assert profile.event_stats['TestEvent'][0] == 5
+        assert profile.events_per_sec()['TestEvent'] > 0
+
+    def test_stop_profiling(self):
+        router = Router()
+        comp = Echo()
+        router.bind(TestEvent, comp.handle_event, 'event')
+        profile = router.start_profiling()
+        router.send(TestEvent(1))
+        assert router.stop_profiling() is profile
+        router.send(TestEvent(2))
+        assert comp.count == 2
+        assert profile.table()[0].calls == 1
+
+        # frozen routers go back to the frozen send
+        router.freeze()
+        router.start_profiling()
+        router.stop_profiling()
+        assert router._send == router._send_frozen
+
+    def test_queue_high_water(self):
+        box = bb.BounceBox()
+        box.add_component(Repeater())
+        profile = box.start_profiling()
+        box.router.send(TestEvent(1))
+        # Repeater queues two events while the first is processing
+        assert profile.queue_high_water == 2
+        assert profile.event_stats['Event'][0] == 2
+
+    def test_nested_stacks(self):
+        """
+            Callbacks that send into another profiled router nest under
+            the caller
+        """
+        box = bb.BounceBox()
+        child = Middleware()
+        box.add_component(child)
+        echo = Echo()
+        child.add_child(echo)
+
+        profile = box.start_profiling()
+        box.router.send(TestEvent(1))
+        assert echo.count == 1
+
+        stacks = dict(line.rsplit(' ', 1) for line in profile.collapsed())
+        leaf = 'TestEvent;{0}.handle_bubble_down;{1}.handle_event'.format(child.gen_id, echo.gen_id)
+        assert leaf in stacks
+        # self time excludes the nested call
+        bubble = profile.stats['{0}.handle_bubble_down'.format(child.gen_id)]
+        assert bubble[2] > 0
+
+        box.stop_profiling()
+        assert child.down_router.profile is None
+
+    def test_format(self):
+        router = Router()
+        comp = Echo()
+        router.bind(TestEvent, comp.handle_event, 'event')
+        profile = router.start_profiling()
+        router.send(TestEvent(1))
+        text = profile.format_table()
+        assert 'handle_event' in text
+        assert 'TestEvent: 1 events' in text
+
+    def test_callback_label(self):
+        def func(event):
+            pass
+        assert callback_label(func) == 'func'
+        assert isinstance(RouterProfile().label(func), str)
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-vvs','-x','--pdb', '--pdb-failure'],exit=False)
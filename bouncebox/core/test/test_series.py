@@ -1,3 +1,8 @@
+import datetime
+import gc
+import pickle
+import subprocess
+import sys
 import unittest
 from mock import MagicMock
 
@@ -22,6 +27,129 @@ class TestEventSeries(unittest.TestCase):
         sig_b = TestEventB.class_series()
         assert sig_a != sig_b
 
+    def test_repr_attrs_not_mutated(self):
+        """
+            generate_hash used to append label_name to the class list
+        """
+        class SymbolSeries(series.EventSeries):
+            repr_attrs = ['symbol']
+            def __init__(self, symbol, label_name=None):
+                super(SymbolSeries, self).__init__(TestEventA, label_name)
+                self.symbol = symbol
+
+        a = SymbolSeries('AAPL', 'aapl')
+        hash(a)
+        hash(SymbolSeries('MSFT', 'msft'))
+        assert SymbolSeries.repr_attrs == ['symbol']
+        assert SymbolSeries('AAPL', 'aapl') == a
+        assert SymbolSeries('AAPL') != a
+        # attrs set after __init__ are part of the hash
+        assert hash(SymbolSeries('AAPL')) != hash(SymbolSeries('IBM'))
+
+    def test_series_id(self):
+        a = series.EventSeries(TestEventA, 'series_id_a')
+        b = series.EventSeries(TestEventA, 'series_id_a')
+        c = series.EventSeries(TestEventA, 'series_id_c')
+        assert a.series_id == b.series_id
+        assert a.series_id != c.series_id
+        assert series.SERIES_REGISTRY.tokens[hash(a)].series_id == a.series_id
+
+    def test_registry_release(self):
+        """
+            Registry entries go away with the series. Ids aren't reused
+        """
+        a = series.EventSeries(TestEventA, 'series_release')
+        key = hash(a)
+        series_id = a.series_id
+        assert key in series.SERIES_REGISTRY
+        del a
+        gc.collect()
+        assert key not in series.SERIES_REGISTRY
+        b = series.EventSeries(TestEventA, 'series_release')
+        assert b.series_id != series_id
+
+    def test_stable_hash(self):
+        """
+            Content hash is the same in another interpreter
+        """
+        s = series.EventSeries(TestEventA, 'stable')
+        code = ("import bouncebox.core.series as s; "
+                "print(hash(s.EventSeries(None, 'stable')))")
+        out = subprocess.check_output([sys.executable, '-c', code])
+        assert int(out) == hash(s)
+
+    def test_stable_hash_numbers(self):
+        """
+            Numbers that compare equal hash the same
+        """
+        import numpy as np
+        stable_hash = series.stable_hash
+        assert stable_hash((1,)) == stable_hash((1.0,))
+        assert stable_hash((1,)) == stable_hash((True,))
+        assert stable_hash((1,)) == stable_hash((np.int64(1),))
+        assert stable_hash((1.5,)) == stable_hash((np.float64(1.5),))
+        assert stable_hash((1,)) != stable_hash(('1',))
+
+    def test_stable_hash_nested(self):
+        inner = series.EventSeries(TestEventA, 'inner')
+        a = series.stable_hash((series.EventSeries(TestEventA, 'inner'),))
+        assert a == series.stable_hash((inner,))
+
+    def test_stable_hash_time(self):
+        """
+            Equal time values hash the same across stdlib, NumPy and pandas
+        """
+        import numpy as np
+        import pandas as pd
+        stable_hash = series.stable_hash
+        when = datetime.datetime(2020, 1, 2, 9, 30)
+        assert stable_hash((when,)) == stable_hash((pd.Timestamp(when),))
+        assert stable_hash((when,)) == stable_hash((np.datetime64(when),))
+        assert stable_hash((when,)) == stable_hash((np.datetime64(when, 'ns'),))
+        utc = when.replace(tzinfo=datetime.timezone.utc)
+        assert stable_hash((utc,)) == stable_hash((pd.Timestamp(utc).tz_convert('US/Eastern'),))
+        ns = pd.Timestamp('2020-01-02 09:30:00.000000001')
+        assert stable_hash((ns,)) == stable_hash((ns.to_datetime64(),))
+        assert stable_hash((ns,)) != stable_hash((when,))
+
+        delta = datetime.timedelta(minutes=1)
+        assert stable_hash((delta,)) == stable_hash((pd.Timedelta(delta),))
+        assert stable_hash((delta,)) == stable_hash((np.timedelta64(1, 'm'),))
+        assert stable_hash((when.date(),)) != stable_hash((when,))
+        assert stable_hash((frozenset([1, 'a']),)) == stable_hash((frozenset(['a', 1.0]),))
+
+    def test_datetime_series(self):
+        s = series.EventSeries(TestEventA, datetime.datetime(2020, 1, 2))
+        code = ("import datetime; import bouncebox.core.series as s; "
+                "print(hash(s.EventSeries(None, datetime.datetime(2020, 1, 2))))")
+        out = subprocess.check_output([sys.executable, '-c', code])
+        assert int(out) == hash(s)
+        assert s.series_id == series.EventSeries(TestEventA, datetime.datetime(2020, 1, 2)).series_id
+
+    def test_stable_hash_unknown(self):
+        """
+            Hashables without a stable repr get a process local id.
+            Unhashable values are refused
+        """
+        token = object()
+        assert series.stable_hash((token,)) == series.stable_hash((token,))
+        assert series.stable_hash((token,)) != series.stable_hash((object(),))
+        try:
+            series.stable_hash(({},))
+        except TypeError:
+            pass
+        else:
+            assert False, "dict isn't hashable"
+
+    def test_pickle(self):
+        s = series.EventSeries(TestEventA, 'pickled')
+        s.series_id
+        state = s.__getstate__()
+        assert 'series_id' not in state
+        s2 = pickle.loads(pickle.dumps(s))
+        assert s2 == s
+        assert s2.series_id == s.series_id
+
 if __name__ == '__main__':
     import nose                                                                      
     nose.runmodule(argv=[__file__,'-vvs','-x','--pdb', '--pdb-failure'],exit=False)   
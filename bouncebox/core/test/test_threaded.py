@@ -0,0 +1,160 @@
+import threading
+from unittest import TestCase
+
+import bouncebox.core.api as bb
+import bouncebox.core.event as be
+from bouncebox.core.threaded import ThreadedRouter
+
+class TestEvent(be.Event):
+    pass
+
+class Echo(bb.Component):
+    """ rebroadcasts every TestEvent as an Event """
+    listeners = [(TestEvent, 'handle_event')]
+
+    def handle_event(self, event):
+        self.broadcast(be.Event(event.timestamp))
+
+class TestThreadedRouter(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        pass
+
+    def test_many_producers(self):
+        router = ThreadedRouter()
+        seen = []
+        threads = set()
+        def handler(event):
+            seen.append(event)
+            threads.add(threading.current_thread())
+        router.bind(TestEvent, handler, 'event')
+        router.start()
+
+        def produce(offset):
+            for i in range(1000):
+                router.send(TestEvent(offset + i))
+        producers = [threading.Thread(target=produce, args=(n * 1000,)) for n in range(4)]
+        for t in producers:
+            t.start()
+        for t in producers:
+            t.join()
+        assert router.wait_idle(5)
+        dispatch_thread = router.thread
+        router.stop()
+
+        assert len(seen) == 4000
+        # everything was handled on the dispatch thread
+        assert threads == set([dispatch_thread])
+        # per producer order is kept
+        for n in range(4):
+            stamps = [evt.timestamp for evt in seen if n * 1000 <= evt.timestamp < (n+1) * 1000]
+            assert stamps == sorted(stamps)
+        metrics = router.metrics()
+        assert metrics['dispatched'] == 4000
+        assert metrics['dropped'] == 0
+
+    def test_rebroadcast_from_dispatch_thread(self):
+        """
+            Callbacks that broadcast keep the normal queued ordering
+        """
+        box = bb.BounceBox()
+        box.router = ThreadedRouter()
+        box.add_component(Echo())
+        seen = []
+        box.router.bind(be.Event, seen.append, 'event')
+        box.router.start()
+        box.router.send(TestEvent(1))
+        box.router.send(TestEvent(2))
+        box.router.wait_idle(5)
+        box.router.stop()
+        assert [(type(e), e.timestamp) for e in seen] == [
+            (TestEvent, 1), (be.Event, 1), (TestEvent, 2), (be.Event, 2)]
+
+    def test_drop_policy(self):
+        router = ThreadedRouter(capacity=10, policy='drop')
+        seen = []
+        router.bind(TestEvent, seen.append, 'event')
+        # dispatch thread not started, so the ingress fills up
+        for i in range(25):
+            router.send(TestEvent(i))
+        assert router.dropped == 15
+        assert router.high_water == 10
+        router.start()
+        router.stop()
+        assert [evt.timestamp for evt in seen] == list(range(10))
+
+    def test_block_policy(self):
+        router = ThreadedRouter(capacity=2, policy='block', timeout=0.01)
+        for i in range(3):
+            router.send(TestEvent(i))
+        # third send timed out waiting for room
+        assert router.dropped == 1
+
+        router = ThreadedRouter(capacity=2, policy='block')
+        seen = []
+        router.bind(TestEvent, seen.append, 'event')
+        router.start()
+        for i in range(100):
+            router.send(TestEvent(i))
+        router.stop()
+        assert len(seen) == 100
+        assert router.high_water <= 2
+
+    def test_callback_error(self):
+        router = ThreadedRouter()
+        def bad(event):
+            raise ValueError(event.timestamp)
+        router.bind(TestEvent, bad, 'event')
+        seen = []
+        router.bind(be.Event, seen.append, 'event')
+        router.start()
+        router.send(TestEvent(1))
+        router.send(be.Event(2))
+        router.wait_idle(5)
+        self.assertRaises(ValueError, router.stop)
+        assert [evt.timestamp for evt in seen] == [2]
+
+    def test_callback_error_keeps_queue(self):
+        """
+            Events a failing callback already broadcast are still delivered
+        """
+        router = ThreadedRouter()
+        def bad(event):
+            router.send(be.Event(10))
+            router.send(be.Event(11))
+            raise ValueError(event.timestamp)
+        router.bind(TestEvent, bad, 'event')
+        seen = []
+        router.bind(be.Event, seen.append, 'event')
+        router.start()
+        router.send(TestEvent(1))
+        assert router.wait_idle(5)
+        self.assertRaises(ValueError, router.stop)
+        # bad is bound first, so TestEvent(1) never reaches seen
+        assert [evt.timestamp for evt in seen] == [10, 11]
+
+    def test_wait_idle_timeout(self):
+        router = ThreadedRouter()
+        router.send(TestEvent(1))
+        # nothing is dispatching yet
+        assert not router.wait_idle(0.01)
+        router.start()
+        assert router.wait_idle(5)
+        router.stop()
+
+    def test_freeze_keeps_threaded_send(self):
+        router = ThreadedRouter()
+        router.freeze()
+        assert router.send == router.send_threaded
+        router.start_profiling()
+        assert router.send == router.send_threaded
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-vvs','-x','--pdb', '--pdb-failure'],exit=False)
@@ -0,0 +1,216 @@
+"""
+    Router that can be fed from many threads.
+
+    Producers append to a deque, which is safe without a lock, and a single
+    dispatch thread drains it in order through the normal Router machinery.
+    Everything downstream of the router runs on the dispatch thread, so
+    components keep the single threaded guarantees BaseRouter assumes.
+
+    >>> router = ThreadedRouter(capacity=100000, policy='drop')
+    >>> box.router = router     # before adding components
+    >>> router.start()
+    >>> feed_thread.start()     # calls router.send(event)
+    >>> router.stop()
+"""
+from collections import deque
+import threading
+
+from bouncebox.core.dispatch import Router, DEFAULT_BATCH_SIZE
+
+BLOCK = 'block'
+DROP = 'drop'
+
+class ThreadedRouter(Router):
+    """
+        Parameters
+        ----------
+        capacity : int (optional)
+            Max events waiting for the dispatch thread. None is unbounded.
+        policy : 'block' or 'drop'
+            What send does when the ingress is full. block waits for room,
+            drop discards the event and counts it in dropped.
+        timeout : float (optional)
+            Max seconds a blocked send waits before the event is dropped
+        batch_size : int (optional)
+            Longest run handed to batch listeners, see BounceBoxRouter
+
+        Sends made from the dispatch thread itself (i.e. a callback
+        broadcasting) skip the ingress and use the usual queued semantics.
+    """
+    def __init__(self, capacity=None, policy=BLOCK, timeout=None, logging=False,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        if policy not in (BLOCK, DROP):
+            raise ValueError("policy must be 'block' or 'drop'")
+        super(ThreadedRouter, self).__init__(logging=logging, batch_size=batch_size)
+        self.capacity = capacity
+        self.policy = policy
+        self.timeout = timeout
+
+        self.ingress = deque()
+        self._slots = threading.Semaphore(capacity) if capacity else None
+        self._wakeup = threading.Event()
+        # notified when the dispatch thread runs out of work, see wait_idle
+        self._idle_cond = threading.Condition()
+        self._idle = False
+        self._busy = False
+        self._running = False
+        self.thread = None
+
+        # metrics. dispatched is only touched by the dispatch thread.
+        # high_water is updated racily by producers, good enough for a max
+        self.dispatched = 0
+        self.dropped = 0
+        self.high_water = 0
+        self.errors = []
+        self._drop_lock = threading.Lock()
+
+        self.send = self.send_threaded
+
+    # the parent swaps self.send around. Keep the threaded one in front
+    def start_logging(self):
+        super(ThreadedRouter, self).start_logging()
+        self.send = self.send_threaded
+
+    def freeze(self):
+        super(ThreadedRouter, self).freeze()
+        self.send = self.send_threaded
+
+    def unfreeze(self):
+        super(ThreadedRouter, self).unfreeze()
+        self.send = self.send_threaded
+
+    def start_profiling(self, profile=None):
+        profile = super(ThreadedRouter, self).start_profiling(profile)
+        self.send = self.send_threaded
+        return profile
+
+    def stop_profiling(self):
+        profile = super(ThreadedRouter, self).stop_profiling()
+        self.send = self.send_threaded
+        return profile
+
+    def send_threaded(self, message):
+        if self.thread is threading.current_thread():
+            self._dispatch(message)
+            return
+
+        slots = self._slots
+        if slots is not None:
+            if self.policy == DROP:
+                acquired = slots.acquire(False)
+            else:
+                acquired = slots.acquire(True, self.timeout) if self.timeout is not None \
+                    else slots.acquire()
+            if not acquired:
+                with self._drop_lock:
+                    self.dropped += 1
+                return
+
+        ingress = self.ingress
+        ingress.append(message)
+        depth = len(ingress)
+        if depth > self.high_water:
+            self.high_water = depth
+        if self._idle:
+            self._wakeup.set()
+
+    def _dispatch(self, message):
+        if self.logging:
+            self.logs.append(message)
+        self._send(message)
+
+    def start(self):
+        """
+            Start the dispatch thread
+        """
+        if self.thread is not None:
+            raise Exception("ThreadedRouter already started")
+        self._running = True
+        self.thread = threading.Thread(target=self._run, name='ThreadedRouter')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        ingress = self.ingress
+        slots = self._slots
+        wakeup = self._wakeup
+        idle_cond = self._idle_cond
+        while True:
+            self._busy = True
+            try:
+                message = ingress.popleft()
+            except IndexError:
+                with idle_cond:
+                    self._busy = False
+                    idle_cond.notify_all()
+                if not self._running:
+                    break
+                wakeup.clear()
+                self._idle = True
+                # a producer may have appended before seeing _idle
+                if not ingress:
+                    wakeup.wait(0.1)
+                self._idle = False
+                continue
+
+            if slots is not None:
+                slots.release()
+            try:
+                self._dispatch(message)
+            except Exception as err:
+                # don't let one bad callback wedge the router
+                self._recover(err)
+            self.dispatched += 1
+
+    def _recover(self, err):
+        """
+            A callback raised mid dispatch. The error is kept for stop() and
+            the messages the dispatch had already queued are still sent
+        """
+        self.errors.append(err)
+        self.processing = False
+        queue = self.queue
+        while queue:
+            try:
+                self._send(queue.popleft())
+            except Exception as err:
+                self.errors.append(err)
+                self.processing = False
+
+    def wait_idle(self, timeout=None):
+        """
+            Block until everything sent so far has been dispatched. Returns
+            False on timeout
+        """
+        with self._idle_cond:
+            return self._idle_cond.wait_for(
+                lambda: not (self.ingress or self._busy), timeout)
+
+    def stop(self, drain=True):
+        """
+            Stop the dispatch thread. drain=False discards whatever is still
+            queued. Re-raises the first callback error, if any
+        """
+        if self.thread is None:
+            return
+        if not drain:
+            cleared = len(self.ingress)
+            self.ingress.clear()
+            if self._slots is not None:
+                for i in range(cleared):
+                    self._slots.release()
+        self._running = False
+        self._wakeup.set()
+        self.thread.join()
+        self.thread = None
+        if self.errors:
+            raise self.errors[0]
+
+    def metrics(self):
+        return {
+            'pending': len(self.ingress),
+            'dispatched': self.dispatched,
+            'dropped': self.dropped,
+            'high_water': self.high_water,
+            'errors': len(self.errors),
+        }
@@ -1,6 +1,10 @@
 """
     Set of tools to translate between a list of events and DataFrames
 """
+from datetime import date, datetime
+import numbers
+
+import numpy as np
 from trtools.tools.list_frame import ListFrame
 
 class EventList(ListFrame):
@@ -18,3 +22,137 @@ class EventList(ListFrame):
             test = self[0]
             attrs = test.repr_attrs
         return super(EventList, self).to_frame(attrs, repr_col)
+
+OBJECT_DTYPE = np.dtype(object)
+INT64_MIN = np.iinfo(np.int64).min
+INT64_MAX = np.iinfo(np.int64).max
+
+# dtype by value type, for types where it doesn't depend on the value
+_DTYPE_CACHE = {}
+
+def _column_dtype(value):
+    cls = type(value)
+    try:
+        return _DTYPE_CACHE[cls]
+    except KeyError:
+        pass
+    if cls is int:
+        # python ints depend on the magnitude
+        if INT64_MIN <= value <= INT64_MAX:
+            return np.dtype(np.int64)
+        return OBJECT_DTYPE
+    if isinstance(value, (datetime, date, np.datetime64)):
+        dtype = np.dtype('datetime64[ns]')
+    elif isinstance(value, (bool, np.bool_)):
+        dtype = np.dtype(bool)
+    elif isinstance(value, (numbers.Number, np.number)):
+        dtype = np.asarray(value).dtype
+    else:
+        dtype = OBJECT_DTYPE
+    _DTYPE_CACHE[cls] = dtype
+    return dtype
+
+def _promote(col, dtype):
+    """
+        col, cast so values of dtype can be stored without loss. Falls back
+        to object when there is no common numeric dtype
+    """
+    if dtype.kind == 'O':
+        return col.astype(object)
+    if np.can_cast(dtype, col.dtype, 'same_kind'):
+        return col
+    try:
+        common = np.result_type(col.dtype, dtype)
+    except TypeError:
+        return col.astype(object)
+    if common.kind not in 'biufcmM':
+        return col.astype(object)
+    return col.astype(common)
+
+class EventColumns(object):
+    """
+        Columnar store of events. Each attr is kept in a growable NumPy
+        array instead of keeping the event objects around.
+
+        Parameters
+        ----------
+        attrs : list of attr names (optional)
+            Defaults to the repr_attrs of the first event
+        length : int (optional)
+            Keep only the last length events (ring buffer)
+        capacity : int
+            Starting size of the arrays. Doubled when full
+    """
+    def __init__(self, attrs=None, length=None, capacity=1024):
+        self.attrs = list(attrs) if attrs is not None else None
+        self.length = length
+        self.capacity = length or capacity
+        self.columns = None
+        self.count = 0
+
+    def _init_columns(self, event):
+        if self.attrs is None:
+            self.attrs = list(event.repr_attrs)
+        self.columns = {}
+        for name in self.attrs:
+            dtype = _column_dtype(getattr(event, name))
+            self.columns[name] = np.empty(self.capacity, dtype=dtype)
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, col in self.columns.items():
+            new = np.empty(self.capacity, dtype=col.dtype)
+            new[:len(col)] = col
+            self.columns[name] = new
+
+    def append(self, event):
+        if self.columns is None:
+            self._init_columns(event)
+
+        pos = self.count
+        if self.length:
+            pos = pos % self.length
+        elif pos >= self.capacity:
+            self._grow()
+
+        columns = self.columns
+        for name in self.attrs:
+            value = getattr(event, name)
+            col = columns[name]
+            if col.dtype.kind != 'O':
+                # numpy's setitem casts unsafely, i.e. 100.5 into an int
+                # column is 100. Promote the column first
+                dtype = _column_dtype(value)
+                if dtype != col.dtype:
+                    col = columns[name] = _promote(col, dtype)
+            try:
+                col[pos] = value
+            except (TypeError, ValueError, OverflowError):
+                # value doesn't fit the inferred dtype, fall back to object
+                col = col.astype(object)
+                col[pos] = value
+                columns[name] = col
+        self.count += 1
+
+    def __len__(self):
+        if self.length:
+            return min(self.count, self.length)
+        return self.count
+
+    def column(self, name):
+        """
+            Column in insertion order
+        """
+        col = self.columns[name]
+        if not self.length or self.count <= self.length:
+            return col[:len(self)]
+        start = self.count % self.length
+        return np.concatenate([col[start:], col[:start]])
+
+    def to_frame(self, attrs=None):
+        import pandas as pd
+        if self.columns is None:
+            return pd.DataFrame(columns=attrs or self.attrs)
+        if attrs is None:
+            attrs = self.attrs
+        return pd.DataFrame(dict((name, self.column(name)) for name in attrs), columns=attrs)
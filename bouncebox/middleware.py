@@ -2,6 +2,31 @@ from bouncebox.util import EventHook
 import bouncebox.core.api as core
 from bouncebox.core.mixins import BubbleDownMixin
 
+def _is_series_key(key):
+    return key is not None and not isinstance(key, type)
+
+def _filter_overlaps(filter_key, key, exchange):
+    """
+        Whether a filter keyed by filter_key can see events bound to key
+    """
+    if filter_key is None:
+        return True
+    if exchange == 'series' and _is_series_key(filter_key):
+        return filter_key == key
+    # otherwise compare by event class
+    a = filter_key.event_cls if _is_series_key(filter_key) else filter_key
+    b = key.event_cls if exchange == 'series' else key
+    if a is None or b is None:
+        return True
+    return issubclass(a, b) or issubclass(b, a)
+
+def _key_matches(key, event):
+    if key is None:
+        return True
+    if isinstance(key, type):
+        return isinstance(event, key)
+    return event.series == key
+
 class MiddlewareMixin(BubbleDownMixin):
     """
         Component that does passthrough for it's children. 
@@ -20,11 +45,15 @@ class MiddlewareMixin(BubbleDownMixin):
     def __init__(self):
         self.children = []
 
-        self.down_filter = None
-        self.up_filter = None
-        # TODO support multi filters
-        #self.up_filters = []
-        #self.down_filters = []
+        # ordered (key, filter) chains per direction
+        self.down_filters = []
+        self.up_filters = []
+        # direction -> dispatch key -> tuple of filters
+        self.filter_table = {'down': {}, 'up': {}}
+        # whether the dispatch key needs the series
+        self.filter_by_series = {'down': False, 'up': False}
+        # box that flattened us. see flatten_middleware
+        self.flattened_by = None
 
     def add_child(self, component):
         """
@@ -36,6 +65,8 @@ class MiddlewareMixin(BubbleDownMixin):
         component.broadcast = self.handle_bubble_up
         self.enable_bubble_down(component)
         self.children.append(component)
+        if self.flattened_by is not None:
+            self.flattened_by.flatten_middleware()
 
     def add_component(self, component, *args, **kwargs):
         """
@@ -43,42 +74,329 @@ class MiddlewareMixin(BubbleDownMixin):
         """
         raise NotImplementedError()
 
-    def add_filter(self, filter, type='down', key=None):
-        # Eventually I'd want to have a router like system here.
-        # but for simplicity, I will have only up/down filter
+    def _filters(self, type):
         if type == 'down':
-            if self.down_filter is not None:
-                raise Exception("Middleware currently only supports one up and one down filter")
-            self.down_filter = filter
-            #self.down_filters.append((key, filter))
+            return self.down_filters
+        if type == 'up':
+            return self.up_filters
+        raise ValueError("filter type must be 'up' or 'down'")
+
+    def add_filter(self, filter, type='down', key=None):
+        """
+            Append filter to the chain for one direction.
+
+            Parameters
+            ----------
+            filter : callable
+                filter(event) returns None to drop the event, an event to
+                pass on (the same or a replacement), or a list of events to
+                fan out. The results go through the rest of the chain.
+            type : 'down' or 'up'
+                down filters events going to the children, up filters what
+                the children broadcast
+            key : Event subclass or EventSeries (optional)
+                Only run on events of that type / series. None runs on all
+        """
+        self._filters(type).append((key, filter))
+        self._filters_changed(type)
+
+    def remove_filter(self, filter, type='down'):
+        filters = self._filters(type)
+        filters[:] = [(key, f) for key, f in filters if f != filter]
+        self._filters_changed(type)
+
+    def _filters_changed(self, type):
+        self.filter_table[type].clear()
+        self.filter_by_series[type] = any(_is_series_key(key) for key, f in self._filters(type))
+        # the flattened wiring skipped us for the old filters
+        if self.flattened_by is not None:
+            self.flattened_by.flatten_middleware()
+
+    def passes_through(self, key, exchange='event'):
+        """
+            Whether callbacks bound to key can never see a down filter, so
+            they can be bound above this middleware
+        """
+        for filter_key, filter in self.down_filters:
+            if _filter_overlaps(filter_key, key, exchange):
+                return False
+        return True
+
+    def filter_chain(self, event, type='down'):
+        """
+            Tuple of the filters that run on event, in order. Cached per
+            event type (and series when some filter is keyed by series)
+        """
+        filters = self._filters(type)
+        table = self.filter_table[type]
+        if self.filter_by_series[type]:
+            dispatch_key = (event.__class__, event.series.series_id)
         else:
-            if self.up_filter is not None:
-                raise Exception("Middleware currently only supports one up and one down filter")
-            self.up_filter = filter
-            #self.up_filters.append((key, filter))
+            dispatch_key = event.__class__
+        try:
+            return table[dispatch_key]
+        except KeyError:
+            pass
+        chain = tuple(filter for key, filter in filters if _key_matches(key, event))
+        table[dispatch_key] = chain
+        return chain
+
+    def filter_event(self, event, type='down'):
+        """
+            Run event through the matching chain. Returns list of events
+        """
+        events = [event]
+        for filter in self.filter_chain(event, type):
+            out = []
+            for evt in events:
+                res = filter(evt)
+                if res is None:
+                    continue
+                if isinstance(res, (list, tuple)):
+                    out.extend(res)
+                else:
+                    out.append(res)
+            events = out
+            if not events:
+                break
+        return events
 
     def handle_bubble_down(self, event):
         """
             Event Handler for front.router events
         """
-        if self.down_filter:
-            event = self.down_filter(event)
-        self.bubble_down(event)
-
+        if not self.down_filters:
+            self.bubble_down(event)
+            return
+        for evt in self.filter_event(event, 'down'):
+            self.bubble_down(evt)
 
     def handle_bubble_up(self, event):
         """
             Handle broadcasted events from children and rebroadcast
         """
-        if self.up_filter:
-            event = self.up_filter(event)
-        self.broadcast(event)
+        if not self.up_filters:
+            self.broadcast(event)
+            return
+        for evt in self.filter_event(event, 'up'):
+            self.broadcast(evt)
 
 
 class Middleware(core.Component):
+    eager_bubble_down = True
+    wiring_attrs = core.Component.wiring_attrs + ['flattened_by']
+
     # make sure our mixin only affects this specific class
     def __init__(self, *args, **kwargs):
         super(Middleware, self).__init__(*args, **kwargs)
 
 core.component_mixin(Middleware, BubbleDownMixin)
 core.component_mixin(Middleware, MiddlewareMixin, override=['add_component', 'handle_bubble_down'])
+
+class FlatWiring(object):
+    """
+        What flatten_middleware rebound, so expand() can put it back
+    """
+    def __init__(self, root):
+        self.root = root
+        self.ops = []
+        self.middleware = []
+
+    def bind(self, router, key, callback, exchange, index=None):
+        router.bind(key, callback, exchange, index)
+        self.ops.append(('bind', router, key, callback, exchange))
+
+    def unbind(self, router, key, callback, exchange):
+        # where it was, so undoing puts it back in the same spot
+        registry, reg_key = _registry(router, key, exchange)
+        index = registry[reg_key].index(callback)
+        key_index = list(registry).index(reg_key)
+        router.unbind(key, callback, exchange)
+        self.ops.append(('unbind', router, key, callback, exchange, index, key_index))
+
+    def set_broadcast(self, component, broadcast):
+        self.ops.append(('broadcast', component, component.broadcast))
+        component.broadcast = broadcast
+
+    def _undo(self, op):
+        if op[0] == 'bind':
+            op[1].unbind(*op[2:])
+        elif op[0] == 'unbind':
+            router, key, callback, exchange, index, key_index = op[1:]
+            router.bind(key, callback, exchange, index, key_index)
+        else:
+            op[1].broadcast = op[2]
+
+    def rollback(self, mark):
+        """
+            Undo the ops made since mark, a len(self.ops)
+        """
+        ops = self.ops[mark:]
+        del self.ops[mark:]
+        for op in reversed(ops):
+            self._undo(op)
+
+    def expand(self):
+        for op in reversed(self.ops):
+            self._undo(op)
+        for mid in self.middleware:
+            mid.flattened_by = None
+        self.ops = []
+        self.middleware = []
+
+def _registry(router, key, exchange):
+    """
+        (dict, key in it) holding the callback list for key
+    """
+    if exchange == 'event':
+        return router.event_dispatcher.callback_registry, key
+    if exchange == 'batch':
+        return router.event_dispatcher.batch_registry, key
+    return router.series_dispatcher.callback_registry, key.series_id
+
+def _anchor_index(router, key, exchange, anchor):
+    """
+        Where anchor sits in router's callback list for key, so callbacks
+        moved up go in ahead of the hop they replace. None appends
+    """
+    if anchor is None or exchange != 'event':
+        return None
+    registry, reg_key = _registry(router, key, exchange)
+    callbacks = registry.get(reg_key, ())
+    if anchor not in callbacks:
+        return None
+    return callbacks.index(anchor)
+
+def _child_bindings(mid, child):
+    bindings = [(key, callback, 'event') for key, callback in mid.child_event_callbacks[child]]
+    bindings.extend((key, callback, 'series') for key, callback in mid.child_series_bindings[child])
+    bindings.extend((key, callback, 'batch') for key, callback in child.get_batch_callbacks())
+    return bindings
+
+def _flatten(wiring, mid, host, anchor):
+    """
+        Move mid's pass-through child callbacks from its down_router onto
+        host, ahead of anchor, the hop on host that delivered them so far.
+        Returns whether mid still needs its handle_bubble_down
+    """
+    wiring.middleware.append(mid)
+    mid.flattened_by = wiring.root
+    if not mid.up_filters:
+        # skip the handle_bubble_up hop. mid.broadcast is already
+        # flattened if mid is itself a child
+        for child in mid.children:
+            wiring.set_broadcast(child, mid.broadcast)
+
+    down = mid.down_router
+    remaining = False
+    for child in mid.bubble_down_children:
+        for key, callback, exchange in _child_bindings(mid, child):
+            target = host if mid.passes_through(key, exchange) else down
+            if isinstance(child, Middleware) and exchange == 'event' \
+               and callback == child.handle_bubble_down:
+                if target is down:
+                    # child's callbacks take the spot of its hop on down
+                    if not _flatten(wiring, child, down, callback):
+                        wiring.unbind(down, key, callback, exchange)
+                    remaining = True
+                    continue
+                needed = _flatten(wiring, child, host, anchor)
+                wiring.unbind(down, key, callback, exchange)
+                if needed:
+                    index = _anchor_index(host, key, exchange, anchor)
+                    wiring.bind(host, key, callback, exchange, index)
+                continue
+            if target is down:
+                remaining = True
+                continue
+            wiring.unbind(down, key, callback, exchange)
+            wiring.bind(host, key, callback, exchange, _anchor_index(host, key, exchange, anchor))
+    return remaining
+
+def _walk(component):
+    for child in component.components:
+        yield child
+        for item in _walk(child):
+            yield item
+
+def _expand_hop(callback, event_cls, series, out):
+    mid = getattr(callback, '__self__', None)
+    if not isinstance(mid, Middleware) or callback != mid.handle_bubble_down:
+        out.append(callback)
+        return
+    behind = _delivery(mid._down_router, event_cls, series)
+    if mid.passes_through(event_cls):
+        # no filter can touch the event, look through the hop
+        out.extend(behind)
+    else:
+        # the filter stays, but the order behind it has to hold too
+        out.append((callback, behind))
+
+def _delivery(router, event_cls, series):
+    """
+        Callbacks an event_cls event in series reaches through router, in
+        call order. Pass-through Middleware hops are expanded in place,
+        filtered ones become (hop, delivery behind it)
+    """
+    out = []
+    if router is core.EMPTY_ROUTER:
+        return out
+    for key, callbacks in router.event_dispatcher.callback_registry.items():
+        if issubclass(event_cls, key):
+            for callback in callbacks:
+                _expand_hop(callback, event_cls, series, out)
+    for callback in router.series_dispatcher.lookup(series) or ():
+        _expand_hop(callback, event_cls, series, out)
+    return out
+
+def _probes(routers):
+    """
+        (event class, series) pairs covering the keys bound on routers
+    """
+    probes = []
+    for router in routers:
+        for key in router.event_dispatcher.callback_registry:
+            probes.append((key, key.class_series()))
+        for series in router.series_dispatcher.bound_series.values():
+            probes.append((series.event_cls or core.Event, series))
+    return probes
+
+def _down_routers(mid):
+    yield mid._down_router
+    for child in mid.children:
+        if isinstance(child, Middleware):
+            for router in _down_routers(child):
+                yield router
+
+def flatten_middleware(root):
+    """
+        Bind the children of filterless Middleware straight onto the router
+        above, so events skip the handle_bubble_down / down_router hop. Same
+        for broadcasts and handle_bubble_up. Nested Middleware collapse onto
+        the first router that has a filter in between. Callbacks that a
+        keyed filter can't see are moved even when the Middleware has
+        filters.
+
+        Returns a FlatWiring. Use BounceBox.flatten_middleware, which keeps
+        it up to date when filters or children are added.
+
+        Flattened callbacks take the position of the hop they replace on
+        the upper router. A top level Middleware is left as is when
+        flattening would still change the order in which callbacks see an
+        event on any of the routers below it, i.e. with children bound
+        under several keys.
+    """
+    wiring = FlatWiring(root)
+    for component in list(_walk(root)):
+        if not isinstance(component, Middleware) or component.front is component:
+            continue
+        host = component.front.router
+        probes = _probes([host] + list(_down_routers(component)))
+        before = [_delivery(host, event_cls, series) for event_cls, series in probes]
+        mark = len(wiring.ops)
+        if not _flatten(wiring, component, host, component.handle_bubble_down):
+            wiring.unbind(host, core.Event, component.handle_bubble_down, 'event')
+        after = [_delivery(host, event_cls, series) for event_cls, series in probes]
+        if after != before:
+            wiring.rollback(mark)
+    return wiring
@@ -0,0 +1,395 @@
+"""
+    Run independent component subtrees of a box on separate cores.
+
+    plan_shards looks at what every top level component is bound to (event
+    types, series and provided series, including its children) and groups
+    components that overlap. Each group is a shard that can run without
+    seeing anything the other shards do.
+
+    run_sharded then moves each shard into a worker process with its own
+    BounceBox. The parent pulls the sources as usual, fans each chunk of
+    source events out to the shards whose bindings match, and merges the
+    shards' broadcasts back in timestamp order for the components that stay
+    in the parent. When the run ends the worker side state is copied back
+    onto the original component objects.
+
+    >>> box = bb.BounceBox()
+    >>> box.add_source(source)
+    >>> for symbol in symbols:
+    ...     box.add_component(Strategy(symbol))   # binds its symbol's series
+    >>> box.add_component(bb.Logger())            # listens to Event, stays put
+    >>> run_sharded(box, max_workers=4)
+
+    Components that listen to the base Event (Loggers and the like) or to
+    nothing at all stay in the parent, as do components bound to a series a
+    resident provides. Components have to be picklable.
+
+    A resident broadcast that a shard is bound to can't be delivered in
+    order, so run_sharded raises ShardError when it sees one. Events need
+    timestamps to be merged, a None timestamp raises ShardError too.
+"""
+from collections import namedtuple
+import heapq
+import multiprocessing
+import os
+
+import bouncebox.core.event as be
+from bouncebox.core.dispatch import Router
+from bouncebox.util import set_id_namespace
+
+ShardPlan = namedtuple('ShardPlan', ['shards', 'residents'])
+
+class ShardError(Exception):
+    """ A shard broadcast something another shard listens to """
+    pass
+
+class ComponentKeys(object):
+    """
+        What a component subtree listens to and provides
+    """
+    def __init__(self, events=None, series=None, provided=None):
+        self.events = set(events or [])
+        self.series = set(series or [])
+        self.provided = set(provided or [])
+
+    def __bool__(self):
+        return bool(self.events or self.series)
+
+    def update(self, other):
+        self.events |= other.events
+        self.series |= other.series
+        self.provided |= other.provided
+
+    def listens_to_everything(self):
+        return be.Event in self.events
+
+    def _series_matches(self, series, events, listened):
+        if series in listened:
+            return True
+        event_cls = getattr(series, 'event_cls', None)
+        if event_cls is None:
+            return False
+        return any(issubclass(event_cls, key) for key in events)
+
+    def overlaps(self, other):
+        for a in self.events:
+            for b in other.events:
+                if issubclass(a, b) or issubclass(b, a):
+                    return True
+        for series in self.series | self.provided:
+            if self._series_matches(series, other.events, other.series):
+                return True
+        for series in other.series | other.provided:
+            if self._series_matches(series, self.events, self.series):
+                return True
+        return False
+
+def component_keys(component):
+    """
+        Bindings of component and its children. The bubble down listener
+        is skipped, what it forwards is covered by the children
+    """
+    keys = ComponentKeys()
+    for key, callback in component.get_event_callbacks():
+        if getattr(callback, '__name__', None) == 'handle_bubble_down':
+            continue
+        keys.events.add(key)
+    for key, callback in component.get_batch_callbacks():
+        keys.events.add(key)
+    for series, callback in component.get_series_bindings():
+        keys.series.add(series)
+    keys.provided.update(component.get_series_provided())
+    for child in component.components:
+        keys.update(component_keys(child))
+    return keys
+
+def plan_shards(box):
+    """
+        Returns ShardPlan(shards, residents). shards is a list of lists of
+        components. residents stay in the parent box
+    """
+    residents = []
+    candidates = []
+    for component in box.components:
+        if component in box.sources:
+            continue
+        keys = component_keys(component)
+        if not keys or keys.listens_to_everything():
+            residents.append(component)
+        else:
+            candidates.append((component, keys))
+
+    # components fed by a resident's provided series stay with it. Repeat
+    # since those can provide series in turn
+    provided = ComponentKeys()
+    for component in residents:
+        provided.provided.update(component_keys(component).provided)
+    while True:
+        fed = [(component, keys) for component, keys in candidates if provided.overlaps(keys)]
+        if not fed:
+            break
+        for component, keys in fed:
+            candidates.remove((component, keys))
+            residents.append(component)
+            provided.provided.update(keys.provided)
+
+    # union find over overlapping bindings
+    parent = list(range(len(candidates)))
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(candidates)):
+        for j in range(i+1, len(candidates)):
+            if candidates[i][1].overlaps(candidates[j][1]):
+                parent[find(j)] = find(i)
+
+    groups = {}
+    for i, (component, keys) in enumerate(candidates):
+        groups.setdefault(find(i), []).append(component)
+    shards = [groups[root] for root in sorted(groups)]
+    return ShardPlan(shards, residents)
+
+class _Collector(object):
+    """
+        Appends each event once, even when several bindings match
+    """
+    def __init__(self, events):
+        self.events = events
+
+    def __call__(self, event):
+        events = self.events
+        if events and events[-1] is event:
+            return
+        events.append(event)
+
+def _group_bindings(components):
+    keys = ComponentKeys()
+    for component in components:
+        keys.update(component_keys(component))
+    bindings = [(key, 'event') for key in keys.events]
+    bindings.extend((series, 'series') for series in keys.series)
+    return bindings
+
+def _bind_group(router, components, callback):
+    for key, exchange in _group_bindings(components):
+        router.bind(key, callback, exchange)
+
+def _unbind_group(router, components, callback):
+    for key, exchange in _group_bindings(components):
+        router.unbind(key, callback, exchange)
+
+def _timestamp(event):
+    return event.timestamp
+
+def _check_timestamps(events, where):
+    for event in events:
+        if event.timestamp is None:
+            raise ShardError("{0!r} from {1} has no timestamp, can't merge it".format(event, where))
+
+def _shard_worker(conn):
+    """
+        Worker process loop. Runs its components in a private box and
+        returns everything they broadcast
+    """
+    from bouncebox.core.box import BounceBox
+    set_id_namespace('w{0}'.format(os.getpid()))
+    components = conn.recv()
+    box = BounceBox()
+    for component in components:
+        box.add_component(component)
+
+    broadcasts = []
+    current = [None]
+    def capture(event):
+        if event is not current[0]:
+            broadcasts.append(event)
+    box.router.bind(be.Event, capture, 'event')
+    box.router.freeze()
+    box.start_hooks.fire(be.StartEvent())
+
+    while True:
+        msg, events = conn.recv()
+        if msg == 'events':
+            for event in events:
+                current[0] = event
+                box.send(event)
+            current[0] = None
+            conn.send(broadcasts)
+            del broadcasts[:]
+        elif msg == 'end':
+            box.end_box()
+            for component in components:
+                box.remove_component(component)
+            conn.send((broadcasts, components))
+            break
+    conn.close()
+
+def merge_state(target, source):
+    """
+        Copy source's state onto target via get_state/set_state. Children
+        are merged pairwise
+    """
+    target.set_state(source.get_state())
+    for child, new_child in zip(target.components, source.components):
+        merge_state(child, new_child)
+
+def _assign_workers(shards, n_workers):
+    """
+        Spread shards over n_workers, biggest first
+    """
+    groups = [[] for i in range(n_workers)]
+    for shard in sorted(shards, key=len, reverse=True):
+        min(groups, key=len).extend(shard)
+    return [group for group in groups if group]
+
+def run_sharded(box, max_workers=None, chunk_size=10000, mp_context=None):
+    """
+        Run box with its shards in worker processes.
+
+        Parameters
+        ----------
+        box : BounceBox
+        max_workers : int (optional)
+            Defaults to the number of cores. Falls back to box.start_box()
+            when there is less than two shards or max_workers is 0/1.
+        chunk_size : int
+            Source events sent to the workers per round trip
+
+        Returns
+        -------
+        ShardPlan that was used
+    """
+    plan = plan_shards(box)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if len(plan.shards) < 2 or max_workers < 2:
+        box.start_box()
+        return plan
+
+    groups = _assign_workers(plan.shards, min(max_workers, len(plan.shards)))
+    for group in groups:
+        for component in group:
+            box.remove_component(component)
+
+    # fan out router. one collector per worker
+    fanout = Router()
+    inboxes = []
+    for group in groups:
+        inbox = []
+        inboxes.append(inbox)
+        _bind_group(fanout, group, _Collector(inbox))
+
+    # per worker routers to catch broadcasts another worker listens to
+    hits = []
+    owners = []
+    for group in groups:
+        router = Router()
+        _bind_group(router, group, _Collector(hits))
+        owners.append(router)
+
+    def check(index, events):
+        for i, router in enumerate(owners):
+            if i == index:
+                continue
+            for event in events:
+                router.send(event)
+                if hits:
+                    del hits[:]
+                    raise ShardError("{0!r} from shard {1} is bound in shard {2}".format(
+                        event, index, i))
+
+    # resident broadcasts never reach the workers. Catch the ones a shard
+    # is bound to. Everything the parent delivers itself is current
+    current = [None]
+    def resident_check(event):
+        if event is not current[0]:
+            raise ShardError("{0!r} broadcast in the parent is bound in a shard".format(event))
+    shard_components = [component for group in groups for component in group]
+    _bind_group(box.router, shard_components, resident_check)
+    checking = [True]
+    def stop_checking():
+        if checking[0]:
+            checking[0] = False
+            _unbind_group(box.router, shard_components, resident_check)
+
+    ctx = mp_context or multiprocessing.get_context()
+    workers = []
+    finished = False
+    try:
+        for group in groups:
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(target=_shard_worker, args=(child_conn,))
+            proc.daemon = True
+            proc.start()
+            child_conn.close()
+            parent_conn.send(group)
+            workers.append((proc, parent_conn))
+
+        box.router.freeze()
+        box.start_hooks.fire(be.StartEvent())
+
+        def round_trip(chunk, msg='events'):
+            for inbox in inboxes:
+                del inbox[:]
+            for event in chunk:
+                fanout.send(event)
+            active = []
+            for i, (proc, conn) in enumerate(workers):
+                if msg == 'end':
+                    conn.send(('end', None))
+                    active.append(i)
+                elif inboxes[i]:
+                    conn.send(('events', list(inboxes[i])))
+                    active.append(i)
+            results = {}
+            for i in active:
+                results[i] = workers[i][1].recv()
+            return results
+
+        def deliver(chunk, outputs):
+            for index, events in outputs.items():
+                _check_timestamps(events, 'shard {0}'.format(index))
+                check(index, events)
+            streams = [chunk] + list(outputs.values())
+            for event in heapq.merge(*streams, key=_timestamp):
+                current[0] = event
+                box.send(event)
+            current[0] = None
+
+        while True:
+            chunk = []
+            for i in range(chunk_size):
+                event = box._pop_source_event()
+                if event is None:
+                    break
+                chunk.append(event)
+            if not chunk:
+                break
+            _check_timestamps(chunk, 'the sources')
+            deliver(chunk, round_trip(chunk))
+
+        results = round_trip([], 'end')
+        deliver([], dict((i, res[0]) for i, res in results.items()))
+        stop_checking()
+        box.end_box()
+        finished = True
+    finally:
+        stop_checking()
+        for proc, conn in workers:
+            conn.close()
+            if not finished:
+                # workers are still waiting on the pipe
+                proc.terminate()
+            proc.join()
+
+    # bring the worker side state home and rewire the originals
+    for i, group in enumerate(groups):
+        for component, remote in zip(group, results[i][1]):
+            merge_state(component, remote)
+    for group in groups:
+        for component in group:
+            box.add_component(component)
+    return plan
@@ -0,0 +1,251 @@
+"""
+    On-disk, append-only event store for replay sources.
+
+    Each series is one file of fixed-width records (a NumPy structured dtype
+    whose first field is a datetime64[ns] timestamp) plus a small json
+    sidecar with the dtype and event class. Reading memory maps the file, so
+    records are never loaded up front. The timestamp field doubles as the
+    index for seeking.
+
+    >>> store = EventStore('/data/ticks')
+    >>> store.append('AAPL', block)
+    >>> source = StoreSource(store.reader('AAPL'), chunk_size=50000)
+    >>> source.seek(datetime(2012, 1, 3))
+    >>> box.add_source(source)
+"""
+import importlib
+import json
+import os
+
+import numpy as np
+
+from bouncebox.array import EventBroadcaster
+from bouncebox.block import block_class
+
+DATA_EXT = '.events'
+META_EXT = '.json'
+
+def _class_path(cls):
+    return '{0}:{1}'.format(cls.__module__, cls.__qualname__)
+
+def _load_class(path):
+    module, _, qualname = path.partition(':')
+    obj = importlib.import_module(module)
+    for name in qualname.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+def _to_ns(timestamp):
+    return np.datetime64(timestamp, 'ns')
+
+class EventStore(object):
+    """
+        Directory of series files.
+
+        Parameters
+        ----------
+        path : str
+            Created if it doesn't exist
+    """
+    def __init__(self, path):
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _paths(self, name):
+        base = os.path.join(self.path, name)
+        return base + DATA_EXT, base + META_EXT
+
+    def names(self):
+        return sorted(fn[:-len(DATA_EXT)] for fn in os.listdir(self.path)
+                      if fn.endswith(DATA_EXT))
+
+    def writer(self, name, dtype=None, event_cls=None):
+        """
+            dtype and event_cls are required the first time a series is written
+        """
+        return SeriesWriter(*self._paths(name), dtype=dtype, event_cls=event_cls)
+
+    def append(self, name, block):
+        """
+            Append an EventBlock to the series, creating it if needed
+        """
+        writer = self.writer(name, block.data.dtype, block.event_cls)
+        try:
+            writer.append(block.data)
+        finally:
+            writer.close()
+
+    def reader(self, name, event_cls=None, series=None):
+        return SeriesReader(*self._paths(name), event_cls=event_cls, series=series)
+
+class SeriesWriter(object):
+    """
+        Appends records to one series file. Timestamps must not go backwards
+    """
+    def __init__(self, data_path, meta_path, dtype=None, event_cls=None):
+        self.data_path = data_path
+        self.meta_path = meta_path
+
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            stored = np.dtype([tuple(field) for field in meta['dtype']])
+            if dtype is not None and np.dtype(dtype) != stored:
+                raise Exception("dtype does not match stored series: {0}".format(stored))
+            dtype = stored
+        else:
+            if dtype is None or event_cls is None:
+                raise Exception("New series needs a dtype and event_cls")
+            dtype = np.dtype(dtype)
+            meta = {'dtype': [(name, dtype[name].str) for name in dtype.names],
+                    'event_cls': _class_path(event_cls)}
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f)
+
+        if dtype.names[0] != 'timestamp' or dtype['timestamp'] != np.dtype('datetime64[ns]'):
+            raise Exception("First field must be a datetime64[ns] timestamp")
+
+        self.dtype = dtype
+        self.last_timestamp = self._read_last_timestamp()
+        self.file = open(data_path, 'ab')
+
+    def _read_last_timestamp(self):
+        if not os.path.exists(self.data_path):
+            return None
+        size = os.path.getsize(self.data_path)
+        count = size // self.dtype.itemsize
+        if count == 0:
+            return None
+        arr = np.memmap(self.data_path, dtype=self.dtype, mode='r', shape=(count,))
+        last = arr['timestamp'][-1]
+        del arr
+        return last
+
+    def append(self, data):
+        data = np.asarray(data)
+        if data.dtype != self.dtype:
+            data = data.astype(self.dtype)
+        if len(data) == 0:
+            return
+        timestamps = data['timestamp']
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            raise Exception("Timestamps must be sorted")
+        if self.last_timestamp is not None and timestamps[0] < self.last_timestamp:
+            raise Exception("Store is append only. Timestamps went backwards")
+        self.file.write(np.ascontiguousarray(data).tobytes())
+        self.last_timestamp = timestamps[-1]
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class SeriesReader(object):
+    """
+        Memory mapped, read-only view of one series file.
+
+        event_cls defaults to the class recorded when the series was written.
+    """
+    def __init__(self, data_path, meta_path, event_cls=None, series=None):
+        self.data_path = data_path
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self.dtype = np.dtype([tuple(field) for field in meta['dtype']])
+        if event_cls is None:
+            event_cls = _load_class(meta['event_cls'])
+        self.event_cls = event_cls
+        self.block_cls = block_class(event_cls)
+        self.series = series
+        self.refresh()
+
+    def refresh(self):
+        """
+            Remap to pick up records appended since open
+        """
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        count = size // self.dtype.itemsize
+        if count == 0:
+            self.data = np.empty(0, dtype=self.dtype)
+        else:
+            self.data = np.memmap(self.data_path, dtype=self.dtype, mode='r', shape=(count,))
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def timestamps(self):
+        return self.data['timestamp']
+
+    def searchsorted(self, timestamp, side='left'):
+        """
+            Position of the first record at or after timestamp. Binary search
+        """
+        return int(np.searchsorted(self.timestamps, _to_ns(timestamp), side=side))
+
+    def block(self, start=0, stop=None):
+        """
+            EventBlock over records [start, stop). Zero-copy view on the map
+        """
+        return self.block_cls(self.data[start:stop], series=self.series)
+
+    def iter_blocks(self, chunk_size, start=0):
+        for pos in range(start, len(self.data), chunk_size):
+            yield self.block(pos, pos+chunk_size)
+
+class StoreSource(EventBroadcaster):
+    """
+        Source component that streams a SeriesReader.
+
+        Parameters
+        ----------
+        reader : SeriesReader
+        chunk_size : int
+            Records per block
+        blocks : bool
+            True broadcasts EventBlocks. False broadcasts the row Events,
+            which keeps the box merge exact across sources at the cost of
+            building the events.
+    """
+    wiring_attrs = EventBroadcaster.wiring_attrs + ['reader']
+
+    def __init__(self, reader, chunk_size=10000, blocks=True):
+        self.reader = reader
+        self.chunk_size = chunk_size
+        self.blocks = blocks
+        self.position = 0
+        super(StoreSource, self).__init__(self._iter_from(0))
+
+    def _iter_from(self, start):
+        for block in self.reader.iter_blocks(self.chunk_size, start):
+            if not len(block):
+                continue
+            if self.blocks:
+                self.position += len(block)
+                yield block
+            else:
+                for event in block:
+                    self.position += 1
+                    yield event
+
+    def get_position(self):
+        """ records read so far """
+        return self.position
+
+    def set_position(self, position):
+        """
+            Restart the stream at record position. If the box is already
+            running, the event it prefetched from us is replaced
+        """
+        self.position = position
+        self.iter = self._iter_from(position)
+        box = self.front
+        if self in getattr(box, 'sources', ()):
+            box.reset_source(self)
+
+    def seek(self, timestamp):
+        """
+            Restart the stream at the first record at or after timestamp
+        """
+        self.set_position(self.reader.searchsorted(timestamp))
@@ -0,0 +1,158 @@
+"""
+    Run the same box wiring over a grid of parameters in a process pool.
+
+    The source data is shared with the workers instead of being pickled per
+    task. Plain ndarrays are copied once into shared memory. np.memmap arrays
+    are reopened by filename in each worker.
+
+    >>> def build_box(data, fast, slow):
+    ...     box = bb.BounceBox()
+    ...     box.add_source(bb.EventBroadcaster(make_events(data['close'])))
+    ...     box.add_component(MACross(fast, slow))
+    ...     box.add_component(bb.Logger())
+    ...     return box
+    >>> results = run_sweep(build_box, {'fast': [5, 10], 'slow': [20, 50]},
+    ...                     data={'close': close})
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import itertools
+import os
+
+import numpy as np
+
+from bouncebox.util import set_id_namespace
+
+SweepResult = namedtuple('SweepResult', ['params', 'logs'])
+
+def expand_grid(param_grid):
+    """
+        Turn a dict of name -> values into a list of param dicts (cartesian
+        product). A list of dicts is passed through as is.
+    """
+    if isinstance(param_grid, dict):
+        names = list(param_grid.keys())
+        values = [param_grid[name] for name in names]
+        return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+    return list(param_grid)
+
+class SharedData(object):
+    """
+        Holds the read-only source arrays for a sweep.
+
+        Parent side, call share() to get picklable descriptors and close()
+        when done. Worker side, attach() rebuilds the arrays from those.
+    """
+    def __init__(self, data=None):
+        self.data = data or {}
+        self.blocks = []
+
+    def share(self):
+        descriptors = {}
+        for name, arr in self.data.items():
+            if isinstance(arr, np.memmap) and arr.filename:
+                descriptors[name] = ('memmap', arr.filename, arr.dtype.str, arr.shape, arr.offset)
+                continue
+            arr = np.ascontiguousarray(arr)
+            block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)
+            view[...] = arr
+            self.blocks.append(block)
+            descriptors[name] = ('shm', block.name, arr.dtype.str, arr.shape)
+        return descriptors
+
+    @staticmethod
+    def attach(descriptors):
+        """
+            Returns (data, handles). Keep the handles alive as long as the
+            arrays are used
+        """
+        data = {}
+        handles = []
+        for name, desc in descriptors.items():
+            if desc[0] == 'memmap':
+                _, filename, dtype, shape, offset = desc
+                arr = np.memmap(filename, dtype=dtype, mode='r', shape=shape, offset=offset)
+            else:
+                _, block_name, dtype, shape = desc
+                block = shared_memory.SharedMemory(name=block_name)
+                handles.append(block)
+                arr = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+                arr.flags.writeable = False
+            data[name] = arr
+        return data, handles
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+# per worker process state, set by _init_worker
+_WORKER_DATA = None
+_WORKER_HANDLES = None
+
+def _init_worker(descriptors):
+    global _WORKER_DATA, _WORKER_HANDLES
+    set_id_namespace('w{0}'.format(os.getpid()))
+    _WORKER_DATA, _WORKER_HANDLES = SharedData.attach(descriptors)
+
+def find_loggers(component):
+    """
+        Depth first list of Loggers under component
+    """
+    from bouncebox.util.logger import Logger
+    loggers = []
+    for child in component.components:
+        if isinstance(child, Logger):
+            loggers.append(child)
+        loggers.extend(find_loggers(child))
+    return loggers
+
+def run_replay(box_factory, data, params):
+    """
+        Build and run one box. Returns the data of every Logger in the box
+    """
+    box = box_factory(data, **params)
+    box.start_box()
+    logs = [dict(logger.data) for logger in find_loggers(box)]
+    return SweepResult(params, logs)
+
+def _run_task(box_factory, params):
+    return run_replay(box_factory, _WORKER_DATA, params)
+
+def run_sweep(box_factory, param_grid, data=None, max_workers=None, mp_context=None):
+    """
+        Parameters
+        ----------
+        box_factory : callable
+            box_factory(data, **params) -> BounceBox. Must be picklable, i.e.
+            a module level function.
+        param_grid : dict or list of dicts
+            See expand_grid
+        data : dict of name -> ndarray (optional)
+            Read-only source data shared with every run
+        max_workers : int (optional)
+            Defaults to the number of cores. 0 runs serially in process.
+        mp_context : multiprocessing context (optional)
+
+        Returns
+        -------
+        list of SweepResult in param_grid order
+    """
+    grid = expand_grid(param_grid)
+
+    if max_workers == 0:
+        return [run_replay(box_factory, data or {}, params) for params in grid]
+
+    shared = SharedData(data)
+    try:
+        descriptors = shared.share()
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                                 initializer=_init_worker,
+                                 initargs=(descriptors,)) as executor:
+            futures = [executor.submit(_run_task, box_factory, params) for params in grid]
+            return [future.result() for future in futures]
+    finally:
+        shared.close()
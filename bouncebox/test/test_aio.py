@@ -0,0 +1,178 @@
+import asyncio
+from unittest import TestCase
+
+import bouncebox.core.api as bb
+from bouncebox.aio import AsyncBounceBox, AsyncEventBroadcaster, AsyncRouter
+from bouncebox.array import EventBroadcaster
+from bouncebox.core.errors import EndOfSources
+
+class TestEvent(bb.Event):
+    pass
+
+class Derived(bb.Event):
+    pass
+
+async def feed(timestamps, delay=0):
+    for ts in timestamps:
+        await asyncio.sleep(delay)
+        yield TestEvent(ts)
+
+class Recorder(bb.Component):
+    listeners = [(bb.Event, 'handle_event')]
+
+    def __init__(self):
+        super(Recorder, self).__init__()
+        self.seen = []
+
+    def handle_event(self, event):
+        self.seen.append(event)
+
+class AsyncListener(bb.Component):
+    listeners = [(TestEvent, 'handle_event')]
+
+    def __init__(self):
+        super(AsyncListener, self).__init__()
+        self.seen = []
+
+    async def handle_event(self, event):
+        await asyncio.sleep(0)
+        self.seen.append(event.timestamp)
+        self.broadcast(Derived(event.timestamp))
+
+class TestAsyncBounceBox(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        pass
+
+    def test_merge_async_and_sync(self):
+        box = AsyncBounceBox(lateness=1)
+        box.add_source(AsyncEventBroadcaster(feed([1, 4, 5], delay=0.001)))
+        box.add_source(EventBroadcaster([TestEvent(ts) for ts in [2, 3, 6]]))
+        rec = Recorder()
+        box.add_component(rec)
+        box.start_box()
+        assert [evt.timestamp for evt in rec.seen] == [1, 2, 3, 4, 5, 6]
+
+    def test_lateness(self):
+        """
+            A stalled source only holds the others back for lateness seconds
+        """
+        async def stalled():
+            await asyncio.sleep(0.2)
+            yield TestEvent(0)
+
+        box = AsyncBounceBox(lateness=0.01)
+        box.add_source(AsyncEventBroadcaster(stalled()))
+        box.add_source(AsyncEventBroadcaster(feed([1, 2])))
+        rec = Recorder()
+        box.add_component(rec)
+        box.start_box()
+        # the late event is still delivered, just not in order
+        assert [evt.timestamp for evt in rec.seen] == [1, 2, 0]
+
+    def test_coroutine_listener(self):
+        box = AsyncBounceBox()
+        box.add_source(AsyncEventBroadcaster(feed([1, 2, 3])))
+        listener = AsyncListener()
+        rec = Recorder()
+        box.add_component(listener)
+        box.add_component(rec)
+        box.start_box()
+        assert listener.seen == [1, 2, 3]
+        # the coroutine's broadcast is routed before the next source event
+        types = [(type(evt), evt.timestamp) for evt in rec.seen]
+        assert types == [(TestEvent, 1), (Derived, 1), (TestEvent, 2),
+                         (Derived, 2), (TestEvent, 3), (Derived, 3)]
+
+    def test_unbind_coroutine(self):
+        router = AsyncRouter()
+        listener = AsyncListener()
+        router.bind(TestEvent, listener.handle_event, 'event')
+        router.unbind(TestEvent, listener.handle_event, 'event')
+        router.send(TestEvent(1))
+        assert router.pending == []
+
+    def test_coroutine_plain_router(self):
+        """
+            Routers that never await refuse coroutine functions
+        """
+        router = bb.Router()
+        listener = AsyncListener()
+        try:
+            router.bind(TestEvent, listener.handle_event, 'event')
+        except TypeError:
+            pass
+        else:
+            assert False, "Router should refuse a coroutine function"
+
+    def test_send_next(self):
+        """
+            Blocking send_next for interactive mode
+        """
+        box = AsyncBounceBox()
+        box.add_source(AsyncEventBroadcaster(feed([1, 2])))
+        listener = AsyncListener()
+        rec = Recorder()
+        box.add_component(listener)
+        box.add_component(rec)
+        box.start_box(autorun=False)
+        assert box.send_next().timestamp == 1
+        assert listener.seen == [1]
+        assert box.send_next().timestamp == 2
+        try:
+            box.send_next()
+        except EndOfSources:
+            pass
+        else:
+            assert False, "sources are exhausted"
+        assert listener.seen == [1, 2]
+        assert [evt.timestamp for evt in rec.seen] == [1, 1, 2, 2]
+
+    def test_concurrent_boxes(self):
+        boxes = []
+        recs = []
+        for i in range(3):
+            box = AsyncBounceBox()
+            box.add_source(AsyncEventBroadcaster(feed(range(5), delay=0.001)))
+            rec = Recorder()
+            box.add_component(rec)
+            boxes.append(box)
+            recs.append(rec)
+
+        async def main():
+            await asyncio.gather(*[box.run() for box in boxes])
+        asyncio.run(main())
+        for rec in recs:
+            assert [evt.timestamp for evt in rec.seen] == list(range(5))
+
+    def test_stop(self):
+        async def forever():
+            i = 0
+            while True:
+                await asyncio.sleep(0)
+                yield TestEvent(i)
+                i += 1
+
+        box = AsyncBounceBox()
+        box.add_source(AsyncEventBroadcaster(forever()))
+        rec = Recorder()
+        box.add_component(rec)
+
+        class Stopper(bb.Component):
+            listeners = [(TestEvent, 'handle_event')]
+            def handle_event(self, event):
+                if event.timestamp == 9:
+                    box.stop()
+        box.add_component(Stopper())
+        asyncio.run(box.run())
+        assert len(rec.seen) == 10
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-vvs','-x','--pdb', '--pdb-failure'],exit=False)
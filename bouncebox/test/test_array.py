@@ -0,0 +1,145 @@
+from datetime import datetime
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+import bouncebox.core.api as bc
+from bouncebox.array import FrameBroadcaster
+
+class PriceEvent(bc.Event):
+    def __init__(self, timestamp, price, volume=0):
+        super(PriceEvent, self).__init__(timestamp)
+        self.price = price
+        self.volume = volume
+
+class FastPriceEvent(bc.Event):
+    fast_build = True
+
+    def __init__(self, timestamp, price):
+        raise AssertionError("fast_build skips __init__")
+
+class Recorder(bc.Component):
+    listeners = [(PriceEvent, 'handle_price')]
+
+    def __init__(self):
+        super(Recorder, self).__init__()
+        self.seen = []
+
+    def handle_price(self, event):
+        self.seen.append(event)
+
+def make_frame(n=25):
+    index = pd.date_range('2000-01-01', periods=n, freq='min')
+    return pd.DataFrame({'close': np.arange(n, dtype=float), 'vol': np.arange(n) * 10}, index=index)
+
+class TestFrameBroadcaster(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        pass
+
+    def test_dataframe(self):
+        df = make_frame()
+        source = FrameBroadcaster(df, PriceEvent, fields={'price': 'close', 'volume': 'vol'},
+                                  chunk_size=10)
+        events = list(source)
+        assert len(events) == 25
+        assert events[0].timestamp == datetime(2000, 1, 1)
+        assert events[3].price == 3.0
+        assert events[3].volume == 30
+        assert isinstance(events[3].price, float)
+        assert events[3].series == PriceEvent.class_series()
+
+    def test_chunks(self):
+        df = make_frame()
+        source = FrameBroadcaster(df, PriceEvent, fields={'price': 'close'}, chunk_size=10)
+        assert [len(chunk) for chunk in source.iter_chunks()] == [10, 10, 5]
+
+    def test_in_box(self):
+        df = make_frame()
+        box = bc.BounceBox()
+        box.add_source(FrameBroadcaster(df, PriceEvent, fields={'price': 'close'}, chunk_size=7))
+        rec = Recorder()
+        box.add_component(rec)
+        box.start_box()
+        assert [evt.price for evt in rec.seen] == list(df['close'])
+
+    def test_start(self):
+        df = make_frame()
+        parent = bc.Component()
+        source = FrameBroadcaster(df, PriceEvent, fields={'price': 'close'}, chunk_size=7)
+        rec = Recorder()
+        parent.add_component(source)
+        parent.add_component(rec)
+        source.start()
+        assert len(rec.seen) == 25
+
+    def test_start_position(self):
+        df = make_frame(5)
+        parent = bc.Component()
+        source = FrameBroadcaster(df, PriceEvent, fields={'price': 'close'}, chunk_size=2)
+        rec = Recorder()
+        parent.add_component(source)
+        parent.add_component(rec)
+        source.set_position(3)
+        source.start()
+        assert [evt.price for evt in rec.seen] == [3.0, 4.0]
+        assert source.get_position() == 5
+
+    def test_blocks(self):
+        df = make_frame()
+        source = FrameBroadcaster(df, PriceEvent, fields={'price': 'close'},
+                                  chunk_size=10, blocks=True)
+        blocks = list(source)
+        assert [len(block) for block in blocks] == [10, 10, 5]
+        assert blocks[1]['price'][0] == 10.0
+        assert blocks[0].events()[0].price == 0.0
+
+    def test_block_position(self):
+        """
+            Positions count events in blocks mode
+        """
+        df = make_frame()
+        source = FrameBroadcaster(df, PriceEvent, fields={'price': 'close'},
+                                  chunk_size=10, blocks=True)
+        next(source)
+        assert source.get_position() == 10
+        other = FrameBroadcaster(df, PriceEvent, fields={'price': 'close'},
+                                 chunk_size=10, blocks=True)
+        other.set_position(13)
+        block = next(other)
+        assert block['price'][0] == 13.0
+        assert other.get_position() == 23
+
+        rows = FrameBroadcaster(df, PriceEvent, fields={'price': 'close'}, chunk_size=10)
+        rows.set_position(other.get_position())
+        assert next(rows).price == 23.0
+
+    def test_fast_build(self):
+        df = make_frame(5)
+        events = list(FrameBroadcaster(df, FastPriceEvent, fields={'price': 'close'}))
+        assert [evt.price for evt in events] == list(df['close'])
+        assert events[0].series is FastPriceEvent.class_series()
+
+    def test_structured_array(self):
+        data = np.zeros(5, dtype=[('timestamp', 'i8'), ('price', 'f8')])
+        data['timestamp'] = np.arange(5)
+        data['price'] = np.arange(5) * 2.
+        events = list(FrameBroadcaster(data, PriceEvent))
+        assert [evt.timestamp for evt in events] == [0, 1, 2, 3, 4]
+        assert events[4].price == 8.0
+
+    def test_dict(self):
+        data = {'timestamp': [1, 2, 3], 'price': [1.5, 2.5, 3.5]}
+        events = list(FrameBroadcaster(data, PriceEvent, fields=['price']))
+        assert [evt.price for evt in events] == [1.5, 2.5, 3.5]
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-vvs','-x','--pdb', '--pdb-failure'],exit=False)
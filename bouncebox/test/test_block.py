@@ -0,0 +1,204 @@
+from unittest import TestCase
+
+import numpy as np
+from mock import MagicMock
+
+import bouncebox.core.api as bc
+from bouncebox.array import EventBroadcaster
+from bouncebox.block import EventBlock, block_class
+
+class TickEvent(bc.Event):
+    repr_attrs = ['timestamp', 'price']
+
+class OtherEvent(bc.Event):
+    pass
+
+def make_block(n=5):
+    timestamps = np.datetime64('2000-01-01') + np.arange(n).astype('timedelta64[s]')
+    return EventBlock.from_arrays(TickEvent, timestamps, price=np.arange(n) * 1.5,
+                                  size=np.arange(n))
+
+class TestEventBlock(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        pass
+
+    def test_from_arrays(self):
+        block = make_block()
+        assert type(block) is block_class(TickEvent)
+        assert block.event_cls is TickEvent
+        assert len(block) == 5
+        assert block.data['timestamp'].dtype == np.dtype('datetime64[ns]')
+        assert block.fields == ['price', 'size']
+        assert block['price'][2] == 3.0
+
+    def test_lazy_events(self):
+        block = make_block()
+        assert block._events is None
+        evt = block[3]
+        assert isinstance(evt, TickEvent)
+        assert evt.price == 4.5
+        assert evt.size == 3
+        assert evt.series is TickEvent.class_series()
+        assert block[3] is evt # cached
+
+    def test_chunks(self):
+        block = make_block(5)
+        chunks = list(block.chunks(2))
+        assert [len(c) for c in chunks] == [2, 2, 1]
+        assert chunks[1].timestamp == block[2].timestamp
+
+    def test_router_dispatch(self):
+        """
+            Batch listeners get the block, regular listeners get rows
+        """
+        parent = bc.Component()
+        child = bc.Component()
+        child.add_batch_listener(TickEvent, 'handle_block')
+        child.handle_block = MagicMock()
+        child.add_event_listener(bc.Event, 'handle_event')
+        child.handle_event = MagicMock()
+        child.add_series_binding(TickEvent.class_series(), 'handle_series')
+        child.handle_series = MagicMock()
+        child.add_event_listener(OtherEvent, 'handle_other')
+        child.handle_other = MagicMock()
+        parent.add_component(child)
+
+        block = make_block()
+        parent.broadcast(block)
+        child.handle_block.assert_called_once_with(block)
+        assert child.handle_event.call_count == 5
+        assert child.handle_event.call_args[0][0] is block[4]
+        assert child.handle_series.call_count == 5
+        assert child.handle_other.call_count == 0
+
+    def test_no_row_listeners(self):
+        """
+            Rows should not be built when only batch listeners exist
+        """
+        parent = bc.Component()
+        # Component has a catch-all bubble down listener
+        child = bc.ListeningComponent()
+        child.add_batch_listener(TickEvent, 'handle_block')
+        child.handle_block = MagicMock()
+        parent.add_component(child)
+
+        block = make_block()
+        parent.broadcast(block)
+        child.handle_block.assert_called_once_with(block)
+        assert block._events is None
+
+    def test_broadcaster(self):
+        box = bc.BounceBox()
+        block = make_block()
+        box.add_source(EventBroadcaster(block.chunks(2)))
+        comp = bc.Component()
+        comp.add_batch_listener(TickEvent, 'handle_block')
+        comp.handle_block = MagicMock()
+        box.add_component(comp)
+        box.start_box()
+        assert comp.handle_block.call_count == 3
+
+    def test_empty_block(self):
+        """
+            An empty block doesn't wedge the router, frozen or not
+        """
+        empty = make_block(0)
+        for frozen in (False, True):
+            router = bc.Router()
+            seen = []
+            router.bind(TickEvent, seen.append, 'event')
+            if frozen:
+                router.freeze()
+            router.send(empty)
+            assert not router.processing
+            evt = TickEvent()
+            router.send(evt)
+            assert seen == [evt]
+
+    def test_box_merge_empty(self):
+        box = bc.BounceBox()
+        box.add_source(EventBroadcaster([make_block(0), make_block(2), make_block(0)]))
+        box.add_source(EventBroadcaster(make_block(0)))
+        seen = []
+        comp = bc.Component()
+        comp.add_event_listener(TickEvent, 'handle_event')
+        comp.handle_event = seen.append
+        box.add_component(comp)
+        box.start_box()
+        assert len(seen) == 2
+
+    def test_box_merge(self):
+        """
+            Events from other sources inside a block's span come out in
+            timestamp order
+        """
+        from datetime import datetime, timedelta
+        start = datetime(2000, 1, 1)
+        box = bc.BounceBox()
+        box.add_source(EventBroadcaster([make_block(5)]))
+        others = [OtherEvent(start + timedelta(seconds=1.5)),
+                  OtherEvent(start + timedelta(seconds=3))]
+        box.add_source(EventBroadcaster(others))
+        seen = []
+        comp = bc.Component()
+        comp.add_event_listener(bc.Event, 'handle_event')
+        comp.handle_event = lambda event: seen.append((type(event).__name__, event.timestamp))
+        box.add_component(comp)
+        box.start_box()
+
+        timestamps = [ts for name, ts in seen]
+        assert timestamps == sorted(timestamps)
+        # ties go to the source added first, the block
+        assert [name for name, ts in seen] == ['TickEvent', 'TickEvent', 'OtherEvent',
+                                              'TickEvent', 'TickEvent', 'OtherEvent',
+                                              'TickEvent']
+
+    def test_row_order(self):
+        """
+            Rows go out one at a time like single events. A row's
+            broadcasts come before the next row
+        """
+        box = bc.BounceBox()
+        seen = []
+        comp = bc.Component()
+        comp.add_event_listener(TickEvent, 'handle_tick')
+        comp.add_series_binding(TickEvent.class_series(), 'handle_series')
+        comp.add_event_listener(OtherEvent, 'handle_other')
+        def handle_tick(event):
+            seen.append(('tick', event.size))
+            comp.broadcast(OtherEvent(event.timestamp))
+        comp.handle_tick = handle_tick
+        comp.handle_series = lambda event: seen.append(('series', event.size))
+        comp.handle_other = lambda event: seen.append(('other', None))
+        box.add_component(comp)
+
+        box.send(make_block(2))
+        assert seen == [('tick', 0), ('series', 0), ('other', None),
+                        ('tick', 1), ('series', 1), ('other', None)]
+
+        # same in frozen mode
+        del seen[:]
+        box.router.freeze()
+        box.send(make_block(2))
+        assert seen == [('tick', 0), ('series', 0), ('other', None),
+                        ('tick', 1), ('series', 1), ('other', None)]
+
+    def test_nanoseconds(self):
+        timestamps = np.array(['2000-01-01T00:00:00.000000001',
+                               '2000-01-01T00:00:00.000000002'], dtype='datetime64[ns]')
+        block = EventBlock.from_arrays(TickEvent, timestamps, price=np.arange(2))
+        assert block[0].timestamp.nanosecond == 1
+        assert block[1].timestamp > block[0].timestamp
+        # whole microseconds stay plain datetimes
+        assert type(make_block()[0].timestamp).__name__ == 'datetime'
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-s','-x','--pdb', '--pdb-failure'],exit=False)
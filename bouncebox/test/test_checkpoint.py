@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+import bouncebox.core.api as bc
+from bouncebox.array import EventBroadcaster, FrameBroadcaster
+from bouncebox.checkpoint import load_checkpoint, walk_components
+
+class PriceEvent(bc.Event):
+    def __init__(self, timestamp, price=None):
+        super(PriceEvent, self).__init__(timestamp)
+        self.price = price
+
+class TradeEvent(bc.Event):
+    pass
+
+class Crash(Exception):
+    pass
+
+# timestamp to blow up on. Not component state, so it isn't checkpointed
+CRASH_AT = [None]
+
+class Summer(bc.Component):
+    listeners = [(PriceEvent, 'handle_price')]
+
+    def __init__(self):
+        super(Summer, self).__init__()
+        self.total = 0
+        self.seen = []
+
+    def handle_price(self, event):
+        self.total += event.price
+        self.seen.append(event.timestamp)
+        if event.timestamp % 7 == 0:
+            self.broadcast(TradeEvent(event.timestamp))
+
+class TradeCounter(bc.Component):
+    listeners = [(TradeEvent, 'handle_trade')]
+
+    def __init__(self, summer):
+        super(TradeCounter, self).__init__()
+        # reference to another component in the box
+        self.summer = summer
+        self.trades = 0
+
+    def handle_trade(self, event):
+        self.trades += 1
+        if event.timestamp == CRASH_AT[0]:
+            raise Crash()
+
+def build_box():
+    box = bc.BounceBox()
+    box.add_source(EventBroadcaster(PriceEvent(ts, 1) for ts in range(0, 100, 2)))
+    data = {'timestamp': np.arange(1, 100, 2), 'price': np.ones(50) * 10}
+    box.add_source(FrameBroadcaster(data, PriceEvent, chunk_size=8))
+    summer = Summer()
+    box.add_component(summer)
+    counter = TradeCounter(summer)
+    box.add_component(counter)
+    return box, summer, counter
+
+class TestCheckpoint(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'run.ckpt')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_resume(self):
+        full_box, full_summer, full_counter = build_box()
+        full_box.start_box()
+
+        box, summer, counter = build_box()
+        box.enable_checkpoints(self.path, every_events=10)
+        CRASH_AT[0] = 63
+        try:
+            self.assertRaises(Crash, box.start_box)
+        finally:
+            CRASH_AT[0] = None
+        assert box.checkpointer.saved == 6
+
+        box, summer, counter = build_box()
+        checkpointer = box.enable_checkpoints(self.path, every_events=10)
+        data = box.resume(self.path)
+        assert data['events_sent'] == 60
+
+        assert summer.seen == full_summer.seen
+        assert summer.total == full_summer.total
+        assert counter.trades == full_counter.trades
+        # references come back as the live components
+        assert counter.summer is summer
+        assert checkpointer.events_sent == 100
+
+    def test_state_skips_wiring(self):
+        box, summer, counter = build_box()
+        state = counter.get_state()
+        assert 'router' not in state
+        assert 'front' not in state
+        assert 'broadcast_hooks' not in state
+        assert state['summer'] is summer
+        source = box.sources[0]
+        assert 'iter' not in source.get_state()
+
+    def test_manual_checkpoint(self):
+        box, summer, counter = build_box()
+        for i in range(5):
+            box.send_next()
+        box.checkpoint(self.path)
+
+        box2, summer2, counter2 = build_box()
+        load_checkpoint(box2, self.path)
+        assert summer2.seen == [0, 1, 2, 3, 4]
+        assert [src.get_position() for src in box2.sources] == [4, 3]
+        assert next(box2).timestamp == 5
+
+    def test_walk_components(self):
+        box, summer, counter = build_box()
+        child = bc.Component()
+        summer.add_component(child)
+        paths = dict(walk_components(box))
+        assert paths[(2,)] is summer
+        assert paths[(2, 0)] is child
+
+    def test_wiring_mismatch(self):
+        box, summer, counter = build_box()
+        box.send_next()
+        box.checkpoint(self.path)
+        box2 = bc.BounceBox()
+        box2.add_source(EventBroadcaster([]))
+        self.assertRaises(Exception, load_checkpoint, box2, self.path)
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-vvs','-x','--pdb', '--pdb-failure'],exit=False)
@@ -82,6 +82,31 @@ class TestMiddleWare(TestCase):
         callback = parent.router.event_dispatcher.callback_registry[bc.Event][0] 
         assert callback == mid.handle_bubble_down
 
+    def test_child_bubble_down_later(self):
+        """
+            A child added with add_child that starts bubbling down after
+            it was added still passes events on to its own children
+        """
+        parent = bc.Component()
+        mid = middleware.Middleware()
+        parent.add_component(mid)
+        child = bc.Component()
+        mid.add_child(child)
+
+        grandchild = bc.Component()
+        grandchild.add_event_listener(bc.Event, 'handle_event')
+        grandchild.handle_event = MagicMock()
+        child.add_component(grandchild, bubble_down=True)
+
+        evt = bc.Event()
+        parent.broadcast(evt)
+        grandchild.handle_event.assert_called_once_with(evt)
+
+        child.remove_component(grandchild)
+        assert (bc.Event, child.handle_bubble_down) not in mid.child_event_callbacks[child]
+        parent.broadcast(bc.Event())
+        assert grandchild.handle_event.call_count == 1
+
     def test_bubble_up(self):
         parent = bc.Component('parent')
         mid = middleware.Middleware()
@@ -111,15 +136,91 @@ class TestMiddleWare(TestCase):
         child2.handle_event.assert_called_once_with(evt)
 
     def test_add_filter(self):
+        parent = bc.Component('parent')
         mid = middleware.Middleware()
-        mid.add_filter(lambda x: x) 
-        try:
-            # try adding another down filter
-            mid.add_filter(lambda x: x) 
-        except:
-            pass
-        else:
-            assert False, "Middleware only supports one filter of each type"
+        child = bc.Component('child')
+        child.add_event_listener(bc.Event, 'handle_event')
+        child.handle_event = MagicMock()
+
+        calls = []
+        def first(event):
+            calls.append('first')
+            return event
+        def second(event):
+            calls.append('second')
+            return event
+
+        # filters chain in the order added
+        mid.add_filter(first)
+        mid.add_filter(second)
+        mid.add_child(child)
+        parent.add_component(mid)
+
+        evt = bc.Event()
+        parent.broadcast(evt)
+        assert calls == ['first', 'second']
+        child.handle_event.assert_called_once_with(evt)
+
+        mid.remove_filter(first)
+        parent.broadcast(bc.Event())
+        assert calls == ['first', 'second', 'second']
+
+    def test_keyed_filter(self):
+        parent = bc.Component('parent')
+        mid = middleware.Middleware()
+        child = bc.Component('child')
+        child.add_event_listener(bc.Event, 'handle_event')
+        child.handle_event = MagicMock()
+
+        a_filter = MagicMock(side_effect=lambda e: e)
+        series_filter = MagicMock(side_effect=lambda e: e)
+        mid.add_filter(a_filter, key=testing.TestEventA)
+        mid.add_filter(series_filter, key=testing.TestEventB.class_series())
+        mid.add_child(child)
+        parent.add_component(mid)
+
+        parent.broadcast(testing.TestEventA())
+        parent.broadcast(testing.TestEventA())
+        parent.broadcast(testing.TestEventB())
+        parent.broadcast(bc.Event())
+        assert a_filter.call_count == 2
+        assert series_filter.call_count == 1
+        assert child.handle_event.call_count == 4
+
+        # the chain is looked up once per type/series
+        assert len(mid.filter_table['down']) == 3
+        evt = testing.TestEventA()
+        assert mid.filter_chain(evt) == (a_filter,)
+
+    def test_drop_fanout(self):
+        parent = bc.Component('parent')
+        mid = middleware.Middleware()
+        child = bc.Component('child')
+        child.add_event_listener(bc.Event, 'handle_event')
+        child.handle_event = MagicMock()
+
+        # drop TestEventB, split everything else in two
+        mid.add_filter(lambda e: None, key=testing.TestEventB)
+        mid.add_filter(lambda e: [e, testing.TestEventA()])
+        mid.add_child(child)
+        parent.add_component(mid)
+
+        parent.broadcast(testing.TestEventB())
+        assert not child.handle_event.called
+
+        evt = bc.Event()
+        parent.broadcast(evt)
+        assert child.handle_event.call_count == 2
+        assert child.handle_event.call_args_list[0][0][0] is evt
+
+        # up filters can drop broadcasts too
+        third_party = bc.Component('third_party')
+        third_party.add_event_listener(bc.Event, 'handle_event')
+        third_party.handle_event = MagicMock()
+        parent.add_component(third_party)
+        mid.add_filter(lambda e: None, type='up')
+        child.broadcast(bc.Event())
+        assert not third_party.handle_event.called
 
     def test_down_filer(self):
         parent = bc.Component('parent')
@@ -208,6 +309,191 @@ class TestMiddleWare(TestCase):
         assert up_filter.call_count == 1
         assert down_filter.call_count == 2 # child broadcasts, router sends back down, goes through down filter agan
 
+class TestFlattenMiddleware(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        pass
+
+    def build(self, depth=3):
+        box = bc.BounceBox()
+        # bound ahead of the middleware, so flattening keeps the order
+        third_party = bc.Component('third_party')
+        third_party.add_event_listener(bc.Event, 'handle_event')
+        third_party.handle_event = MagicMock()
+        box.add_component(third_party)
+
+        mids = [middleware.Middleware() for i in range(depth)]
+        box.add_component(mids[0])
+        for parent, mid in zip(mids, mids[1:]):
+            parent.add_child(mid)
+        child = bc.Component('child')
+        child.add_event_listener(bc.Event, 'handle_event')
+        child.handle_event = MagicMock()
+        child.add_event_listener(testing.TestEventB, 'handle_eventb')
+        child.handle_eventb = MagicMock()
+        mids[-1].add_child(child)
+        return box, mids, child, third_party
+
+    def test_flatten(self):
+        box, mids, child, third_party = self.build()
+        box.flatten_middleware()
+
+        # child is bound to the box router, no middleware in between
+        registry = box.router.event_dispatcher.callback_registry
+        assert registry[bc.Event] == [third_party.handle_event, child.handle_event]
+        # broadcasts skip straight to the top middleware
+        assert child.broadcast == mids[0].broadcast
+
+        evt = testing.TestEventB()
+        box.send(evt)
+        child.handle_event.assert_called_once_with(evt)
+        child.handle_eventb.assert_called_once_with(evt)
+
+        up = bc.Event()
+        child.broadcast(up)
+        third_party.handle_event.assert_called_with(up)
+        assert third_party.handle_event.call_count == 2
+
+        box.expand_middleware()
+        assert registry[bc.Event] == [third_party.handle_event, mids[0].handle_bubble_down]
+        assert child.broadcast == mids[-1].handle_bubble_up
+
+    def test_add_filter_expands(self):
+        box, mids, child, third_party = self.build()
+        box.flatten_middleware()
+
+        def whee(event):
+            event.whee = True
+            return event
+        mids[1].add_filter(whee)
+        # mids[0] still collapses onto the box, mids[1] keeps its hop
+        registry = box.router.event_dispatcher.callback_registry
+        assert registry[bc.Event] == [third_party.handle_event, mids[1].handle_bubble_down]
+
+        evt = bc.Event()
+        box.send(evt)
+        child.handle_event.assert_called_once_with(evt)
+        assert evt.whee
+
+    def test_flat_child_bubble_down_later(self):
+        box, mids, child, third_party = self.build()
+        box.flatten_middleware()
+
+        grandchild = bc.Component('grandchild')
+        grandchild.add_event_listener(bc.Event, 'handle_event')
+        grandchild.handle_event = MagicMock()
+        child.add_component(grandchild, bubble_down=True)
+
+        evt = bc.Event()
+        box.send(evt)
+        grandchild.handle_event.assert_called_once_with(evt)
+
+    def test_keyed_filter_partial(self):
+        box, mids, child, third_party = self.build(depth=1)
+        mid = mids[0]
+        mid.add_filter(MagicMock(side_effect=lambda e: e), key=testing.TestEventB)
+        box.flatten_middleware()
+
+        # handle_event can see TestEventB, handle_eventb too. Nothing moves
+        assert not mid.passes_through(bc.Event)
+        assert mid.passes_through(testing.TestEventA)
+
+        child2 = bc.Component('child2')
+        child2.add_event_listener(testing.TestEventA, 'handle_a')
+        child2.handle_a = MagicMock()
+        mid.add_child(child2)
+        registry = box.router.event_dispatcher.callback_registry
+        assert registry[testing.TestEventA] == [child2.handle_a]
+
+        evt = testing.TestEventA()
+        box.send(evt)
+        child2.handle_a.assert_called_once_with(evt)
+        child.handle_event.assert_called_once_with(evt)
+
+    def test_sibling_order(self):
+        """
+            Flattening must not change which callback sees an event first
+        """
+        def build():
+            calls = []
+            box = bc.BounceBox()
+            mid = middleware.Middleware()
+            box.add_component(mid)
+            child = bc.Component('child')
+            child.add_event_listener(bc.Event, 'handle_event')
+            child.handle_event = lambda evt: calls.append('child')
+            child.add_series_binding(testing.TestEventB.class_series(), 'handle_series')
+            child.handle_series = lambda evt: calls.append('child series')
+            mid.add_child(child)
+            # bound after the middleware
+            sibling = bc.Component('sibling')
+            sibling.add_event_listener(bc.Event, 'handle_event')
+            sibling.handle_event = lambda evt: calls.append('sibling')
+            box.add_component(sibling)
+            return box, calls
+
+        box, expected = build()
+        flat_box, calls = build()
+        registry = flat_box.router.event_dispatcher.callback_registry
+        before = dict((key, list(lst)) for key, lst in registry.items())
+        flat_box.flatten_middleware()
+        for b in (box, flat_box):
+            b.send(testing.TestEventA())
+            b.send(testing.TestEventB())
+        assert expected == ['child', 'sibling', 'child', 'child series', 'sibling']
+        assert calls == expected
+
+        flat_box.expand_middleware()
+        assert registry == before
+
+    def test_nested_keyed_filter_order(self):
+        """
+            Middleware nested under a keyed filter flatten onto the
+            filtered down_router where their hop was
+        """
+        def build():
+            calls = []
+            box = bc.BounceBox()
+            outer = middleware.Middleware()
+            outer.add_filter(lambda evt: evt, key=testing.TestEventB)
+            box.add_component(outer)
+
+            inner = middleware.Middleware()
+            outer.add_child(inner)
+            for name in ['leaf1', 'leaf2']:
+                leaf = bc.Component(name)
+                leaf.add_event_listener(bc.Event, 'handle_event')
+                leaf.handle_event = lambda evt, name=name: calls.append(name)
+                inner.add_child(leaf)
+            sib = bc.Component('sib')
+            sib.add_event_listener(bc.Event, 'handle_event')
+            sib.handle_event = lambda evt: calls.append('sib')
+            outer.add_child(sib)
+            return box, outer, inner, calls
+
+        box, outer, inner, expected = build()
+        flat_box, flat_outer, flat_inner, calls = build()
+        down = flat_outer.down_router.event_dispatcher.callback_registry
+        before = dict((key, list(lst)) for key, lst in down.items())
+        flat_box.flatten_middleware()
+        # inner's hop is gone, its leaves sit where it was
+        assert len(down[bc.Event]) == 3
+        assert flat_inner.handle_bubble_down not in down[bc.Event]
+        for b in (box, flat_box):
+            b.send(testing.TestEventA())
+            b.send(testing.TestEventB())
+        assert expected == ['leaf1', 'leaf2', 'sib'] * 2
+        assert calls == expected
+
+        flat_box.expand_middleware()
+        assert down == before
+
 if __name__ == '__main__':
     import nose                                                                      
     nose.runmodule(argv=[__file__,'-s','-x','--pdb', '--pdb-failure'],exit=False)   
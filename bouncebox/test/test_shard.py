@@ -0,0 +1,198 @@
+from unittest import TestCase
+
+import bouncebox.core.api as bc
+from bouncebox.array import EventBroadcaster
+import bouncebox.shard as shard
+
+SYMBOLS = ['AAPL', 'MSFT', 'IBM']
+
+class TickEvent(bc.Event):
+    def __init__(self, timestamp, price, series=None):
+        super(TickEvent, self).__init__(timestamp, series=series)
+        self.price = price
+
+class SignalEvent(bc.Event):
+    def __init__(self, timestamp, symbol):
+        super(SignalEvent, self).__init__(timestamp)
+        self.symbol = symbol
+
+class OtherSignal(bc.Event):
+    pass
+
+SERIES = dict((symbol, bc.EventSeries(TickEvent, symbol)) for symbol in SYMBOLS)
+
+class Strategy(bc.Component):
+    """ listens to one symbol's series """
+    def __init__(self, symbol):
+        super(Strategy, self).__init__()
+        self.symbol = symbol
+        self.series = SERIES[symbol]
+        self.add_series_binding(self.series, 'handle_tick')
+        self.ticks = []
+
+    def handle_tick(self, event):
+        self.ticks.append(event.price)
+        if event.price % 2 == 0:
+            self.broadcast(SignalEvent(event.timestamp, self.symbol))
+
+class SignalCounter(bc.Component):
+    listeners = [(SignalEvent, 'handle_signal')]
+
+    def __init__(self):
+        super(SignalCounter, self).__init__()
+        self.count = 0
+
+    def handle_signal(self, event):
+        self.count += 1
+
+class Recorder(bc.Component):
+    listeners = [(bc.Event, 'handle_event')]
+
+    def __init__(self):
+        super(Recorder, self).__init__()
+        self.seen = []
+
+    def handle_event(self, event):
+        self.seen.append(event)
+
+class Leaky(bc.Component):
+    """ broadcasts OtherSignal which another shard listens to """
+    def __init__(self, symbol):
+        super(Leaky, self).__init__()
+        self.add_series_binding(SERIES[symbol], 'handle_tick')
+
+    def handle_tick(self, event):
+        self.broadcast(OtherSignal(event.timestamp))
+
+class OtherListener(bc.Component):
+    listeners = [(OtherSignal, 'handle_event')]
+
+    def handle_event(self, event):
+        pass
+
+class ResidentSignal(bc.Component):
+    """ listens to everything so it stays in the parent """
+    listeners = [(bc.Event, 'handle_event')]
+
+    def handle_event(self, event):
+        if isinstance(event, TickEvent):
+            self.broadcast(OtherSignal(event.timestamp))
+
+PROVIDED = bc.EventSeries(SignalEvent, 'provided')
+
+class Provider(bc.Component):
+    listeners = [(bc.Event, 'handle_event')]
+    series_provided = ['series']
+
+    def __init__(self):
+        super(Provider, self).__init__()
+        self.series = PROVIDED
+
+    def handle_event(self, event):
+        pass
+
+class Consumer(bc.Component):
+    def __init__(self):
+        super(Consumer, self).__init__()
+        self.add_series_binding(PROVIDED, 'handle_signal')
+
+    def handle_signal(self, event):
+        pass
+
+def ticks(n=30):
+    for i in range(n):
+        symbol = SYMBOLS[i % len(SYMBOLS)]
+        yield TickEvent(i, i, series=SERIES[symbol])
+
+def build_box():
+    box = bc.BounceBox()
+    box.add_source(EventBroadcaster(ticks()))
+    strategies = [Strategy(symbol) for symbol in SYMBOLS]
+    for strat in strategies:
+        box.add_component(strat)
+    recorder = Recorder()
+    box.add_component(recorder)
+    return box, strategies, recorder
+
+class TestShard(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        pass
+
+    def test_plan(self):
+        box, strategies, recorder = build_box()
+        counter = SignalCounter()
+        box.add_component(counter)
+        plan = shard.plan_shards(box)
+        assert plan.residents == [recorder]
+        assert sorted(map(len, plan.shards)) == [1, 1, 1, 1]
+
+        # two strategies on the same series end up together
+        box.add_component(Strategy('AAPL'))
+        plan = shard.plan_shards(box)
+        assert sorted(map(len, plan.shards)) == [1, 1, 1, 2]
+
+    def test_run_sharded(self):
+        serial_box, serial_strats, serial_rec = build_box()
+        serial_box.start_box()
+
+        box, strategies, recorder = build_box()
+        shard.run_sharded(box, max_workers=3, chunk_size=7)
+
+        for strat, serial in zip(strategies, serial_strats):
+            # worker side state was copied back
+            assert strat.ticks == serial.ticks
+            assert strat.front is box
+
+        def summary(events):
+            return [(type(e).__name__, e.timestamp) for e in events]
+        assert summary(recorder.seen) == summary(serial_rec.seen)
+
+    def test_cross_shard_broadcast(self):
+        box = bc.BounceBox()
+        box.add_source(EventBroadcaster(ticks()))
+        box.add_component(Leaky('AAPL'))
+        box.add_component(OtherListener())
+        # planner can't see what Leaky broadcasts
+        assert len(shard.plan_shards(box).shards) == 2
+        self.assertRaises(shard.ShardError, shard.run_sharded, box, max_workers=2)
+
+    def test_resident_broadcast(self):
+        box, strategies, recorder = build_box()
+        box.add_component(ResidentSignal())
+        box.add_component(OtherListener())
+        assert len(shard.plan_shards(box).shards) == 4
+        # OtherListener would silently miss the resident's signals
+        self.assertRaises(shard.ShardError, shard.run_sharded, box, max_workers=2)
+        # the box router is left unbound
+        assert OtherSignal not in box.router.event_dispatcher.callback_registry
+
+    def test_resident_provided(self):
+        box, strategies, recorder = build_box()
+        provider = Provider()
+        consumer = Consumer()
+        box.add_component(provider)
+        box.add_component(consumer)
+        plan = shard.plan_shards(box)
+        assert consumer in plan.residents
+        assert len(plan.shards) == 3
+
+    def test_no_timestamp(self):
+        box, strategies, recorder = build_box()
+        box.sources[0].iter = iter([TickEvent(None, 1, series=SERIES['AAPL'])])
+        self.assertRaises(shard.ShardError, shard.run_sharded, box, max_workers=2)
+
+    def test_serial_fallback(self):
+        box, strategies, recorder = build_box()
+        shard.run_sharded(box, max_workers=1)
+        assert sum(len(s.ticks) for s in strategies) == 30
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-vvs','-x','--pdb', '--pdb-failure'],exit=False)
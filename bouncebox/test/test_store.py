@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+from datetime import datetime
+from unittest import TestCase
+
+import numpy as np
+from mock import MagicMock
+
+import bouncebox.core.api as bc
+from bouncebox.array import EventBroadcaster
+from bouncebox.block import EventBlock
+from bouncebox.store import EventStore, StoreSource
+
+class StoreTick(bc.Event):
+    pass
+
+def make_block(start, n):
+    timestamps = np.datetime64('2000-01-01') + np.arange(start, start+n).astype('timedelta64[s]')
+    return EventBlock.from_arrays(StoreTick, timestamps, price=np.arange(start, start+n) * 1.0)
+
+class TestEventStore(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.store = EventStore(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_append_read(self):
+        store = self.store
+        store.append('AAPL', make_block(0, 5))
+        store.append('AAPL', make_block(5, 5))
+        assert store.names() == ['AAPL']
+
+        reader = store.reader('AAPL')
+        assert len(reader) == 10
+        assert reader.event_cls is StoreTick
+        assert isinstance(reader.data, np.memmap)
+        block = reader.block(2, 4)
+        assert list(block['price']) == [2.0, 3.0]
+        assert block[0].price == 2.0
+
+    def test_append_only(self):
+        store = self.store
+        store.append('AAPL', make_block(5, 5))
+        try:
+            store.append('AAPL', make_block(0, 5))
+        except Exception:
+            pass
+        else:
+            assert False, "Appending earlier timestamps should error"
+
+    def test_seek(self):
+        store = self.store
+        store.append('AAPL', make_block(0, 10))
+        reader = store.reader('AAPL')
+        assert reader.searchsorted(datetime(2000, 1, 1, 0, 0, 4)) == 4
+
+        source = StoreSource(reader, chunk_size=3, blocks=False)
+        source.seek(datetime(2000, 1, 1, 0, 0, 7))
+        assert [evt.price for evt in source] == [7.0, 8.0, 9.0]
+
+    def test_seek_running(self):
+        """
+            Seeking a source the box already pulled from replaces the
+            prefetched event
+        """
+        store = self.store
+        store.append('AAPL', make_block(0, 10))
+        box = bc.BounceBox()
+        source = StoreSource(store.reader('AAPL'), chunk_size=3, blocks=False)
+        box.add_source(source)
+        box.start_box(autorun=False)
+        assert box.send_next().price == 0.0
+        source.seek(datetime(2000, 1, 1, 0, 0, 7))
+        assert [evt.price for evt in box] == [7.0, 8.0, 9.0]
+
+    def test_box_merge(self):
+        store = self.store
+        store.append('AAPL', make_block(0, 4))
+        box = bc.BounceBox()
+        box.add_source(StoreSource(store.reader('AAPL'), chunk_size=2, blocks=False))
+        other = [StoreTick(datetime(2000, 1, 1, 0, 0, 1, 500))]
+        box.add_source(EventBroadcaster(other))
+
+        comp = bc.Component()
+        comp.handler = MagicMock()
+        comp.add_event_listener(StoreTick, comp.handler)
+        box.add_component(comp)
+        box.start_box()
+
+        events = [args[0] for args, kwargs in comp.handler.call_args_list]
+        assert len(events) == 5
+        assert events[2] is other[0]
+
+    def test_refresh(self):
+        store = self.store
+        store.append('AAPL', make_block(0, 2))
+        reader = store.reader('AAPL')
+        store.append('AAPL', make_block(2, 2))
+        assert len(reader) == 2
+        reader.refresh()
+        assert len(reader) == 4
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-s','-x','--pdb', '--pdb-failure'],exit=False)
@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+import numpy as np
+
+import bouncebox.core.api as bc
+from bouncebox.array import EventBroadcaster
+from bouncebox.util.logger import Logger
+import bouncebox.sweep as sweep
+
+class PriceEvent(bc.Event):
+    def __init__(self, timestamp, price):
+        super(PriceEvent, self).__init__(timestamp)
+        self.price = price
+
+class SignalEvent(bc.Event):
+    pass
+
+class Threshold(bc.Component):
+    listeners = [(PriceEvent, 'handle_price')]
+
+    def __init__(self, level):
+        super(Threshold, self).__init__()
+        self.level = level
+
+    def handle_price(self, event):
+        if event.price > self.level:
+            self.broadcast(SignalEvent(event.timestamp))
+
+def build_box(data, level):
+    prices = data['prices']
+    box = bc.BounceBox()
+    box.add_source(EventBroadcaster(PriceEvent(i, price) for i, price in enumerate(prices)))
+    box.add_component(Threshold(level))
+    box.add_component(Logger(event_types=[SignalEvent]))
+    return box
+
+class TestSweep(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        self.prices = np.arange(10, dtype=float)
+
+    def check_results(self, results):
+        assert [res.params for res in results] == [{'level': 2}, {'level': 5}, {'level': 8}]
+        counts = [sum(len(v) for v in res.logs[0].values()) for res in results]
+        assert counts == [7, 4, 1]
+
+    def test_expand_grid(self):
+        grid = sweep.expand_grid({'a': [1, 2], 'b': ['x', 'y']})
+        assert len(grid) == 4
+        assert grid[0] == {'a': 1, 'b': 'x'}
+        assert sweep.expand_grid([{'a': 1}]) == [{'a': 1}]
+
+    def test_serial(self):
+        results = sweep.run_sweep(build_box, {'level': [2, 5, 8]},
+                                  data={'prices': self.prices}, max_workers=0)
+        self.check_results(results)
+
+    def test_process_pool(self):
+        results = sweep.run_sweep(build_box, {'level': [2, 5, 8]},
+                                  data={'prices': self.prices}, max_workers=2)
+        self.check_results(results)
+
+    def test_shared_data(self):
+        shared = sweep.SharedData({'prices': self.prices})
+        try:
+            descriptors = shared.share()
+            data, handles = sweep.SharedData.attach(descriptors)
+            assert (data['prices'] == self.prices).all()
+            assert not data['prices'].flags.writeable
+            del data
+            for handle in handles:
+                handle.close()
+        finally:
+            shared.close()
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-s','-x','--pdb', '--pdb-failure'],exit=False)
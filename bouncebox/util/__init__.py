@@ -1,24 +1,43 @@
-from trtools.tools.repr_tools import base_repr   
+def base_repr(obj, attrs):
+    # trtools pulls in pandas. Only load it when something gets printed
+    from trtools.tools.repr_tools import base_repr as _base_repr
+    return _base_repr(obj, attrs)
 
 class Object(object):
     repr_attrs = []
     """
     The base object for everything 
     """
+    # empty so slot based subclasses can drop __dict__
+    __slots__ = ()
     def __repr__(self):
         return base_repr(self, self.repr_attrs)
 
 class EventHook(object):
+    """
+        List of handlers fired together.
+
+        The handlers are kept compiled into a tuple that is rebuilt on every
+        add/remove, so firing is just a loop. fire1 is the single argument
+        fast path used for broadcasts. Handlers removed while firing still
+        get called for that fire.
+    """
     # not sure why I didn't just subclass list...
     def __init__(self):
         self.__handlers = []
+        self.handlers = ()
+
+    def _compile(self):
+        self.handlers = tuple(self.__handlers)
 
     def add_handler(self, handler):
         self.__handlers.append(handler)
+        self._compile()
         return self
 
     def remove_handler(self, handler):
         self.__handlers.remove(handler)
+        self._compile()
         return self
 
     def __iadd__(self, handler):
@@ -28,19 +47,27 @@ class EventHook(object):
         return self.remove_handler(handler)
 
     def fire(self, *args, **kwargs):
-        skip = kwargs.pop('skip',None)
-        for handler in self.__handlers:
-            im_self = getattr(handler, 'im_self', None)
-            if im_self and im_self == skip:
-                continue
-            try:
+        """
+            skip : object (optional)
+                handlers bound to skip are not called
+        """
+        skip = kwargs.pop('skip', None)
+        if skip is None:
+            for handler in self.handlers:
                 handler(*args, **kwargs)
-            except:
-                raise
+            return
+        for handler in self.handlers:
+            if getattr(handler, '__self__', None) is skip:
+                continue
+            handler(*args, **kwargs)
+
+    def fire1(self, event):
+        for handler in self.handlers:
+            handler(event)
 
     def clearObjectHandlers(self, inObject):
-        for theHandler in self.__handlers:
-            if theHandler.im_self == inObject:
+        for theHandler in self.handlers:
+            if getattr(theHandler, '__self__', None) is inObject:
                 self -= theHandler
 
     def __contains__(self, other):
@@ -50,28 +77,93 @@ class EventHook(object):
         return repr(self.__handlers)
 
     def __iter__(self):
-        return iter(self.__handlers)
+        return iter(self.handlers)
 
     def __len__(self):
-        return len(self.__handlers)
+        return len(self.handlers)
 
     def copy(self):
         c = EventHook()
         c.__handlers = self.__handlers[:]
+        c._compile()
         return c
 
-import uuid
+import itertools
 from operator import itemgetter
 from collections import namedtuple
 
+class GenId(object):
+    """
+        Process unique id handed out by generate_id.
+
+        Equality and hashing go by (namespace, number), so it is a cheap
+        dict key. The readable string (Class_instrument_number) is only
+        built when the id is printed or logged.
+    """
+    __slots__ = ('name', 'instrument', 'namespace', 'number', '_str')
+
+    def __init__(self, name, number, instrument=None, namespace=None):
+        self.name = name
+        self.number = number
+        self.instrument = instrument
+        self.namespace = namespace
+        self._str = None
+
+    def __str__(self):
+        text = self._str
+        if text is None:
+            parts = [self.name]
+            if self.instrument:
+                parts.append(str(self.instrument))
+            if self.namespace is not None:
+                parts.append('{0}-{1}'.format(self.namespace, self.number))
+            else:
+                parts.append(str(self.number))
+            text = self._str = '_'.join(parts)
+        return text
+
+    def __repr__(self):
+        return str(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, GenId):
+            return NotImplemented
+        return self.number == other.number and self.namespace == other.namespace
+
+    def __ne__(self, other):
+        if not isinstance(other, GenId):
+            return NotImplemented
+        return not self == other
+
+    def __hash__(self):
+        if self.namespace is None:
+            return hash(self.number)
+        return hash((self.namespace, self.number))
+
+    def __getstate__(self):
+        return (self.name, self.number, self.instrument, self.namespace)
+
+    def __setstate__(self, state):
+        self.name, self.number, self.instrument, self.namespace = state
+        self._str = None
+
+_id_counter = itertools.count(1)
+_id_namespace = None
+
+def set_id_namespace(namespace):
+    """
+        Prefix for ids made in this process from now on. Worker processes
+        set this so their ids can't collide with the parent's
+    """
+    global _id_namespace
+    _id_namespace = namespace
+
 def generate_id(obj, instrument=None):
     """
         The general idea behind this is that we create an id
         that is unique to that object but still had some data about
         it. So it would help with logging perhaps
+
+        Returns a GenId. Use str() for the readable form
     """
-    id = str(obj.__class__.__name__)
-    if instrument:
-        id += '_'+str(instrument)
-    id += '_'+str(uuid.uuid4())
-    return id 
+    return GenId(type(obj).__name__, next(_id_counter), instrument, _id_namespace)
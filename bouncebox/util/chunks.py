@@ -0,0 +1,192 @@
+"""
+    Chunked columnar files for persisting event streams.
+
+    Every key (series) gets a data file and an index file. A chunk is a run
+    of columns written back to back with np.save. The index file holds one
+    json line per chunk with its offset, row count and column names, so any
+    chunk can be loaded without reading the others. manifest.json maps keys
+    to file names.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import queue
+
+import numpy as np
+
+MANIFEST = 'manifest.json'
+
+def _file_name(key):
+    """
+        File name for key. Different keys can sanitize to the same name, so
+        a hash of the key is appended
+    """
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+    return '{0}-{1}'.format(re.sub(r'[^\w.-]', '_', key)[:100], digest)
+
+def columns_to_arrays(columns):
+    """
+        dict of name -> list of values to dict of name -> ndarray.
+        datetimes become datetime64[ns]
+    """
+    arrays = {}
+    for name, values in columns.items():
+        arr = np.asarray(values)
+        if arr.dtype == object and len(values) and hasattr(values[0], 'timetuple'):
+            arr = np.asarray(values, dtype='datetime64[ns]')
+        arrays[name] = arr
+    return arrays
+
+class ChunkWriter(object):
+    """
+        Writes chunks on a background thread so the caller never blocks on
+        disk, unless more than max_pending chunks are queued.
+
+        Parameters
+        ----------
+        path : str
+            Directory. Created if missing
+        max_pending : int
+            Queue size between the caller and the writer thread
+    """
+    def __init__(self, path, max_pending=16):
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.files = {}
+        self.manifest = {}
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            # appending to an earlier run
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        self.error = None
+        self.closed = False
+
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, name='ChunkWriter')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, key, columns):
+        """
+            Queue a chunk. columns is a dict of name -> list/ndarray
+        """
+        if self.error is not None:
+            raise self.error
+        self.queue.put((key, columns))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    break
+                if self.error is not None:
+                    continue
+                self._write(*item)
+            except Exception as err:
+                self.error = err
+            finally:
+                self.queue.task_done()
+
+    def wait(self):
+        """
+            Block until every queued chunk is on disk
+        """
+        self.queue.join()
+        if self.error is not None:
+            raise self.error
+
+    def _open(self, key):
+        try:
+            return self.files[key]
+        except KeyError:
+            pass
+        # keep the name from an earlier run
+        name = self.manifest.get(key)
+        if name is None:
+            name = self.manifest[key] = _file_name(key)
+            with open(os.path.join(self.path, MANIFEST), 'w') as f:
+                json.dump(self.manifest, f)
+        data = open(os.path.join(self.path, name + '.chunks'), 'ab')
+        index = open(os.path.join(self.path, name + '.index'), 'a')
+        self.files[key] = (data, index)
+        return data, index
+
+    def _write(self, key, columns):
+        arrays = columns_to_arrays(columns)
+        data, index = self._open(key)
+        offset = data.tell()
+        names = list(arrays)
+        for name in names:
+            np.save(data, arrays[name], allow_pickle=True)
+        data.flush()
+        count = len(arrays[names[0]]) if names else 0
+        index.write(json.dumps({'offset': offset, 'count': count, 'columns': names}) + '\n')
+        index.flush()
+
+    def close(self):
+        """
+            Wait for queued chunks to hit disk
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join()
+        for data, index in self.files.values():
+            data.close()
+            index.close()
+        if self.error is not None:
+            raise self.error
+
+class ChunkReader(object):
+    """
+        Lazy reader for a ChunkWriter directory. Only the index is read up
+        front. Chunks are loaded on request.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.indexes = {}
+
+    def keys(self):
+        return list(self.manifest)
+
+    def index(self, key):
+        if key not in self.indexes:
+            name = self.manifest[key]
+            with open(os.path.join(self.path, name + '.index')) as f:
+                self.indexes[key] = [json.loads(line) for line in f if line.strip()]
+        return self.indexes[key]
+
+    def n_chunks(self, key):
+        return len(self.index(key))
+
+    def chunk(self, key, i):
+        """
+            dict of column name -> ndarray for chunk i
+        """
+        entry = self.index(key)[i]
+        name = self.manifest[key]
+        with open(os.path.join(self.path, name + '.chunks'), 'rb') as f:
+            f.seek(entry['offset'])
+            return dict((col, np.load(f, allow_pickle=True)) for col in entry['columns'])
+
+    def iter_chunks(self, key):
+        for i in range(self.n_chunks(key)):
+            yield self.chunk(key, i)
+
+    def to_frame(self, key):
+        """
+            Load every chunk of key into one DataFrame
+        """
+        import pandas as pd
+        frames = [pd.DataFrame(chunk) for chunk in self.iter_chunks(key)]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
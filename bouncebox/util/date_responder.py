@@ -12,7 +12,6 @@
 """
 import types
 
-import pandas as pd
 import numpy as np
 
 import bouncebox.core.api as bb
@@ -28,33 +27,69 @@ class DateMatcher(object):
         param
         dates: Ordered array of dates. Can repeat. 
         callback: called when next date match occurs
+
+        Each unique date is a contiguous group of positions. The group
+        boundaries are computed once so a match is passed to callback as a
+        slice in O(1).
     """
     def __init__(self, dates, callback):
         if not _date_array(dates):
             raise Exception("dates must be DatetimeIndex")
         self.dates = dates
         self.callback = callback
+
+        values = np.asarray(dates, dtype='datetime64[ns]')
+        # dates are ordered so sorted unique == order of appearance
+        self.group_dates, self.group_starts = np.unique(values, return_index=True)
+        self.group_stops = np.append(self.group_starts[1:], len(values))
+
+        self.group = 0
         self.current = 0
-        self.current_date = self.dates[0]
+        self.current_date = self.group_dates[0] if len(values) else None
 
     def check_date(self, date):
         if self.current_date is None:
             return
 
-        date = pd.Timestamp(date)
+        date = np.datetime64(date, 'ns')
 
         if self.current_date == date:
-            matches = np.where(self.dates == date)[0] # get int positions
-            self.current += len(matches)
-            try:
-                self.current_date = self.dates[self.current]
-            except:
+            group = self.group
+            matches = slice(self.group_starts[group], self.group_stops[group])
+            self.current = matches.stop
+            self.group = group = group + 1
+            if group < len(self.group_dates):
+                self.current_date = self.group_dates[group]
+            else:
                 self.current_date = None # reached end
             return self.callback(matches)
 
         if self.current_date < date:
             raise Exception("We skipped ahead into future. Something wrong")
 
+    def match_dates(self, dates):
+        """
+            Bulk match an array of dates. Does not advance the matcher.
+
+            Returns
+            -------
+            starts, stops : int arrays
+                Position slice for each date. Dates with no match get
+                start == stop.
+        """
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        group_dates = self.group_dates
+        if not len(group_dates):
+            # nothing to match against
+            empty = np.zeros(len(dates), dtype=self.group_starts.dtype)
+            return empty, empty.copy()
+        idx = np.searchsorted(group_dates, dates)
+        clipped = np.minimum(idx, len(group_dates) - 1)
+        found = (idx < len(group_dates)) & (group_dates[clipped] == dates)
+        starts = np.where(found, self.group_starts[clipped], 0)
+        stops = np.where(found, self.group_stops[clipped], 0)
+        return starts, stops
+
 class DateResponder(bb.Component):
     """
         Parameters
@@ -95,7 +130,7 @@ class DateResponder(bb.Component):
             self.handle_date_match = lambda matches: self.values[matches]
         else:
             self.values = trans.reset_index()
-            self.handle_date_match = lambda matches: self.values.ix[matches]
+            self.handle_date_match = lambda matches: self.values.iloc[matches]
 
     def check_date(self, date):
         return self.dr.check_date(date)
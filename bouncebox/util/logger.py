@@ -2,7 +2,8 @@ from collections import deque
 
 import bouncebox.core.component as component
 import bouncebox.core.event as event
-from bouncebox.event_frame import EventList
+from bouncebox.event_frame import EventList, EventColumns
+from bouncebox.util.chunks import ChunkWriter, ChunkReader
 
 class Logger(component.Component):
     """
@@ -12,20 +13,36 @@ class Logger(component.Component):
 
         Paramters
         ---------
+        length : int (optional)
+            Only keep the last length events per series (and in all_events)
         series : list of EventSeries
         event_types : list of classes (default: event.Event)
+        columnar : bool
+            Store events as EventColumns (repr_attrs in NumPy arrays) instead
+            of keeping the event objects.
     """
-    def __init__(self, length=None, series=[], event_types=[event.Event]):
+    def __init__(self, length=None, series=[], event_types=[event.Event], columnar=False):
         super(Logger, self).__init__()
 
         self.length = length
+        self.columnar = columnar
         self.series = series
         self.event_types = event_types
         self.data = {}
-        self.all_events = EventList(attrs=['timestamp'], repr_col=True)
+        if columnar:
+            self.all_events = EventColumns(attrs=['timestamp', 'series'], length=length)
+        else:
+            self.all_events = self._new_store(attrs=['timestamp'], repr_col=True)
 
         self._add_bindings()
 
+    def _new_store(self, attrs=None, repr_col=False):
+        if self.columnar:
+            return EventColumns(attrs, length=self.length)
+        if self.length:
+            return deque(maxlen=self.length)
+        return EventList(attrs=attrs, repr_col=repr_col)
+
     def _add_bindings(self):
         for series in self.series:
             self.add_series_binding(series, self.handle_events)
@@ -46,19 +63,32 @@ class Logger(component.Component):
 
     def log(self, event):
         key = self.get_key(event)
-        lst = self.data.setdefault(key, EventList())
+        try:
+            lst = self.data[key]
+        except KeyError:
+            lst = self.data[key] = self._new_store()
         lst.append(event)
         self.all_events.append(event)
 
+    def to_frame(self, key=None):
+        """
+            DataFrame of the events logged under key. Defaults to all_events
+        """
+        store = self.all_events if key is None else self.data[key]
+        if isinstance(store, deque):
+            store = EventList(list(store), attrs=['timestamp'] if key is None else None)
+        return store.to_frame()
+
     def __getattr__(self, key):
-        if key in self.data:
-            return self.data[key]
-        raise AttributeError()
+        data = self.__dict__.get('data', {})
+        if key in data:
+            return data[key]
+        raise AttributeError(key)
 
     def __repr__(self):
         out = []
         out.append(self.__class__.__name__)
-        for k, v in self.data.iteritems():
+        for k, v in self.data.items():
             out.append("{0}: {1} items".format(k, len(v)))
         return '\n'.join(out)
 
@@ -97,18 +127,112 @@ class FileLogger(Logger):
         self.file = file 
 
     def end(self, _event):
-        import cPickle as pickle
+        import pickle
         # Get rid of last. It points to components
-        for events in self.series.itervalues():
+        for events in self.data.values():
             for evt in events:
                 try:
                     del evt.last
                 except AttributeError:
                     pass
-        data = self.series
+        data = self.data
         pickle.dump(data, self.file, 2)
         self.file.close()
 
+class StreamingFileLogger(Logger):
+    """
+        Logger that streams events to disk instead of keeping them.
+
+        Events are buffered per series as columns of their repr_attrs and
+        written every chunk_size events by a background ChunkWriter. Read
+        the output back with to_frame or bouncebox.util.chunks.ChunkReader.
+
+        Parameters
+        ----------
+        path : str
+            Output directory
+        chunk_size : int
+            Events per chunk per series
+        attrs : list of attr names (optional)
+            Columns to write. Defaults to each series' first event repr_attrs
+    """
+    wiring_attrs = Logger.wiring_attrs + ['writer']
+    def __init__(self, path, chunk_size=10000, series=[], event_types=[event.Event],
+                 attrs=None):
+        super(StreamingFileLogger, self).__init__(None, series, event_types)
+        self.path = path
+        self.chunk_size = chunk_size
+        self.attrs = attrs
+        # nothing is kept in memory past the current chunk
+        self.all_events = None
+        self.buffers = {}
+        self.writer = ChunkWriter(path)
+
+    def log(self, event):
+        key = self.get_key(event)
+        try:
+            attrs, columns = self.buffers[key]
+        except KeyError:
+            attrs = self.attrs or list(event.repr_attrs)
+            columns = dict((name, []) for name in attrs)
+            self.buffers[key] = (attrs, columns)
+
+        for name in attrs:
+            columns[name].append(getattr(event, name))
+
+        if len(columns[attrs[0]]) >= self.chunk_size:
+            self.flush_key(key)
+
+    def flush_key(self, key):
+        attrs, columns = self.buffers[key]
+        if not columns[attrs[0]]:
+            return
+        # hand the lists off to the writer thread and start new ones
+        self.buffers[key] = (attrs, dict((name, []) for name in attrs))
+        self.writer.submit(key, columns)
+
+    def flush(self):
+        for key in list(self.buffers):
+            self.flush_key(key)
+
+    def to_frame(self, key=None):
+        """
+            DataFrame read back from the chunks on disk. Buffered events are
+            written first. Defaults to every key, with a series column,
+            in timestamp order
+        """
+        if not self.writer.closed:
+            self.flush()
+            self.writer.wait()
+        reader = ChunkReader(self.path)
+        if key is not None:
+            if key not in reader.manifest:
+                raise KeyError("Nothing was logged under {0!r}".format(key))
+            return reader.to_frame(key)
+
+        import pandas as pd
+        frames = []
+        for name in reader.keys():
+            frame = reader.to_frame(name)
+            frame['series'] = name
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame()
+        frame = pd.concat(frames, ignore_index=True)
+        if 'timestamp' in frame:
+            frame = frame.sort_values('timestamp', kind='mergesort', ignore_index=True)
+        return frame
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def end(self, _event):
+        self.close()
+
+    def handle_end_box(self, _event):
+        self.close()
+
 def install_ipython_completers():  # pragma: no cover
     """Register the DataFrame type with IPython's tab completion machinery, so
     that it knows about accessing column names as attributes."""
@@ -26,14 +26,27 @@ class TestDateResponder(TestCase):
     def test_date_matcher(self):
         ds = DateMatcher(dates=dates, callback=lambda x: x)
         m = ds.check_date(dates[0])
-        assert list(m) == [0,1,2]
+        assert m == slice(0, 3)
 
         # NOTE: each date repeats to test non-unique
         m = ds.check_date(dates[1]) # already done
         assert m is None
 
         m = ds.check_date(dates[3]) # next date
-        assert list(m) == [3,4,5]
+        assert m == slice(3, 6)
+
+    def test_match_dates(self):
+        ds = DateMatcher(dates=dates, callback=lambda x: x)
+        incoming = [dates[3], dates[3] + pd.Timedelta(days=1), dates[0], dates[-1]]
+        starts, stops = ds.match_dates(incoming)
+        assert list(starts) == [3, 0, 0, len(dates) - 3]
+        assert list(stops) == [6, 0, 3, len(dates)]
+
+    def test_match_dates_empty(self):
+        ds = DateMatcher(dates=dates[:0], callback=lambda x: x)
+        starts, stops = ds.match_dates([dates[0], dates[3]])
+        assert list(starts) == [0, 0]
+        assert list(stops) == [0, 0]
 
     def test_date_responder(self):
         ind = pd.date_range(start="2000-01-01", freq="D", periods=20)
@@ -0,0 +1,178 @@
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+import bouncebox.core.api as bb
+from bouncebox.array import EventBroadcaster
+from bouncebox.util.logger import Logger, StreamingFileLogger
+from bouncebox.util.chunks import ChunkReader, ChunkWriter
+from bouncebox.event_frame import EventColumns
+
+class PriceEvent(bb.Event):
+    repr_attrs = ['timestamp', 'price', 'note']
+    def __init__(self, timestamp, price, note=''):
+        super(PriceEvent, self).__init__(timestamp)
+        self.price = price
+        self.note = note
+
+ind = pd.date_range(start="2000-01-01", freq="D", periods=10)
+
+def make_events():
+    return [PriceEvent(ts, float(i), 'n%d' % i) for i, ts in enumerate(ind)]
+
+class TestLogger(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        pass
+
+    def test_length(self):
+        logger = Logger(length=3)
+        for evt in make_events():
+            logger.log(evt)
+        key = str(PriceEvent.class_series())
+        assert len(logger.data[key]) == 3
+        assert logger.data[key][0].price == 7.0
+        assert len(logger.all_events) == 3
+
+    def test_columnar(self):
+        logger = Logger(columnar=True)
+        events = make_events()
+        for evt in events:
+            logger.log(evt)
+        key = str(PriceEvent.class_series())
+        store = logger.data[key]
+        assert isinstance(store, EventColumns)
+        assert store.columns['price'].dtype == np.float64
+        assert store.columns['timestamp'].dtype == np.dtype('datetime64[ns]')
+
+        df = logger.to_frame(key)
+        assert list(df.columns) == ['timestamp', 'price', 'note']
+        assert list(df['price']) == [evt.price for evt in events]
+        assert df['timestamp'].iloc[4] == ind[4]
+        assert df['note'].iloc[9] == 'n9'
+
+    def test_columnar_ring(self):
+        logger = Logger(length=4, columnar=True)
+        for evt in make_events():
+            logger.log(evt)
+        key = str(PriceEvent.class_series())
+        df = logger.to_frame(key)
+        assert list(df['price']) == [6.0, 7.0, 8.0, 9.0]
+        assert len(logger.all_events) == 4
+
+    def test_columns_grow(self):
+        cols = EventColumns(capacity=2)
+        for evt in make_events():
+            cols.append(evt)
+        assert cols.capacity == 16
+        assert list(cols.column('price')) == [float(i) for i in range(10)]
+
+    def test_columns_promote(self):
+        """
+            Later values that don't fit the first value's dtype promote the
+            column instead of being cast
+        """
+        cols = EventColumns(attrs=['price', 'note'])
+        cols.append(PriceEvent(ind[0], 100, 1))
+        assert cols.columns['price'].dtype == np.int64
+        cols.append(PriceEvent(ind[1], 100.5, 'x'))
+        assert cols.columns['price'].dtype == np.float64
+        assert list(cols.column('price')) == [100, 100.5]
+        assert list(cols.column('note')) == [1, 'x']
+        cols.append(PriceEvent(ind[2], 2 ** 70, 2))
+        assert cols.column('price')[2] == 2 ** 70
+
+class TestStreamingFileLogger(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_chunks(self):
+        logger = StreamingFileLogger(self.path, chunk_size=4)
+        events = make_events()
+        for evt in events:
+            logger.log(evt)
+        key = str(PriceEvent.class_series())
+        # two full chunks went out, two events still buffered
+        assert len(logger.buffers[key][1]['price']) == 2
+        logger.close()
+
+        reader = ChunkReader(self.path)
+        assert reader.keys() == [key]
+        assert reader.n_chunks(key) == 3
+        chunk = reader.chunk(key, 1)
+        assert list(chunk['price']) == [4.0, 5.0, 6.0, 7.0]
+        assert chunk['timestamp'].dtype == np.dtype('datetime64[ns]')
+
+        df = reader.to_frame(key)
+        assert len(df) == 10
+        assert list(df['note']) == [evt.note for evt in events]
+
+    def test_box_end(self):
+        box = bb.BounceBox()
+        box.add_source(EventBroadcaster(make_events()))
+        logger = StreamingFileLogger(self.path, chunk_size=3, event_types=[PriceEvent])
+        box.add_component(logger)
+        box.start_box()
+        assert logger.writer.closed
+
+        reader = ChunkReader(self.path)
+        key = str(PriceEvent.class_series())
+        assert reader.n_chunks(key) == 4
+        assert len(reader.to_frame(key)) == 10
+
+    def test_to_frame(self):
+        logger = StreamingFileLogger(self.path, chunk_size=4)
+        events = make_events()
+        for evt in events[:6]:
+            logger.log(evt)
+        # mid run, buffered events are written first
+        key = str(PriceEvent.class_series())
+        assert list(logger.to_frame(key)['price']) == [0., 1., 2., 3., 4., 5.]
+        for evt in events[6:]:
+            logger.log(evt)
+        logger.close()
+        df = logger.to_frame()
+        assert len(df) == 10
+        assert list(df['series']) == [key] * 10
+        try:
+            logger.to_frame('missing')
+        except KeyError:
+            pass
+        else:
+            assert False, "unknown key should raise"
+
+    def test_file_names(self):
+        """
+            Keys that sanitize to the same name still get their own files
+        """
+        writer = ChunkWriter(self.path)
+        writer.submit('a/b', {'x': [1]})
+        writer.submit('a_b', {'x': [2]})
+        writer.close()
+        reader = ChunkReader(self.path)
+        assert reader.manifest['a/b'] != reader.manifest['a_b']
+        assert list(reader.chunk('a/b', 0)['x']) == [1]
+        assert list(reader.chunk('a_b', 0)['x']) == [2]
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-vvs','-x','--pdb', '--pdb-failure'],exit=False)
@@ -0,0 +1,124 @@
+import pickle
+from unittest import TestCase
+
+import bouncebox.util as util
+from bouncebox.util import EventHook, generate_id
+
+class Handler(object):
+    def __init__(self, out):
+        self.out = out
+
+    def handle(self, value):
+        self.out.append((self, value))
+
+class TestEventHook(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        pass
+
+    def test_fire1(self):
+        out = []
+        hook = EventHook()
+        hook += out.append
+        hook += out.append
+        hook.fire1(1)
+        assert out == [1, 1]
+        hook -= out.append
+        hook.fire1(2)
+        assert out == [1, 1, 2]
+        assert len(hook) == 1
+
+    def test_skip(self):
+        out = []
+        a = Handler(out)
+        b = Handler(out)
+        hook = EventHook()
+        hook += a.handle
+        hook += b.handle
+        hook.fire(1, skip=a)
+        assert out == [(b, 1)]
+
+    def test_remove_while_firing(self):
+        """
+            Firing works off the compiled tuple, so mutation mid fire is safe
+        """
+        out = []
+        hook = EventHook()
+        def remove(value):
+            hook.remove_handler(remove)
+        hook += remove
+        hook += out.append
+        hook.fire1(1)
+        hook.fire1(2)
+        assert out == [1, 2]
+        assert remove not in hook
+
+    def test_clear_object_handlers(self):
+        out = []
+        a = Handler(out)
+        b = Handler(out)
+        hook = EventHook()
+        hook += a.handle
+        hook += b.handle
+        hook += a.handle
+        hook.clearObjectHandlers(a)
+        assert list(hook) == [b.handle]
+
+    def test_copy(self):
+        out = []
+        hook = EventHook()
+        hook += out.append
+        c = hook.copy()
+        hook -= out.append
+        c.fire1(1)
+        assert out == [1]
+
+class TestGenerateId(TestCase):
+
+    def __init__(self, *args, **kwargs):
+        TestCase.__init__(self, *args, **kwargs)
+
+    def runTest(self):
+        pass
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        util.set_id_namespace(None)
+
+    def test_generate_id(self):
+        h = Handler([])
+        a = generate_id(h)
+        b = generate_id(h, 'AAPL')
+        assert a != b
+        assert b.number == a.number + 1
+        assert str(a) == 'Handler_{0}'.format(a.number)
+        assert str(b) == 'Handler_AAPL_{0}'.format(b.number)
+
+        d = {a: 1, b: 2}
+        assert d[a] == 1
+        c = pickle.loads(pickle.dumps(a))
+        assert c == a
+        assert d[c] == 1
+
+    def test_namespace(self):
+        h = Handler([])
+        a = generate_id(h)
+        util.set_id_namespace('w1')
+        b = generate_id(h)
+        assert str(b) == 'Handler_w1-{0}'.format(b.number)
+        # same number in another namespace is a different id
+        other = util.GenId('Handler', b.number)
+        assert other != b
+        assert a != b
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule(argv=[__file__,'-vvs','-x','--pdb', '--pdb-failure'],exit=False)